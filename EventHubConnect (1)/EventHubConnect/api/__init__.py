@@ -0,0 +1,12 @@
+from flask import Blueprint, request
+
+API_PREFIX = '/api/v1'
+
+api_bp = Blueprint('api', __name__)
+
+
+def is_api_request():
+    """Whether the request is addressed to the API, including URLs no API route matched"""
+    return request.blueprint == 'api' or request.path == API_PREFIX or request.path.startswith(API_PREFIX + '/')
+
+from . import routes
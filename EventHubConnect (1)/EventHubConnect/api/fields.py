@@ -0,0 +1,132 @@
+"""
+Sparse fieldsets for the JSON API.
+
+A FieldSet maps public field names to SQL column expressions, plus computed
+fields derived from other columns. Queries select only the columns the
+requested fields need, and rows are serialized straight from the result
+tuples without building ORM objects.
+"""
+
+from datetime import datetime
+from models import User, Event, Registration
+
+
+class InvalidFields(ValueError):
+    """Raised for a fields= parameter naming unknown fields"""
+
+
+class FieldSet:
+    """Public fields of one resource type"""
+
+    def __init__(self, columns, computed=None, default=None, joins=None):
+        self.columns = columns
+        # name -> (function of the row mapping, column names it reads)
+        self.computed = computed or {}
+        self.default = default or list(columns)
+        # column name -> entity that must be joined to select it
+        self.joins = joins or {}
+
+    @property
+    def names(self):
+        return list(self.columns) + list(self.computed)
+
+    def parse(self, raw):
+        """Turn a comma-separated fields= value into field names"""
+        if not raw:
+            return list(self.default)
+        names = [name.strip() for name in raw.split(',') if name.strip()]
+        unknown = [name for name in names if name not in self.columns and name not in self.computed]
+        if unknown:
+            raise InvalidFields(f"Unknown field(s): {', '.join(unknown)}. "
+                                f"Available: {', '.join(self.names)}")
+        return list(dict.fromkeys(names))
+
+    def column_names(self, names, extra=()):
+        """Columns to select for the given fields, including computed dependencies"""
+        needed = list(extra)
+        for name in names:
+            needed.extend(self.computed[name][1] if name in self.computed else [name])
+        return list(dict.fromkeys(needed))
+
+    def select(self, names, extra=()):
+        """Labelled column expressions and the entities they need joined"""
+        selected = self.column_names(names, extra)
+        columns = [self.columns[name].label(name) for name in selected]
+        joins = list(dict.fromkeys(self.joins[name] for name in selected if name in self.joins))
+        return columns, joins
+
+    def serialize(self, row, names):
+        mapping = row._mapping
+        result = {}
+        for name in names:
+            value = self.computed[name][0](mapping) if name in self.computed else mapping[name]
+            result[name] = value.isoformat() if isinstance(value, datetime) else value
+        return result
+
+
+def _available_spots(row):
+    if row['max_attendees'] is None:
+        return None
+    return max(0, row['max_attendees'] - row['registration_count'])
+
+
+def _is_full(row):
+    return row['max_attendees'] is not None and row['registration_count'] >= row['max_attendees']
+
+
+def _is_registration_open(row):
+    # Mirrors Event.is_registration_open
+    if row['registration_deadline'] and datetime.utcnow() > row['registration_deadline']:
+        return False
+    return bool(row['is_active']) and not _is_full(row)
+
+
+EVENT_FIELDS = FieldSet(
+    columns={
+        'id': Event.id,
+        'title': Event.title,
+        'description': Event.description,
+        'start_datetime': Event.start_datetime,
+        'end_datetime': Event.end_datetime,
+        'location': Event.location,
+        'venue_details': Event.venue_details,
+        'max_attendees': Event.max_attendees,
+        'registration_deadline': Event.registration_deadline,
+        'event_type': Event.event_type,
+        'is_active': Event.is_active,
+        'registration_count': Event.registration_count,
+        'organizer_id': Event.organizer_id,
+        'organizer_name': User.first_name + ' ' + User.last_name,
+        'created_at': Event.created_at,
+        'updated_at': Event.updated_at,
+    },
+    computed={
+        'available_spots': (_available_spots, ['max_attendees', 'registration_count']),
+        'is_full': (_is_full, ['max_attendees', 'registration_count']),
+        'is_registration_open': (_is_registration_open, ['registration_deadline', 'is_active',
+                                                         'max_attendees', 'registration_count']),
+    },
+    default=['id', 'title', 'start_datetime', 'end_datetime', 'location', 'event_type',
+             'max_attendees', 'registration_count'],
+    joins={'organizer_name': User},
+)
+
+AVAILABILITY_FIELDS = ['id', 'registration_count', 'max_attendees', 'available_spots', 'is_full',
+                       'is_registration_open']
+
+REGISTRATION_FIELDS = FieldSet(
+    columns={
+        'id': Registration.id,
+        'event_id': Registration.event_id,
+        'status': Registration.status,
+        'registered_at': Registration.registered_at,
+        'notes': Registration.notes,
+        'event_title': Event.title,
+        'event_start_datetime': Event.start_datetime,
+        'event_end_datetime': Event.end_datetime,
+        'event_location': Event.location,
+    },
+    default=['id', 'event_id', 'status', 'registered_at', 'event_title', 'event_start_datetime'],
+    joins={'event_title': Event, 'event_start_datetime': Event, 'event_end_datetime': Event,
+           'event_location': Event},
+)
@@ -0,0 +1,210 @@
+from datetime import datetime
+from flask import request, jsonify, abort, current_app, Response
+from flask_login import current_user
+from werkzeug.exceptions import HTTPException
+from api import api_bp
+from api.fields import EVENT_FIELDS, REGISTRATION_FIELDS, AVAILABILITY_FIELDS, InvalidFields
+from models import Event, Registration, User
+from search import search_events
+from pagination import keyset_paginate, InvalidCursor
+from availability import stream, availability_payload
+from extensions import db
+from routing import reads_from_replica
+from calendars import overlaps
+
+DEFAULT_PER_PAGE = 20
+MAX_PER_PAGE = 100
+MAX_BATCH = 100
+# Seconds a client should wait before reopening a refused stream
+STREAM_RETRY_AFTER = 30
+
+
+@api_bp.errorhandler(HTTPException)
+def json_error(error):
+    response = jsonify(error=error.description)
+    if getattr(error, 'valid_methods', None):
+        response.headers['Allow'] = ', '.join(error.valid_methods)
+    return response, error.code
+
+
+# The app's HTML 404/403 handlers are code-specific and would otherwise win
+for code in (400, 401, 403, 404):
+    api_bp.register_error_handler(code, json_error)
+
+
+@api_bp.errorhandler(InvalidFields)
+def invalid_fields(error):
+    return jsonify(error=str(error)), 400
+
+
+def _per_page():
+    return max(1, min(request.args.get('per_page', DEFAULT_PER_PAGE, type=int), MAX_PER_PAGE))
+
+
+def _ids_arg():
+    """Unique event ids from ?ids=1,2,3, in request order"""
+    try:
+        ids = list(dict.fromkeys(int(value) for value in request.args.get('ids', '').split(',') if value.strip()))
+    except ValueError:
+        abort(400, 'ids must be a comma-separated list of integers')
+    if not ids:
+        abort(400, 'ids is required')
+    if len(ids) > MAX_BATCH:
+        abort(400, f'At most {MAX_BATCH} ids per request')
+    return ids
+
+
+def _range_args():
+    """[start, end) from ?from=&to= (ISO dates or datetimes, UTC), or None"""
+    raw = request.args.get('from'), request.args.get('to')
+    if not any(raw):
+        return None
+    if not all(raw):
+        abort(400, 'from and to must be given together')
+    try:
+        start, end = (datetime.fromisoformat(value) for value in raw)
+    except ValueError:
+        abort(400, 'from and to must be ISO dates or datetimes')
+    if start.tzinfo or end.tzinfo or not datetime(1, 2, 1) < start < end:
+        abort(400, 'from must be a naive UTC time before to')
+    return start, end
+
+
+def _event_query(names, extra=()):
+    columns, joins = EVENT_FIELDS.select(names, extra)
+    query = db.session.query(*columns).select_from(Event)
+    if joins:
+        # organizer_name is the only joined field
+        query = query.join(User, User.id == Event.organizer_id)
+    return query
+
+
+def _events_by_id(ids, names):
+    rows = _event_query(names, extra=['id']).filter(Event.id.in_(ids)).all()
+    return {row.id: EVENT_FIELDS.serialize(row, names) for row in rows}
+
+
+@api_bp.route('/events')
+@reads_from_replica
+def list_events():
+    """Active events; cursor-paginated, or relevance-ranked with ?search=
+
+    ?from=&to= keeps events overlapping that range.
+    """
+    names = EVENT_FIELDS.parse(request.args.get('fields'))
+    per_page = _per_page()
+    search = request.args.get('search', '')
+    event_type = request.args.get('type', '')
+    date_range = _range_args()
+
+    query = _event_query(names, extra=['id', 'start_datetime']).filter(Event.is_active.is_(True))
+    if event_type:
+        query = query.filter(Event.event_type == event_type)
+    if date_range:
+        query = query.filter(overlaps(*date_range))
+
+    if search:
+        page = max(1, request.args.get('page', 1, type=int))
+        # Ties in rank are broken by date and id so OFFSET pages neither repeat nor skip rows
+        rows = (search_events(query, search).order_by(Event.start_datetime, Event.id)
+                .limit(per_page + 1).offset((page - 1) * per_page).all())
+        return jsonify(data=[EVENT_FIELDS.serialize(row, names) for row in rows[:per_page]],
+                       next_page=page + 1 if len(rows) > per_page else None)
+
+    try:
+        events = keyset_paginate(query, (Event.start_datetime, Event.id),
+                                 cursor=request.args.get('cursor'), per_page=per_page)
+    except InvalidCursor:
+        abort(400, 'Invalid cursor')
+    return jsonify(data=[EVENT_FIELDS.serialize(row, names) for row in events.items],
+                   next_cursor=events.next_cursor, prev_cursor=events.prev_cursor)
+
+
+@api_bp.route('/events/batch')
+@reads_from_replica
+def batch_events():
+    """Many events by id in one call: ?ids=1,2,3"""
+    names = EVENT_FIELDS.parse(request.args.get('fields'))
+    ids = _ids_arg()
+    found = _events_by_id(ids, names)
+    return jsonify(data=[found[event_id] for event_id in ids if event_id in found],
+                   missing=[event_id for event_id in ids if event_id not in found])
+
+
+@api_bp.route('/events/<int:event_id>')
+@reads_from_replica
+def event_detail(event_id):
+    """One event"""
+    names = EVENT_FIELDS.parse(request.args.get('fields'))
+    found = _events_by_id([event_id], names)
+    if event_id not in found:
+        abort(404, 'Event not found')
+    return jsonify(data=found[event_id])
+
+
+@api_bp.route('/events/<int:event_id>/availability')
+def event_availability(event_id):
+    """Seat counts and whether registration is open"""
+    found = _events_by_id([event_id], AVAILABILITY_FIELDS)
+    if event_id not in found:
+        abort(404, 'Event not found')
+    return jsonify(data=found[event_id])
+
+
+@api_bp.route('/events/availability/stream')
+def availability_stream():
+    """Server-sent availability updates for ?ids=1,2,3"""
+    if not current_app.config.get('SSE_ENABLED'):
+        abort(404, 'Live updates are not enabled, poll /availability instead')
+    ids = _ids_arg()
+    broker = current_app.extensions['availability']
+    if broker.full:
+        return _streams_busy()
+
+    rows = _event_query(AVAILABILITY_FIELDS).filter(Event.id.in_(ids)).all()
+    if not rows:
+        abort(404, 'Event not found')
+    initial = {row.id: availability_payload(row) for row in rows}
+
+    seen = broker.subscribe(initial)
+    if seen is None:
+        # Filled up since the check above
+        return _streams_busy()
+    response = Response(stream(broker, initial, seen, current_app.config.get('SSE_STREAM_TIMEOUT', 300)),
+                        mimetype='text/event-stream')
+    # Runs when the server closes the response, including when the client
+    # disconnects before the body was started
+    response.call_on_close(lambda: broker.unsubscribe(list(initial)))
+    response.headers['Cache-Control'] = 'no-cache'
+    # Stop nginx from buffering the stream
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+
+def _streams_busy():
+    response = jsonify(error='Too many live connections, poll /availability instead')
+    response.headers['Retry-After'] = str(STREAM_RETRY_AFTER)
+    return response, 503
+
+
+@api_bp.route('/me/registrations')
+def my_registrations():
+    """The logged-in user's registrations, oldest first"""
+    if not current_user.is_authenticated:
+        abort(401, 'Login required')
+    names = REGISTRATION_FIELDS.parse(request.args.get('fields'))
+    columns, joins = REGISTRATION_FIELDS.select(names, extra=['id', 'registered_at'])
+
+    query = db.session.query(*columns).select_from(Registration).filter(Registration.user_id == current_user.id)
+    if joins:
+        query = query.join(Event, Event.id == Registration.event_id)
+    if request.args.get('status'):
+        query = query.filter(Registration.status == request.args['status'])
+
+    try:
+        registrations = keyset_paginate(query, (Registration.registered_at, Registration.id),
+                                        cursor=request.args.get('cursor'), per_page=_per_page())
+    except InvalidCursor:
+        abort(400, 'Invalid cursor')
+    return jsonify(data=[REGISTRATION_FIELDS.serialize(row, names) for row in registrations.items],
+                   next_cursor=registrations.next_cursor, prev_cursor=registrations.prev_cursor)
@@ -1,20 +1,15 @@
+"""
+Application factory.
+
+Importing this module has no side effects: no app is built, nothing touches
+the database and logging is left alone. The WSGI entry point (main.py)
+builds the app; the schema is created with `flask create-schema`.
+"""
+
 import os
-import logging
 from flask import Flask
-from flask_sqlalchemy import SQLAlchemy
-from flask_login import LoginManager
 from werkzeug.middleware.proxy_fix import ProxyFix
-from sqlalchemy.orm import DeclarativeBase
-
-# Configure logging
-logging.basicConfig(level=logging.DEBUG)
-
-class Base(DeclarativeBase):
-    pass
-
-# Initialize extensions
-db = SQLAlchemy(model_class=Base)
-login_manager = LoginManager()
+from extensions import db, login_manager
 
 def create_app():
     app = Flask(__name__)
@@ -23,40 +18,126 @@ def create_app():
     app.secret_key = os.environ.get("SESSION_SECRET", "dev-secret-key-change-in-production")
     app.config["SQLALCHEMY_DATABASE_URI"] = os.environ.get("DATABASE_URL", "sqlite:///event_management.db")
     app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
-    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
-        "pool_recycle": 300,
-        "pool_pre_ping": True,
-    }
+    # Pool and SQLite settings become engine options in pooling.init_pooling
+    app.config["SQLITE_PROFILE"] = os.environ.get("SQLITE_PROFILE", "tuned")
+    app.config["SQLITE_BUSY_TIMEOUT"] = int(os.environ.get("SQLITE_BUSY_TIMEOUT", 5000))
+    app.config["SQLITE_CACHE_KB"] = int(os.environ.get("SQLITE_CACHE_KB", 20000))
+    app.config["SQLITE_MMAP_SIZE"] = int(os.environ.get("SQLITE_MMAP_SIZE", 256 * 1024 * 1024))
+    app.config["DB_POOL_SIZE"] = int(os.environ.get("DB_POOL_SIZE", 5))
+    app.config["DB_MAX_OVERFLOW"] = int(os.environ.get("DB_MAX_OVERFLOW", 10))
+    app.config["DB_POOL_TIMEOUT"] = float(os.environ.get("DB_POOL_TIMEOUT", 30))
+    app.config["IMPORT_CHUNK_SIZE"] = int(os.environ.get("IMPORT_CHUNK_SIZE", 1000))
+    # Per-request query accounting and its Server-Timing header; a diagnostic, on by default only in debug
+    app.config["SQL_INSTRUMENTATION"] = os.environ.get("SQL_INSTRUMENTATION", "1" if app.debug else "0") == "1"
+    app.config["SQL_N_PLUS_ONE_THRESHOLD"] = int(os.environ.get("SQL_N_PLUS_ONE_THRESHOLD", 5))
+    app.config["CACHE_TYPE"] = os.environ.get("CACHE_TYPE", "memory")
+    app.config["CACHE_REDIS_URL"] = os.environ.get("CACHE_REDIS_URL", "redis://localhost:6379/0")
+    app.config["CACHE_DEFAULT_TIMEOUT"] = int(os.environ.get("CACHE_DEFAULT_TIMEOUT", 60))
+    app.config["CACHE_MAX_ENTRIES"] = int(os.environ.get("CACHE_MAX_ENTRIES", 1000))
+    app.config["IDENTITY_CACHE_TIMEOUT"] = int(os.environ.get("IDENTITY_CACHE_TIMEOUT", 30))
+    app.config["PASSWORD_HASH_PROFILE"] = os.environ.get("PASSWORD_HASH_PROFILE", "default")
+    app.config["PASSWORD_HASH_WORKERS"] = int(os.environ.get("PASSWORD_HASH_WORKERS", max(1, (os.cpu_count() or 2) // 2)))
+    app.config["PASSWORD_HASH_QUEUE"] = int(os.environ.get("PASSWORD_HASH_QUEUE", 32))
+    app.config["PASSWORD_HASH_TIMEOUT"] = float(os.environ.get("PASSWORD_HASH_TIMEOUT", 5))
+    # Long-lived streams need a thread or async worker; gunicorn.conf.py turns this on for those
+    app.config["SSE_ENABLED"] = os.environ.get("SSE_ENABLED", "0") == "1"
+    app.config["SSE_POLL_INTERVAL"] = float(os.environ.get("SSE_POLL_INTERVAL", 1))
+    app.config["SSE_MAX_CLIENTS"] = int(os.environ.get("SSE_MAX_CLIENTS", 5000))
+    app.config["SSE_STREAM_TIMEOUT"] = int(os.environ.get("SSE_STREAM_TIMEOUT", 300))
+    app.config["REGISTRATION_INTAKE"] = os.environ.get("REGISTRATION_INTAKE", "direct")
+    app.config["INTAKE_QUEUE_PATH"] = os.environ.get("INTAKE_QUEUE_PATH")
+    app.config["INTAKE_BATCH_SIZE"] = int(os.environ.get("INTAKE_BATCH_SIZE", 200))
+    app.config["INTAKE_POLL_INTERVAL"] = float(os.environ.get("INTAKE_POLL_INTERVAL", 0.5))
+    app.config["INTAKE_CLAIM_TIMEOUT"] = int(os.environ.get("INTAKE_CLAIM_TIMEOUT", 60))
+    app.config["INTAKE_MAX_ATTEMPTS"] = int(os.environ.get("INTAKE_MAX_ATTEMPTS", 5))
+    app.config["JINJA_BYTECODE_CACHE"] = os.environ.get("JINJA_BYTECODE_CACHE")
+    app.config["FRAGMENT_CACHE_MAX_ENTRIES"] = int(os.environ.get("FRAGMENT_CACHE_MAX_ENTRIES", 2000))
+    app.config["DB_POOL_WARM"] = int(os.environ.get("DB_POOL_WARM", 0)) or None
+    app.config["DATABASE_REPLICA_URLS"] = [url.strip() for url in os.environ.get("DATABASE_REPLICA_URLS", "").split(",") if url.strip()]
+    app.config["REPLICA_STICKY_SECONDS"] = float(os.environ.get("REPLICA_STICKY_SECONDS", 5))
+    
+    # Request ids and access records; registered first so every other hook runs inside them
+    from logconfig import init_request_logging
+    init_request_logging(app)
     
     # ProxyFix for proper URL generation behind proxies
     app.wsgi_app = ProxyFix(app.wsgi_app, x_proto=1, x_host=1)
     
+    # Read replicas are extra binds, so they must be known before db.init_app
+    from routing import init_routing
+    init_routing(app)
+    
+    # Pool policy per engine, and the SQLite pragmas run on each new connection
+    from pooling import init_pooling, install_pragmas
+    init_pooling(app)
+    
     # Initialize extensions
     db.init_app(app)
+    install_pragmas(app)
     login_manager.init_app(app)
     login_manager.login_view = 'users.login'
     login_manager.login_message = 'Please log in to access this page.'
     login_manager.login_message_category = 'info'
     
+    # Password hashing off the request thread
+    from passwords import init_passwords
+    init_passwords(app)
+    
     # Import models to ensure they're registered
     from models import User, Event, Registration
+    from search import init_search
+    
+    # User loader for Flask-Login, served from a short-lived per-worker cache
+    from identity import load_user as load_cached_user, init_identity_cache
+    init_identity_cache(app)
     
-    # User loader for Flask-Login
     @login_manager.user_loader
     def load_user(user_id):
-        return User.query.get(int(user_id))
+        return load_cached_user(int(user_id))
+    
+    # Full-text search backend; the index itself is installed by `flask create-schema`
+    init_search(app)
     
-    # Create database tables
-    with app.app_context():
-        db.create_all()
-        logging.info("Database tables created")
+    # Per-request query counting, timing and N+1 detection
+    from instrumentation import init_instrumentation
+    init_instrumentation(app)
+    
+    # ETag / Last-Modified validators and 304 responses
+    from conditional import init_conditional
+    init_conditional(app)
+    
+    # Response cache for public event pages
+    from cache import init_cache
+    init_cache(app)
+    
+    # Live seat availability feed
+    from availability import init_availability
+    init_availability(app)
+    
+    # Queued registrations with group commit (REGISTRATION_INTAKE=queue)
+    from intake import init_intake
+    init_intake(app)
+    
+    # Fingerprinted static URLs and far-future caching (after `flask build-assets`)
+    from assets import init_assets
+    init_assets(app)
+    
+    # Event type lookups, Jinja bytecode cache and event card fragments
+    from templating import init_templating
+    init_templating(app)
     
     # Register blueprints
     from users import users_bp
     from events import events_bp
+    from api import api_bp, API_PREFIX
     
     app.register_blueprint(users_bp, url_prefix='/users')
     app.register_blueprint(events_bp, url_prefix='/events')
+    app.register_blueprint(api_bp, url_prefix=API_PREFIX)
+    
+    # Register CLI commands
+    from commands import register_commands
+    register_commands(app)
     
     # Main routes
     from flask import render_template, redirect, url_for
@@ -68,15 +149,29 @@ def create_app():
             return redirect(url_for('events.list_events'))
         return render_template('index.html')
     
+    # Liveness, and readiness once this worker's connection pool is warm
+    from readiness import init_readiness
+    init_readiness(app)
+    
+    # Unmatched URLs and methods never reach a blueprint, so API paths are picked out here
+    from api import is_api_request
+    from api.routes import json_error
+    
     @app.errorhandler(404)
     def not_found(error):
+        if is_api_request():
+            return json_error(error)
         return render_template('404.html'), 404
     
+    @app.errorhandler(405)
+    def method_not_allowed(error):
+        if is_api_request():
+            return json_error(error)
+        return error
+    
     @app.errorhandler(403)
     def forbidden(error):
         return render_template('403.html'), 403
     
     return app
 
-# Create app instance
-app = create_app()
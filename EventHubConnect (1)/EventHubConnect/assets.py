@@ -0,0 +1,130 @@
+"""
+Fingerprinted, precompressed static assets.
+
+`flask build-assets` copies every file under static/ to static/dist/ with a
+content hash in its name (css/style.css -> dist/css/style.<hash>.css), writes
+gzip and, when the brotli package is installed, brotli variants of text
+assets, and records the mapping in static/dist/manifest.json. Run it as part
+of every deploy; earlier builds are left in place so pages rendered by
+workers still on the previous release keep resolving.
+
+When a manifest exists, url_for('static', filename=...) emits the
+fingerprinted name, and those files are served with a one-year immutable
+Cache-Control, plus the .br or .gz variant when the client accepts it.
+Without a manifest (development) static files are served as before.
+"""
+
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+from flask import request, send_from_directory
+
+BUILD_DIR = 'dist'
+MANIFEST = 'manifest.json'
+COMPRESSIBLE = {'.css', '.js', '.svg', '.json', '.txt', '.html', '.map'}
+# Preference order when the client accepts several
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+ONE_YEAR = 365 * 24 * 3600
+
+
+def _brotli():
+    try:
+        import brotli
+    except ImportError:
+        return None
+    return brotli
+
+
+def build_assets(static_folder):
+    """Fingerprint and compress every static file; returns (manifest, variants written)"""
+    output = os.path.join(static_folder, BUILD_DIR)
+    brotli = _brotli()
+    manifest, variants = {}, 0
+
+    for root, dirs, files in os.walk(static_folder):
+        if os.path.abspath(root) == os.path.abspath(static_folder):
+            dirs[:] = [name for name in dirs if name != BUILD_DIR]
+        dirs.sort()
+        for name in sorted(files):
+            if name.startswith('.'):
+                continue
+            source = os.path.join(root, name)
+            logical = os.path.relpath(source, static_folder).replace(os.sep, '/')
+            with open(source, 'rb') as f:
+                data = f.read()
+            stem, ext = os.path.splitext(logical)
+            fingerprinted = f'{BUILD_DIR}/{stem}.{hashlib.sha256(data).hexdigest()[:12]}{ext}'
+            target = os.path.join(static_folder, fingerprinted)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            _write(target, data)
+
+            if ext in COMPRESSIBLE:
+                compressed = {'.gz': gzip.compress(data, compresslevel=9, mtime=0)}
+                if brotli is not None:
+                    compressed['.br'] = brotli.compress(data, quality=11)
+                for suffix, body in compressed.items():
+                    # A variant that is not smaller is never worth sending
+                    if len(body) < len(data):
+                        _write(target + suffix, body)
+                        variants += 1
+            manifest[logical] = fingerprinted
+
+    _write(os.path.join(output, MANIFEST), json.dumps(manifest, indent=2, sort_keys=True).encode())
+    return manifest, variants
+
+
+def _write(path, data):
+    # Written beside the target and renamed, so a running worker never reads half a file
+    partial = path + '.tmp'
+    with open(partial, 'wb') as f:
+        f.write(data)
+    os.replace(partial, path)
+
+
+def load_manifest(static_folder):
+    path = os.path.join(static_folder, BUILD_DIR, MANIFEST)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def init_assets(app):
+    manifest = load_manifest(app.static_folder)
+    app.extensions['static_manifest'] = manifest
+    if not manifest:
+        return manifest
+
+    # Precompressed variants present for each fingerprinted file, checked once
+    encodings = {
+        fingerprinted: [(encoding, suffix) for encoding, suffix in ENCODINGS
+                        if os.path.exists(os.path.join(app.static_folder, fingerprinted + suffix))]
+        for fingerprinted in manifest.values()
+    }
+    serve_plain = app.view_functions['static']
+
+    @app.url_defaults
+    def fingerprint_static(endpoint, values):
+        if endpoint == 'static' and values.get('filename') in manifest:
+            values['filename'] = manifest[values['filename']]
+
+    def serve_static(filename):
+        if filename not in encodings:
+            return serve_plain(filename=filename)
+        path, content_encoding = filename, None
+        for encoding, suffix in encodings[filename]:
+            if request.accept_encodings[encoding]:
+                path, content_encoding = filename + suffix, encoding
+                break
+        response = send_from_directory(app.static_folder, path, max_age=ONE_YEAR,
+                                       mimetype=mimetypes.guess_type(filename)[0])
+        if content_encoding:
+            response.content_encoding = content_encoding
+        response.vary.add('Accept-Encoding')
+        response.cache_control.immutable = True
+        return response
+
+    app.view_functions['static'] = serve_static
+    return manifest
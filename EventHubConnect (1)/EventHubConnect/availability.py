@@ -0,0 +1,176 @@
+"""
+Live seat availability feed (server-sent events).
+
+Each worker runs one AvailabilityBroker. A single background thread
+refreshes the availability of every event that has at least one subscriber
+with one query per SSE_POLL_INTERVAL, and wakes up immediately when this
+worker commits a registration change (notify_availability). Changes made by
+other workers are picked up by the next poll. A burst of registrations is
+coalesced into one update per event, and a slow client only ever sees the
+latest snapshot.
+
+Subscribers block on one shared Condition instead of a queue each, so
+thousands of connections per worker cost one thread (or greenlet) each and
+nothing else. For that many connections, run gunicorn with an async worker
+class (gevent/eventlet) or gthread with enough threads; a sync worker ties
+up a whole process per stream. The stream is therefore off unless
+SSE_ENABLED is set, which gunicorn.conf.py does for thread and async worker
+classes; pages then fall back to the counts they were rendered with.
+Streams end after SSE_STREAM_TIMEOUT seconds, and the browser reconnects on
+its own. A worker at SSE_MAX_CLIENTS answers 503 with Retry-After.
+"""
+
+import json
+import threading
+import time
+from flask import current_app
+from extensions import db
+from models import Event
+
+HEARTBEAT_SECONDS = 15
+
+
+class AvailabilityBroker:
+    """Per-worker fan-out of availability snapshots"""
+
+    def __init__(self, app, poll_interval=1.0, max_clients=5000):
+        self.app = app
+        self.poll_interval = poll_interval
+        self.max_clients = max_clients
+        self.clients = 0
+        self._condition = threading.Condition()
+        self._wake = threading.Event()
+        self._subscriptions = {}  # event id -> subscriber count
+        self._snapshots = {}      # event id -> (version, payload)
+        self._version = 0
+        self._thread = None
+
+    @property
+    def full(self):
+        return self.clients >= self.max_clients
+
+    def subscribe(self, initial):
+        """Register interest in events, given {event id: current payload}.
+
+        Returns the version to wait from, or None when the worker is at capacity.
+        """
+        with self._condition:
+            if self.full:
+                return None
+            self.clients += 1
+            differing = []
+            for event_id, payload in initial.items():
+                self._subscriptions[event_id] = self._subscriptions.get(event_id, 0) + 1
+                snapshot = self._snapshots.get(event_id)
+                if snapshot is None:
+                    # Seed so the first poll does not re-send what the client already has
+                    self._version += 1
+                    self._snapshots[event_id] = (self._version, payload)
+                elif snapshot[1] != payload:
+                    differing.append(snapshot[0])
+            # A client whose copy differs from the broker's gets the broker's next
+            seen = min([self._version] + [version - 1 for version in differing])
+            # Started lazily so no thread exists before gunicorn forks
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='availability-broker', daemon=True)
+                self._thread.start()
+            return seen
+
+    def unsubscribe(self, event_ids):
+        with self._condition:
+            self.clients -= 1
+            for event_id in event_ids:
+                self._subscriptions[event_id] -= 1
+                if not self._subscriptions[event_id]:
+                    del self._subscriptions[event_id]
+                    self._snapshots.pop(event_id, None)
+
+    def notify(self):
+        """Refresh now instead of at the next poll"""
+        self._wake.set()
+
+    def wait(self, event_ids, seen_version, timeout):
+        """Block until one of event_ids changes after seen_version.
+
+        Returns (latest version, [payload, ...]); the list is empty on timeout.
+        """
+        def changed():
+            return [self._snapshots[event_id] for event_id in event_ids
+                    if event_id in self._snapshots and self._snapshots[event_id][0] > seen_version]
+
+        with self._condition:
+            self._condition.wait_for(changed, timeout)
+            return self._version, [payload for _, payload in changed()]
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+            try:
+                with self.app.app_context():
+                    self.refresh()
+                    db.session.remove()
+            except Exception:
+                self.app.logger.exception("Availability refresh failed")
+
+    def refresh(self):
+        """Load availability for every subscribed event and wake clients whose events changed"""
+        from api.fields import EVENT_FIELDS, AVAILABILITY_FIELDS
+
+        with self._condition:
+            event_ids = list(self._subscriptions)
+        if not event_ids:
+            return
+        columns, _ = EVENT_FIELDS.select(AVAILABILITY_FIELDS)
+        rows = db.session.query(*columns).filter(Event.id.in_(event_ids)).all()
+
+        with self._condition:
+            updated = False
+            for row in rows:
+                payload = availability_payload(row)
+                snapshot = self._snapshots.get(row.id)
+                if row.id in self._subscriptions and (snapshot is None or snapshot[1] != payload):
+                    self._version += 1
+                    self._snapshots[row.id] = (self._version, payload)
+                    updated = True
+            if updated:
+                self._condition.notify_all()
+
+
+def stream(broker, initial, seen, stream_timeout):
+    """SSE body for {event id: payload}: the payloads, then coalesced changes until stream_timeout.
+
+    seen is the version broker.subscribe() returned; the caller unsubscribes
+    when the response is closed.
+    """
+    event_ids = list(initial)
+    deadline = time.monotonic() + stream_timeout
+    yield 'retry: 3000\n\n'
+    for payload in initial.values():
+        yield f'event: availability\ndata: {payload}\n\n'
+    while time.monotonic() < deadline:
+        seen, payloads = broker.wait(event_ids, seen, min(HEARTBEAT_SECONDS, deadline - time.monotonic()))
+        if not payloads:
+            # Comment line; keeps proxies from closing the connection and detects gone clients
+            yield ': keepalive\n\n'
+        for payload in payloads:
+            yield f'event: availability\nid: {seen}\ndata: {payload}\n\n'
+
+
+def availability_payload(row):
+    from api.fields import EVENT_FIELDS, AVAILABILITY_FIELDS
+    return json.dumps(EVENT_FIELDS.serialize(row, AVAILABILITY_FIELDS), separators=(',', ':'))
+
+
+def notify_availability():
+    """Call after committing a registration change"""
+    broker = current_app.extensions.get('availability')
+    if broker is not None:
+        broker.notify()
+
+
+def init_availability(app):
+    broker = AvailabilityBroker(app, app.config.get('SSE_POLL_INTERVAL', 1.0),
+                                app.config.get('SSE_MAX_CLIENTS', 5000))
+    app.extensions['availability'] = broker
+    return broker
@@ -0,0 +1,121 @@
+"""
+Memory ceiling check for the streaming attendee export.
+
+Seeds one event with --rows synthetic registrations (1M by default), then
+downloads the CSV and NDJSON exports through the Flask test client without
+buffering, tracking peak Python heap with tracemalloc. Exits non-zero if the
+peak exceeds --ceiling-mb or if the row count does not match.
+
+Usage:
+    python benchmarks/export_memory.py --rows 1000000 --ceiling-mb 32
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+PASSWORD = 'export-bench'
+
+
+def seed(rows, batch=20000):
+    """Create an organizer, one event and rows attendees registered for it"""
+    from werkzeug.security import generate_password_hash
+    from main import app
+    from extensions import db
+    from models import User, Event, Registration
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        organizer = User(username='export_organizer', email='organizer@export.test', first_name='Export',
+                         last_name='Organizer', role='organizer',
+                         password_hash=generate_password_hash(PASSWORD))
+        db.session.add(organizer)
+        db.session.flush()
+        now = datetime.utcnow()
+        event = Event(title='Huge export', start_datetime=now + timedelta(days=10),
+                      end_datetime=now + timedelta(days=10, hours=4), location='Export arena',
+                      event_type='conference', organizer_id=organizer.id)
+        db.session.add(event)
+        db.session.commit()
+
+        first_user_id = organizer.id + 1
+        for start in range(0, rows, batch):
+            stop = min(start + batch, rows)
+            db.session.execute(db.insert(User.__table__), [
+                {'id': first_user_id + i, 'username': f'attendee{i}', 'email': f'attendee{i}@export.test',
+                 'first_name': 'Attendee', 'last_name': str(i), 'organization': f'Org {i % 500}',
+                 'role': 'attendee', 'password_hash': 'x', 'is_active': True}
+                for i in range(start, stop)
+            ])
+            db.session.execute(db.insert(Registration.__table__), [
+                {'user_id': first_user_id + i, 'event_id': event.id, 'status': 'registered',
+                 'registered_at': now, 'notes': 'Looking forward to it' if i % 3 else None}
+                for i in range(start, stop)
+            ])
+            db.session.commit()
+        return event.id
+
+
+def measure(client, url):
+    """Stream url, returning (rows, bytes, first_byte_s, total_s, peak_bytes)"""
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    started = time.perf_counter()
+    response = client.get(url, buffered=False)
+    first_byte = None
+    lines = size = 0
+    for chunk in response.response:
+        if first_byte is None:
+            first_byte = time.perf_counter() - started
+        size += len(chunk)
+        lines += chunk.count(b'\n')
+    response.close()
+    total = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return lines, size, first_byte, total, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--ceiling-mb', type=float, default=32.0)
+    args = parser.parse_args()
+
+    if 'DATABASE_URL' not in os.environ:
+        os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'export.db')}"
+
+    started = time.perf_counter()
+    event_id = seed(args.rows)
+    print(f"Seeded {args.rows} registrations in {time.perf_counter() - started:.1f}s")
+
+    from main import app
+    app.config['WTF_CSRF_ENABLED'] = False
+    client = app.test_client()
+    client.post('/users/login', data={'username': 'export_organizer', 'password': PASSWORD})
+
+    ok = True
+    for fmt, header_lines in (('csv', 1), ('ndjson', 0)):
+        # CSV notes never contain newlines here, so lines == rows + header
+        lines, size, first_byte, total, peak = measure(client, f'/events/{event_id}/attendees/export.{fmt}')
+        peak_mb = peak / (1024 * 1024)
+        rows_ok = lines - header_lines == args.rows
+        within = peak_mb <= args.ceiling_mb
+        ok = ok and rows_ok and within
+        print(f"{fmt:<7} rows={lines - header_lines:<9} size={size / 1e6:7.1f}MB first_byte={first_byte * 1000:7.1f}ms "
+              f"total={total:6.1f}s peak_heap={peak_mb:6.2f}MB "
+              f"{'ok' if rows_ok and within else 'FAIL'}")
+
+    print("PASS" if ok else f"FAIL: row count mismatch or heap above {args.ceiling_mb}MB")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
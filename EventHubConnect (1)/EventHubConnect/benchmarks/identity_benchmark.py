@@ -0,0 +1,88 @@
+"""
+Round trips saved by the identity cache under concurrent load.
+
+Logs in --clients organizers, then has each of them hammer authenticated pages
+from its own thread for --requests requests, once with the identity cache
+disabled and once enabled. Query counts come from the Server-Timing header
+added by the SQL instrumentation; the response cache is turned off so every
+request renders.
+
+Usage:
+    python benchmarks/identity_benchmark.py --clients 16 --requests 200
+"""
+
+import argparse
+import logging
+import os
+import re
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+SERVER_TIMING_QUERIES = re.compile(r'desc="(\d+) queries"')
+PAGES = ['/users/profile', '/users/profile/edit', '/events/create', '/events/organizer/dashboard']
+
+
+def hammer(client, requests):
+    queries = 0
+    for i in range(requests):
+        response = client.get(PAGES[i % len(PAGES)])
+        assert response.status_code == 200, response.status_code
+        queries += int(SERVER_TIMING_QUERIES.search(response.headers['Server-Timing']).group(1))
+    return queries
+
+
+def run(clients, requests):
+    started = time.perf_counter()
+    with ThreadPoolExecutor(len(clients)) as pool:
+        queries = sum(pool.map(hammer, clients, [requests] * len(clients)))
+    return queries, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--requests', type=int, default=200, help='requests per client')
+    args = parser.parse_args()
+
+    if 'DATABASE_URL' not in os.environ:
+        os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'identity.db')}"
+    os.environ['CACHE_TYPE'] = 'null'
+    os.environ['SQL_INSTRUMENTATION'] = '1'
+
+    from main import app
+    from identity import init_identity_cache
+    from scale_data import generate, DEFAULT_PASSWORD
+
+    logging.getLogger().setLevel(logging.WARNING)
+    app.config['WTF_CSRF_ENABLED'] = False
+    with app.app_context():
+        generate(users=max(args.clients, 100), events=200, registrations=5000, organizer_share=0.5, echo=lambda _: None)
+
+    clients = []
+    for i in range(args.clients):
+        client = app.test_client()
+        response = client.post('/users/login', data={'username': f'user{i}', 'password': DEFAULT_PASSWORD})
+        assert response.status_code == 302, response.status_code
+        client.get('/users/profile')  # consume the welcome flash
+        clients.append(client)
+
+    total = args.clients * args.requests
+    results = {}
+    for label, enabled in (('uncached', False), ('cached', True)):
+        app.extensions['identity_cache'] = init_identity_cache(app) if enabled else None
+        queries, elapsed = run(clients, args.requests)
+        results[label] = queries
+        print(f"{label:<10} {total} requests  {queries:>7} queries  {queries / total:5.2f} queries/request  "
+              f"{total / elapsed:8.0f} req/s")
+
+    saved = results['uncached'] - results['cached']
+    print(f"saved {saved} round trips ({saved / total:.2f} per request, "
+          f"{saved / results['uncached']:.0%} of all queries)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+"""
+Throughput benchmark for bulk import (target: 100k rows/minute on SQLite).
+
+Generates --rows synthetic events as CSV and --rows registrations as NDJSON,
+imports them through bulk_import with the given chunk sizes and reports
+rows/minute for each.
+
+Usage:
+    python benchmarks/import_benchmark.py --rows 100000 --chunk-size 500 --chunk-size 2000
+"""
+
+import argparse
+import csv
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+TYPES = ['conference', 'networking', 'workshop', 'seminar', 'meeting', 'other']
+
+
+def events_csv(rows):
+    """Synthetic event export in the CSV shape accepted by the importer"""
+    out = io.StringIO()
+    writer = csv.writer(out)
+    writer.writerow(['title', 'description', 'start_datetime', 'end_datetime', 'location',
+                     'max_attendees', 'registration_deadline', 'event_type'])
+    base = datetime(2030, 1, 1, 9, 0)
+    for i in range(rows):
+        start = base + timedelta(hours=i)
+        writer.writerow([f'Imported event {i}', 'Migrated from the previous system',
+                         start.strftime('%Y-%m-%dT%H:%M'), (start + timedelta(hours=2)).strftime('%Y-%m-%dT%H:%M'),
+                         f'Venue number {i % 100}', 1000, (start - timedelta(days=1)).strftime('%Y-%m-%dT%H:%M'),
+                         TYPES[i % len(TYPES)]])
+    out.seek(0)
+    return out
+
+
+def registrations_ndjson(rows, user_count, event_ids):
+    """Synthetic registrations spread over users and events, one per (user, event)"""
+    out = io.StringIO()
+    for i in range(rows):
+        out.write(json.dumps({'username': f'import_user_{i % user_count}',
+                              'event_id': event_ids[i // user_count], 'notes': 'migrated'}) + '\n')
+    out.seek(0)
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=100_000)
+    parser.add_argument('--chunk-size', type=int, action='append')
+    args = parser.parse_args()
+    chunk_sizes = args.chunk_size or [1000]
+
+    if 'DATABASE_URL' not in os.environ:
+        os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'import.db')}"
+
+    from main import app
+    from extensions import db
+    from models import User, Event
+    from bulk_import import read_rows, import_events, import_registrations
+
+    user_count = 1000
+    print(f"{'kind':<15}{'chunk':>8}{'rows':>10}{'failed':>8}{'seconds':>10}{'rows/min':>12}")
+    for chunk_size in chunk_sizes:
+        with app.app_context():
+            db.drop_all()
+            db.create_all()
+            organizer = User(username='import_organizer', email='organizer@import.test', first_name='Import',
+                             last_name='Organizer', role='organizer', password_hash='x')
+            db.session.add(organizer)
+            db.session.execute(db.insert(User.__table__), [
+                {'username': f'import_user_{i}', 'email': f'user{i}@import.test', 'first_name': 'Import',
+                 'last_name': str(i), 'role': 'attendee', 'password_hash': 'x', 'is_active': True}
+                for i in range(user_count)
+            ])
+            db.session.commit()
+
+            with app.test_request_context():
+                started = time.perf_counter()
+                report = import_events(read_rows(events_csv(args.rows), 'csv'), organizer.id, chunk_size)
+                elapsed = time.perf_counter() - started
+            print(f"{'events':<15}{chunk_size:>8}{report.inserted:>10}{len(report.errors):>8}"
+                  f"{elapsed:>10.1f}{report.inserted / elapsed * 60:>12.0f}")
+
+            event_ids = [row[0] for row in db.session.execute(db.select(Event.id).order_by(Event.id))]
+            with app.test_request_context():
+                started = time.perf_counter()
+                report = import_registrations(
+                    read_rows(registrations_ndjson(args.rows, user_count, event_ids), 'ndjson'),
+                    chunk_size=chunk_size)
+                elapsed = time.perf_counter() - started
+            print(f"{'registrations':<15}{chunk_size:>8}{report.inserted:>10}{len(report.errors):>8}"
+                  f"{elapsed:>10.1f}{report.inserted / elapsed * 60:>12.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,182 @@
+"""
+Direct registration vs. the intake queue with group commit.
+
+Several worker processes (mimicking gunicorn workers), each running many
+threads, register --users attendees across --events events, first with
+reserve_seat on the request thread (one commit per registration), then via
+the intake queue (pending acknowledgement, seats reserved in batches).
+Reports database commits/sec, registrations/sec, acknowledgement latency and
+p50/p99 latency until the final result, and checks the capacity invariant.
+
+Usage:
+    python benchmarks/intake_benchmark.py --workers 4 --threads 50 --users 4000
+    DATABASE_URL=postgresql://... python benchmarks/intake_benchmark.py
+"""
+
+import argparse
+import logging
+import multiprocessing
+import os
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))] if ordered else 0.0
+
+
+def setup_database(users, events, capacity):
+    """Fresh schema with capped events and the attendee accounts"""
+    from main import app
+    from extensions import db
+    from models import User, Event
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        organizer = User(username='intake_organizer', email='organizer@example.com', first_name='Intake',
+                         last_name='Organizer', role='organizer', password_hash='x')
+        db.session.add(organizer)
+        db.session.flush()
+        start = datetime.utcnow() + timedelta(days=30)
+        db.session.execute(db.insert(Event.__table__), [
+            {'title': f'Spike event {i}', 'start_datetime': start, 'end_datetime': start + timedelta(hours=2),
+             'location': 'Main hall', 'max_attendees': capacity, 'event_type': 'conference',
+             'organizer_id': organizer.id, 'is_active': True, 'registration_count': 0,
+             'created_at': datetime.utcnow(), 'updated_at': datetime.utcnow()} for i in range(events)])
+        db.session.execute(db.insert(User.__table__), [
+            {'username': f'spike{i}', 'email': f'spike{i}@example.com', 'first_name': 'Spike',
+             'last_name': str(i), 'role': 'attendee', 'password_hash': 'x', 'is_active': True}
+            for i in range(users)])
+        db.session.commit()
+        event_ids = [row[0] for row in db.session.execute(db.select(Event.id).order_by(Event.id))]
+        user_ids = [row[0] for row in db.session.execute(
+            db.select(User.id).where(User.role == 'attendee').order_by(User.id))]
+    return event_ids, user_ids
+
+
+def worker(mode, jobs, threads, start_at, results):
+    """Submit (user, event) registrations from one process and report latencies"""
+    from main import app
+    from registration import reserve_seat, RegistrationError
+    from intake import REGISTERED
+
+    logging.getLogger().setLevel(logging.WARNING)
+    intake = app.extensions['registration_intake']
+    lock = threading.Lock()
+    acks, finals, outcomes = [], [], {}
+    chunks = [jobs[i::threads] for i in range(threads)]
+
+    def run(chunk):
+        for user_id, event_id in chunk:
+            started = time.perf_counter()
+            if mode == 'direct':
+                with app.app_context():
+                    try:
+                        reserve_seat(event_id, user_id)
+                        outcome = REGISTERED
+                    except RegistrationError as e:
+                        outcome = e.code
+                    except Exception as e:  # lock timeouts etc. are reported, not hidden
+                        outcome = f'error:{type(e).__name__}'
+                ack = final = time.perf_counter()
+            else:
+                token = intake.submit(user_id, event_id)
+                ack = time.perf_counter()
+                entry = intake.wait(token, timeout=60)
+                final = time.perf_counter()
+                outcome = entry['result']
+            with lock:
+                acks.append((ack - started) * 1000)
+                finals.append((final - started) * 1000)
+                outcomes[outcome] = outcomes.get(outcome, 0) + 1
+
+    while time.time() < start_at:
+        time.sleep(0.001)
+    pool = [threading.Thread(target=run, args=(chunk,)) for chunk in chunks]
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    # A writer that exits mid-batch strands that batch until INTAKE_CLAIM_TIMEOUT
+    while mode == 'queue' and intake.queue.pending():
+        time.sleep(0.05)
+    commits = len(jobs) if mode == 'direct' else intake.batches
+    results.put((acks, finals, outcomes, commits))
+
+
+def run_mode(mode, args, event_ids, jobs, queue_path):
+    os.environ['REGISTRATION_INTAKE'] = mode
+    os.environ['INTAKE_QUEUE_PATH'] = queue_path
+    os.environ['INTAKE_BATCH_SIZE'] = str(args.batch_size)
+
+    ctx = multiprocessing.get_context('spawn')
+    results = ctx.Queue()
+    start_at = time.time() + 3.0
+    procs = [ctx.Process(target=worker, args=(mode, jobs[i::args.workers], args.threads, start_at, results))
+             for i in range(args.workers)]
+    for p in procs:
+        p.start()
+    acks, finals, outcomes, commits = [], [], {}, 0
+    for _ in procs:
+        a, f, o, c = results.get()
+        acks.extend(a)
+        finals.extend(f)
+        commits += c
+        for outcome, n in o.items():
+            outcomes[outcome] = outcomes.get(outcome, 0) + n
+    for p in procs:
+        p.join()
+    elapsed = time.time() - start_at
+
+    from main import app
+    from extensions import db
+    from models import Event, Registration
+    with app.app_context():
+        counts = dict(db.session.query(Registration.event_id, db.func.count()).group_by(Registration.event_id))
+        consistent = all(event.registration_count == counts.get(event.id, 0) <= args.capacity
+                         for event in Event.query.filter(Event.id.in_(event_ids)))
+    registered = outcomes.get('registered', 0)
+    print(f"{mode:<8}{commits / elapsed:>11.1f}{registered / elapsed:>10.1f}{percentile(acks, 0.99):>9.1f}"
+          f"{percentile(finals, 0.5):>9.1f}{percentile(finals, 0.99):>9.1f}   "
+          f"{'ok' if consistent else 'VIOLATED'}  {dict(sorted(outcomes.items()))}")
+    return consistent
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, default=4, help='worker processes')
+    parser.add_argument('--threads', type=int, default=50, help='threads per worker')
+    parser.add_argument('--users', type=int, default=2000)
+    parser.add_argument('--events', type=int, default=10)
+    parser.add_argument('--capacity', type=int, default=None, help='seats per event (default: 90%% of demand)')
+    parser.add_argument('--batch-size', type=int, default=200)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    if 'DATABASE_URL' not in os.environ:
+        os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(workdir, 'intake.db')}"
+    # Every user registers for one event; capped a little below demand so some are turned away
+    args.capacity = args.capacity or max(1, int(args.users / args.events * 0.9))
+    jobs = [(user_index, user_index % args.events) for user_index in range(args.users)]
+    logging.getLogger().setLevel(logging.WARNING)
+
+    print(f"{args.users} registrations, {args.events} events x {args.capacity} seats, "
+          f"{args.workers} workers x {args.threads} threads")
+    print(f"{'mode':<8}{'commits/s':>11}{'regs/s':>10}{'ack p99':>9}{'p50 ms':>9}{'p99 ms':>9}   invariant")
+    ok = True
+    for mode in ('direct', 'queue'):
+        event_ids, user_ids = setup_database(args.users, args.events, args.capacity)
+        resolved = [(user_ids[u], event_ids[e]) for u, e in jobs]
+        ok &= run_mode(mode, args, event_ids, resolved, os.path.join(workdir, f'{mode}-queue.db'))
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,126 @@
+"""
+Request throughput with logging off, synchronous and queued.
+
+Serves --requests GETs of --path from --threads threads through the test
+client, with the access log and SQLAlchemy statement log (a deliberately
+noisy logger) at INFO, written as JSON to a sink that takes --sink-ms per
+write, like a pipe whose reader has fallen behind or a slow disk.
+
+Configurations:
+    off             - root at WARNING, nothing written
+    synchronous     - JSON StreamHandler on the root logger, request threads do the I/O
+    queued          - configure_logging(): formatting and I/O on the listener thread
+    queued, sampled - as queued with LOG_SAMPLE keeping 1 in 10 statement and access records
+
+Reported: requests/s, p50/p99 latency, lines written and records dropped.
+
+Usage:
+    python benchmarks/logging_benchmark.py --threads 8 --requests 2000 --sink-ms 1
+"""
+
+import argparse
+import io
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+NOISY = {'LOG_LEVEL': 'INFO', 'LOG_LEVELS': 'sqlalchemy.engine=INFO'}
+
+
+class SlowSink(io.TextIOBase):
+    """A stream where every write costs a fixed delay"""
+
+    def __init__(self, delay):
+        self.delay = delay
+        self.lines = 0
+        self.lock = threading.Lock()
+
+    def write(self, text):
+        with self.lock:
+            time.sleep(self.delay)
+            self.lines += text.count('\n')
+        return len(text)
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))] if ordered else 0.0
+
+
+def synchronous(sink):
+    from logconfig import JsonFormatter
+    handler = logging.StreamHandler(sink)
+    handler.setFormatter(JsonFormatter())
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(logging.INFO)
+    logging.getLogger('sqlalchemy.engine').setLevel(logging.INFO)
+
+
+def run(app, path, threads, requests):
+    local = threading.local()
+
+    def one(_):
+        if not hasattr(local, 'client'):
+            local.client = app.test_client()
+        started = time.perf_counter()
+        assert local.client.get(path).status_code == 200
+        return (time.perf_counter() - started) * 1000
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(threads) as pool:
+        samples = list(pool.map(one, range(requests)))
+    return requests / (time.perf_counter() - started), samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--sink-ms', type=float, default=1.0)
+    parser.add_argument('--path', default='/api/v1/events')
+    args = parser.parse_args()
+
+    os.environ.setdefault('DATABASE_URL', f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'logging.db')}")
+    os.environ['CACHE_TYPE'] = 'null'
+    os.environ['SQL_INSTRUMENTATION'] = '0'
+
+    import logconfig
+    from main import app
+    from scale_data import generate
+    logging.getLogger().setLevel(logging.WARNING)
+    with app.app_context():
+        generate(users=200, events=200, registrations=1000, echo=lambda _: None)
+
+    configurations = [
+        ('off', lambda sink: logconfig.configure_logging(sink, {'LOG_LEVEL': 'WARNING'})),
+        ('synchronous', synchronous),
+        ('queued', lambda sink: logconfig.configure_logging(sink, NOISY)),
+        ('queued, sampled', lambda sink: logconfig.configure_logging(
+            sink, dict(NOISY, LOG_SAMPLE='sqlalchemy.engine=0.1,access=0.1'))),
+    ]
+    run(app, args.path, args.threads, 50)
+    print(f"{'logging':<18}{'req/s':>9}{'p50 ms':>9}{'p99 ms':>9}{'lines':>9}{'dropped':>9}")
+    for name, setup in configurations:
+        sink = SlowSink(args.sink_ms / 1000)
+        setup(sink)
+        logging.getLogger('sqlalchemy.engine').setLevel(logging.INFO if name != 'off' else logging.WARNING)
+        throughput, samples = run(app, args.path, args.threads, args.requests)
+        # Lines still queued are written after the clock stops; that is the point
+        logconfig.stop_logging()
+        dropped = logconfig._queue_handler.dropped if name.startswith('queued') else 0
+        print(f"{name:<18}{throughput:>9.0f}{statistics.median(samples):>9.2f}"
+              f"{percentile(samples, 0.99):>9.2f}{sink.lines:>9}{dropped:>9}")
+
+
+if __name__ == '__main__':
+    main()
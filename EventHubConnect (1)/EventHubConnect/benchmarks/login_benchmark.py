@@ -0,0 +1,115 @@
+"""
+Login throughput and latency under a sign-in burst.
+
+For every combination of --profile (hashing cost) and --workers (hashing
+pool size, 0 = hash on the request thread), --concurrency threads log in
+--logins times in total, while a reader thread keeps rendering /events/ to
+show whether page rendering is starved. Users are stored with
+--stored-profile (default: the profile under test), so passing a cheaper
+stored profile also measures rehash-on-login.
+
+Usage:
+    python benchmarks/login_benchmark.py --profile default --profile low --workers 0 --workers 2
+    python benchmarks/login_benchmark.py --profile high --stored-profile low
+"""
+
+import argparse
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+PASSWORD = 'burst-password'
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))] if ordered else 0.0
+
+
+def login(app, username):
+    client = app.test_client()
+    started = time.perf_counter()
+    response = client.post('/users/login', data={'username': username, 'password': PASSWORD})
+    return response.status_code, (time.perf_counter() - started) * 1000
+
+
+def read_pages(app, stop, samples):
+    client = app.test_client()
+    while not stop.is_set():
+        started = time.perf_counter()
+        client.get('/events/')
+        samples.append((time.perf_counter() - started) * 1000)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--profile', action='append', help='hash profile under test (repeatable)')
+    parser.add_argument('--stored-profile', help='profile the seeded hashes are made with')
+    parser.add_argument('--workers', type=int, action='append', help='hashing pool size (repeatable)')
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--logins', type=int, default=200)
+    args = parser.parse_args()
+    profiles = args.profile or ['default']
+    pool_sizes = args.workers or [0, max(1, (os.cpu_count() or 2) // 2)]
+
+    if 'DATABASE_URL' not in os.environ:
+        os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'login.db')}"
+    os.environ['CACHE_TYPE'] = 'null'
+
+    from werkzeug.security import generate_password_hash
+    from main import app
+    from extensions import db
+    from models import User
+    from passwords import HashingPool, hash_method
+    from scale_data import generate
+
+    logging.getLogger().setLevel(logging.WARNING)
+    app.config['WTF_CSRF_ENABLED'] = False
+    with app.app_context():
+        generate(users=args.logins, events=200, registrations=2000, echo=lambda _: None)
+
+    print(f"{'profile':<10}{'stored':<10}{'workers':>8}{'logins/s':>10}{'p50 ms':>9}{'p95 ms':>9}"
+          f"{'503s':>6}{'rehashed':>10}{'page p50':>10}{'page p95':>10}")
+    for profile in profiles:
+        stored = args.stored_profile or profile
+        for workers in pool_sizes:
+            app.config['PASSWORD_HASH_PROFILE'] = profile
+            app.extensions['password_hasher'] = HashingPool(workers, app.config['PASSWORD_HASH_QUEUE'],
+                                                           app.config['PASSWORD_HASH_TIMEOUT'])
+            with app.app_context():
+                db.session.execute(db.update(User).values(
+                    password_hash=generate_password_hash(PASSWORD, hash_method(stored))))
+                db.session.commit()
+
+            stop, page_samples = threading.Event(), []
+            reader = threading.Thread(target=read_pages, args=(app, stop, page_samples))
+            reader.start()
+            started = time.perf_counter()
+            with ThreadPoolExecutor(args.concurrency) as pool:
+                results = list(pool.map(lambda i: login(app, f'user{i}'), range(args.logins)))
+            elapsed = time.perf_counter() - started
+            stop.set()
+            reader.join()
+
+            with app.app_context():
+                rehashed = db.session.query(User).filter(
+                    User.password_hash.startswith(hash_method(profile) + '$')).count() if stored != profile else 0
+            latencies = [ms for status, ms in results if status == 302]
+            busy = sum(1 for status, _ in results if status == 503)
+            failed = [status for status, _ in results if status not in (302, 503)]
+            assert not failed, f'unexpected login responses: {set(failed)}'
+            print(f"{profile:<10}{stored:<10}{workers:>8}{len(latencies) / elapsed:>10.1f}"
+                  f"{statistics.median(latencies) if latencies else 0:>9.1f}{percentile(latencies, 0.95):>9.1f}"
+                  f"{busy:>6}{rehashed:>10}{statistics.median(page_samples) if page_samples else 0:>10.1f}"
+                  f"{percentile(page_samples, 0.95):>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,157 @@
+"""
+Concurrency stress test for the registration engine.
+
+Fires hundreds of simultaneous registrations at a single event from several
+worker processes (mimicking gunicorn workers), each running many threads, and
+verifies that the event is never oversold and that the denormalized counter
+matches the registrations table.
+
+Usage:
+    python benchmarks/registration_stress.py --workers 4 --threads 100 --capacity 50
+    DATABASE_URL=postgresql://... python benchmarks/registration_stress.py
+"""
+
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def setup_database(users, capacity):
+    """Create a fresh schema with one event and the attendee accounts"""
+    from main import app
+    from extensions import db
+    from models import User, Event
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+
+        organizer = User(username='stress_organizer', email='organizer@stress.test',
+                         first_name='Stress', last_name='Organizer', role='organizer',
+                         password_hash='x')
+        db.session.add(organizer)
+        db.session.flush()
+
+        db.session.execute(db.insert(User.__table__), [
+            {'username': f'stress_user_{i}', 'email': f'user{i}@stress.test',
+             'first_name': 'Stress', 'last_name': str(i), 'role': 'attendee',
+             'password_hash': 'x', 'is_active': True}
+            for i in range(users)
+        ])
+
+        now = datetime.utcnow()
+        event = Event(title='Ticket rush', start_datetime=now + timedelta(days=1),
+                      end_datetime=now + timedelta(days=1, hours=2), location='Stress arena',
+                      max_attendees=capacity, event_type='conference', organizer_id=organizer.id)
+        db.session.add(event)
+        db.session.commit()
+
+        user_ids = [row[0] for row in db.session.execute(
+            db.select(User.id).where(User.role == 'attendee').order_by(User.id))]
+        return event.id, user_ids
+
+
+def worker(event_id, user_ids, threads, start_at, results):
+    """Register every user in user_ids concurrently from one process"""
+    from main import app
+    from registration import reserve_seat, RegistrationError
+
+    outcomes = Counter()
+    lock = threading.Lock()
+    barrier = threading.Barrier(threads)
+    chunks = [user_ids[i::threads] for i in range(threads)]
+
+    def run(chunk):
+        barrier.wait()
+        for user_id in chunk:
+            with app.app_context():
+                try:
+                    reserve_seat(event_id, user_id)
+                    outcome = 'registered'
+                except RegistrationError as e:
+                    outcome = type(e).__name__
+                except Exception as e:  # lock timeouts etc. are reported, not hidden
+                    outcome = f'error:{type(e).__name__}'
+            with lock:
+                outcomes[outcome] += 1
+
+    while time.time() < start_at:
+        time.sleep(0.001)
+    pool = [threading.Thread(target=run, args=(chunk,)) for chunk in chunks]
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    results.put(dict(outcomes))
+
+
+def verify(event_id, capacity):
+    """Check the capacity invariant and counter consistency"""
+    from main import app
+    from extensions import db
+    from models import Event, Registration
+
+    with app.app_context():
+        actual = Registration.query.filter_by(event_id=event_id).count()
+        counter = db.session.get(Event, event_id).registration_count
+    return actual, counter
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, default=4, help='worker processes')
+    parser.add_argument('--threads', type=int, default=100, help='threads per worker')
+    parser.add_argument('--capacity', type=int, default=50, help='max_attendees of the event')
+    parser.add_argument('--users', type=int, default=None,
+                        help='distinct users (default: workers * threads)')
+    parser.add_argument('--duplicates', action='store_true',
+                        help='have every worker attempt the same users to exercise the unique constraint')
+    args = parser.parse_args()
+
+    if 'DATABASE_URL' not in os.environ:
+        path = os.path.join(tempfile.mkdtemp(), 'stress.db')
+        os.environ['DATABASE_URL'] = f'sqlite:///{path}'
+
+    users = args.users or args.workers * args.threads
+    event_id, user_ids = setup_database(users, args.capacity)
+
+    ctx = multiprocessing.get_context('spawn')
+    results = ctx.Queue()
+    start_at = time.time() + 2.0
+    procs = []
+    for i in range(args.workers):
+        share = user_ids if args.duplicates else user_ids[i::args.workers]
+        p = ctx.Process(target=worker, args=(event_id, share, args.threads, start_at, results))
+        p.start()
+        procs.append(p)
+
+    totals = Counter()
+    for _ in procs:
+        totals.update(results.get())
+    for p in procs:
+        p.join()
+    elapsed = time.time() - start_at
+
+    actual, counter = verify(event_id, args.capacity)
+    print(f"Attempts:      {sum(totals.values())} in {elapsed:.2f}s")
+    for outcome, n in sorted(totals.items()):
+        print(f"  {outcome:<22} {n}")
+    print(f"Capacity:      {args.capacity}")
+    print(f"Registrations: {actual}")
+    print(f"Counter:       {counter}")
+
+    ok = actual <= args.capacity and actual == counter and totals['registered'] == actual
+    print("PASS" if ok else "FAIL: capacity invariant violated")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
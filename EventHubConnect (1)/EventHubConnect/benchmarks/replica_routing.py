@@ -0,0 +1,125 @@
+"""
+Read/write routing against two SQLite files standing in for a primary and
+its replica.
+
+Builds primary.db, copies it to replica.db (`flask sync-replicas` does the
+same), then plays a short session and counts the statements each engine
+receives per step. Replication is manual here, so the replica lags until
+the next sync, which is exactly what read-your-writes stickiness is for:
+
+    anonymous reads           all SELECTs on the replica
+    signed-in reads           profile and dashboards on the replica
+    register for an event     writes on the primary
+    same user, right after    pinned to the primary, sees the registration
+    another visitor           still on the (stale) replica
+    after the sticky window   back on the replica once it has synced
+
+Each expectation is asserted; the script exits non-zero if routing is wrong.
+
+Usage:
+    python benchmarks/replica_routing.py
+"""
+
+import logging
+import os
+import sys
+import tempfile
+import time
+from collections import Counter
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+STICKY_SECONDS = 1
+
+
+def main():
+    workdir = tempfile.mkdtemp()
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(workdir, 'primary.db')}"
+    os.environ['DATABASE_REPLICA_URLS'] = f"sqlite:///{os.path.join(workdir, 'replica.db')}"
+    os.environ['REPLICA_STICKY_SECONDS'] = str(STICKY_SECONDS)
+    os.environ['CACHE_TYPE'] = 'null'
+
+    from main import app
+    from extensions import db
+    from models import Event, Registration, User
+    from routing import replica_engines, sync_sqlite_replicas
+    from scale_data import generate, DEFAULT_PASSWORD
+    from sqlalchemy import event as sa_event
+    logging.getLogger().setLevel(logging.WARNING)
+    app.config['WTF_CSRF_ENABLED'] = False
+
+    with app.app_context():
+        db.create_all()
+        generate(users=50, events=30, registrations=100, echo=lambda _: None)
+        attendee = User.query.filter_by(role='attendee').first().username
+        registered = {r.event_id for r in Registration.query.join(User).filter(User.username == attendee)}
+        target = Event.query.filter(Event.is_active.is_(True), Event.id.notin_(registered or [0]),
+                                    Event.registration_count < Event.max_attendees).first().id
+        engines = {'primary': db.engine, 'replica': replica_engines(app)[0]}
+    sync_sqlite_replicas(app)
+
+    counts = Counter()
+    for name, engine in engines.items():
+        def count(conn, cursor, statement, parameters, context, executemany, name=name):
+            kind = 'write' if statement.lstrip().split(None, 1)[0].upper() in ('INSERT', 'UPDATE', 'DELETE') else 'read'
+            counts[name, kind] += 1
+        sa_event.listen(engine, 'before_cursor_execute', count)
+
+    def step(label, expect, *calls):
+        counts.clear()
+        for call in calls:
+            response = call()
+            assert response.status_code in (200, 302), (label, response.status_code)
+        observed = {key: counts[key] for key in [('primary', 'read'), ('primary', 'write'),
+                                                 ('replica', 'read'), ('replica', 'write')]}
+        print(f"{label:<28}" + ''.join(f"{observed[key]:>10}" for key in observed))
+        assert counts['replica', 'write'] == 0, f"{label}: wrote to the replica"
+        expect(counts)
+
+    def replica_only(c):
+        assert c['replica', 'read'] and not c['primary', 'read'], c
+
+    def primary_only(c):
+        assert c['primary', 'read'] and not c['replica', 'read'], c
+
+    def writes_primary(c):
+        assert c['primary', 'write'], c
+
+    visitor = app.test_client()
+    user = app.test_client()
+    user.post('/users/login', data={'username': attendee, 'password': DEFAULT_PASSWORD})
+
+    print(f"{'step':<28}{'pri read':>10}{'pri write':>10}{'rep read':>10}{'rep write':>10}")
+    step('anonymous reads', replica_only,
+         lambda: visitor.get('/events/'), lambda: visitor.get(f'/events/{target}'),
+         lambda: visitor.get('/api/v1/events'))
+    # Logging in may rehash the password; wait out any stickiness from that
+    time.sleep(STICKY_SECONDS)
+    step('signed-in reads', replica_only,
+         lambda: user.get('/users/profile'), lambda: user.get('/users/dashboard'))
+    step('register for an event', writes_primary,
+         lambda: user.post(f'/events/{target}/register', data={'notes': ''}))
+
+    def sees_registration():
+        response = user.get('/users/dashboard')
+        assert f'/events/{target}"' in response.get_data(as_text=True), 'registration missing after write'
+        return response
+    step('same user, right after', primary_only, sees_registration)
+
+    with app.app_context():
+        fresh = db.session.get(Event, target).registration_count
+
+    def stale_count():
+        response = visitor.get(f'/api/v1/events/{target}?fields=registration_count')
+        assert response.get_json()['data']['registration_count'] == fresh - 1, 'replica is not lagging?'
+        return response
+    step('another visitor', replica_only, stale_count)
+
+    time.sleep(STICKY_SECONDS)
+    sync_sqlite_replicas(app)
+    step('after the sticky window', replica_only, sees_registration)
+    print("Routing OK")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,358 @@
+"""
+Route benchmark suite.
+
+Times every route of the events, users and api blueprints through the Flask test
+client against the current DATABASE_URL, which is usually a dataset built
+with `flask seed-scale-data`, and writes machine-readable JSON so results
+can be diffed between commits.
+
+Usage:
+    DATABASE_URL=sqlite:///scale.db python benchmarks/route_benchmark.py --repeat 20 --output bench.json
+    python benchmarks/route_benchmark.py --seed-users 2000 --seed-events 500 --seed-registrations 50000
+"""
+
+import argparse
+import io
+import json
+import logging
+import os
+import platform
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+SERVER_TIMING_QUERIES = re.compile(r'desc="(\d+) queries"')
+
+# Long-lived responses timed by their own benchmark rather than per request
+COVERED_ELSEWHERE = {
+    'api.availability_stream': 'benchmarks/sse_fanout.py',
+}
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], text=True,
+                                       cwd=os.path.dirname(os.path.abspath(__file__)),
+                                       stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def pick_samples(db):
+    """Choose representative ids from the dataset"""
+    from models import User, Event, Registration
+    from pagination import encode_cursor
+    from calendars import feed_token
+
+    hot_event = db.session.query(Event).order_by(Event.registration_count.desc()).first()
+    typical_event = (db.session.query(Event)
+                     .filter(Event.is_active.is_(True), Event.max_attendees.is_(None),
+                             Event.registration_deadline.is_(None))
+                     .order_by(Event.id).first()) or hot_event
+    busiest_organizer_id = (db.session.query(Event.organizer_id)
+                            .group_by(Event.organizer_id)
+                            .order_by(db.func.count(Event.id).desc()).limit(1).scalar())
+    busiest_attendee_id = (db.session.query(Registration.user_id)
+                           .group_by(Registration.user_id)
+                           .order_by(db.func.count(Registration.id).desc()).limit(1).scalar())
+    free_attendee = (db.session.query(User).filter(User.role == 'attendee')
+                     .filter(~User.registrations.any(Registration.event_id == typical_event.id))
+                     .order_by(User.id).first())
+    attendee = db.session.get(User, busiest_attendee_id)
+    # Where page 100 of the hot event's roster starts
+    deep = (db.session.query(Registration.registered_at, Registration.id)
+            .filter(Registration.event_id == hot_event.id)
+            .order_by(Registration.registered_at, Registration.id).offset(99 * 50 - 1).first())
+    return {
+        'hot_event': hot_event.id,
+        'hot_event_deep_cursor': encode_cursor(deep, 'next') if deep else None,
+        'hot_event_organizer': db.session.get(User, hot_event.organizer_id).username,
+        'typical_event': typical_event.id,
+        'typical_event_organizer': db.session.get(User, typical_event.organizer_id).username,
+        'organizer': db.session.get(User, busiest_organizer_id).username,
+        'organizer_id': busiest_organizer_id,
+        'attendee': attendee.username,
+        'attendee_feed': f'/events/calendar/users/{attendee.id}/{feed_token(attendee.id)}.ics',
+        'free_attendee': free_attendee.username,
+    }
+
+
+def event_form(event_title='Benchmark event', **overrides):
+    data = {'title': event_title, 'description': 'Created by the route benchmark',
+            'start_datetime': '2031-01-01T10:00', 'end_datetime': '2031-01-01T12:00',
+            'location': 'Benchmark venue', 'max_attendees': '', 'registration_deadline': '',
+            'event_type': 'workshop', 'is_active': 'y'}
+    data.update(overrides)
+    return data
+
+
+def build_cases(samples):
+    """(name, endpoint, client, method, url, data, expected_status) for every route"""
+    hot, typical = samples['hot_event'], samples['typical_event']
+    week = datetime.utcnow().isocalendar()
+    deep_page = f"?cursor={samples['hot_event_deep_cursor']}" if samples['hot_event_deep_cursor'] else ''
+    cases = [
+        ('list_events', 'events.list_events', 'anon', 'GET', '/events/', None, 200),
+        ('list_events type filter', 'events.list_events', 'anon', 'GET', '/events/?type=workshop', None, 200),
+        ('list_events legacy page 50', 'events.list_events', 'anon', 'GET', '/events/?page=50', None, 200),
+        ('list_events search', 'events.list_events', 'anon', 'GET', '/events/?search=python+summit', None, 200),
+        ('event_detail hot anon', 'events.event_detail', 'anon', 'GET', f'/events/{hot}', None, 200),
+        ('event_detail hot attendee', 'events.event_detail', 'attendee', 'GET', f'/events/{hot}', None, 200),
+        ('create_event form', 'events.create_event', 'organizer', 'GET', '/events/create', None, 200),
+        ('edit_event form', 'events.edit_event', 'typical_owner', 'GET', f'/events/{typical}/edit', None, 200),
+        ('register_for_event form', 'events.register_for_event', 'free_attendee', 'GET',
+         f'/events/{typical}/register', None, 200),
+        ('organizer_dashboard', 'events.organizer_dashboard', 'organizer', 'GET',
+         '/events/organizer/dashboard', None, 200),
+        ('event_attendees hot', 'events.event_attendees', 'hot_owner', 'GET', f'/events/{hot}/attendees', None, 200),
+        ('event_attendees hot deep page', 'events.event_attendees', 'hot_owner', 'GET',
+         f'/events/{hot}/attendees{deep_page}', None, 200),
+        ('registration_status unknown token', 'events.registration_status', 'attendee', 'GET',
+         f'/events/{typical}/register/unknown', None, 404),
+        ('calendar_month', 'events.calendar_month', 'anon', 'GET', '/events/calendar', None, 200),
+        ('calendar_week', 'events.calendar_week', 'anon', 'GET',
+         f'/events/calendar/{week[0]}/week/{week[1]}', None, 200),
+        ('organizer_feed', 'events.organizer_feed', 'anon', 'GET',
+         f"/events/calendar/organizers/{samples['organizer_id']}.ics", None, 200),
+        ('user_feed', 'events.user_feed', 'anon', 'GET', samples['attendee_feed'], None, 200),
+        ('export_attendees csv', 'events.export_attendees', 'typical_owner', 'GET',
+         f'/events/{typical}/attendees/export.csv', None, 200),
+        ('login form', 'users.login', 'anon', 'GET', '/users/login', None, 200),
+        ('register form', 'users.register', 'anon', 'GET', '/users/register', None, 200),
+        ('profile', 'users.profile', 'attendee', 'GET', '/users/profile', None, 200),
+        ('edit_profile form', 'users.edit_profile', 'attendee', 'GET', '/users/profile/edit', None, 200),
+        ('dashboard', 'users.dashboard', 'attendee', 'GET', '/users/dashboard', None, 200),
+        ('api list_events', 'api.list_events', 'anon', 'GET', '/api/v1/events', None, 200),
+        ('api list_events search', 'api.list_events', 'anon', 'GET',
+         '/api/v1/events?search=python+summit&fields=id,title', None, 200),
+        ('api batch_events', 'api.batch_events', 'anon', 'GET',
+         f'/api/v1/events/batch?ids={hot},{typical}&fields=id,title,organizer_name,available_spots', None, 200),
+        ('api event_detail', 'api.event_detail', 'anon', 'GET', f'/api/v1/events/{hot}', None, 200),
+        ('api event_availability', 'api.event_availability', 'anon', 'GET',
+         f'/api/v1/events/{hot}/availability', None, 200),
+        ('api my_registrations', 'api.my_registrations', 'attendee', 'GET', '/api/v1/me/registrations', None, 200),
+    ]
+    return cases
+
+
+def timed(client, method, url, data=None, **kwargs):
+    started = time.perf_counter()
+    response = client.open(url, method=method, data=data, **kwargs)
+    body = response.get_data()
+    elapsed = (time.perf_counter() - started) * 1000
+    match = SERVER_TIMING_QUERIES.search(response.headers.get('Server-Timing', ''))
+    return response, elapsed, int(match.group(1)) if match else None, len(body)
+
+
+def summarize(name, endpoint, method, url, samples, statuses, queries, size):
+    ordered = sorted(samples)
+    return {
+        'name': name, 'endpoint': endpoint, 'method': method, 'path': url,
+        'runs': len(samples), 'statuses': sorted(set(statuses)),
+        'median_ms': round(statistics.median(ordered), 3),
+        'p95_ms': round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 3),
+        'min_ms': round(ordered[0], 3),
+        'max_ms': round(ordered[-1], 3),
+        'queries': queries,
+        'bytes': size,
+    }
+
+
+def run_case(client, name, endpoint, method, url, data, expected, repeat):
+    timed(client, method, url, data)  # warm up caches and templates
+    samples, statuses = [], []
+    queries = size = None
+    for _ in range(repeat):
+        response, elapsed, queries, size = timed(client, method, url, data)
+        samples.append(elapsed)
+        statuses.append(response.status_code)
+    result = summarize(name, endpoint, method, url, samples, statuses, queries, size)
+    result['ok'] = all(status == expected for status in statuses)
+    return result
+
+
+def run_write_cases(clients, samples, repeat):
+    """Mutating routes, each paired with its inverse so the dataset is unchanged"""
+    from extensions import db
+    from models import Event
+
+    results = []
+    typical = samples['typical_event']
+    organizer, attendee, owner = clients['organizer'], clients['free_attendee'], clients['typical_owner']
+
+    pairs = {'create_event': [], 'delete_event': [], 'register_for_event': [], 'unregister_from_event': [],
+             'edit_event': [], 'bulk_import': [], 'login': [], 'logout': [], 'register': []}
+    statuses = {key: [] for key in pairs}
+    queries = {}
+    for i in range(repeat):
+        response, ms, q, _ = timed(organizer, 'POST', '/events/create', event_form(f'Benchmark event {i}'))
+        pairs['create_event'].append(ms); statuses['create_event'].append(response.status_code)
+        queries['create_event'] = q
+        new_id = int(response.headers['Location'].rstrip('/').rsplit('/', 1)[-1])
+        response, ms, q, _ = timed(organizer, 'POST', f'/events/{new_id}/delete')
+        pairs['delete_event'].append(ms); statuses['delete_event'].append(response.status_code)
+        queries['delete_event'] = q
+
+        response, ms, q, _ = timed(attendee, 'POST', f'/events/{typical}/register', {'notes': 'bench'})
+        pairs['register_for_event'].append(ms); statuses['register_for_event'].append(response.status_code)
+        queries['register_for_event'] = q
+        response, ms, q, _ = timed(attendee, 'POST', f'/events/{typical}/unregister')
+        pairs['unregister_from_event'].append(ms); statuses['unregister_from_event'].append(response.status_code)
+        queries['unregister_from_event'] = q
+
+        with clients['app'].app_context():
+            event = db.session.get(Event, typical)
+            form = event_form(event.title, description=event.description or '', location=event.location,
+                              start_datetime=event.start_datetime.strftime('%Y-%m-%dT%H:%M'),
+                              end_datetime=event.end_datetime.strftime('%Y-%m-%dT%H:%M'),
+                              max_attendees=event.max_attendees or '', event_type=event.event_type,
+                              registration_deadline='')
+        response, ms, q, _ = timed(owner, 'POST', f'/events/{typical}/edit', form)
+        pairs['edit_event'].append(ms); statuses['edit_event'].append(response.status_code)
+        queries['edit_event'] = q
+
+        csv_body = 'title,start_datetime,end_datetime,location,event_type\n' + ''.join(
+            f'Imported benchmark {i}-{n},2031-02-01T10:00,2031-02-01T11:00,Import venue,meeting\n'
+            for n in range(10))
+        response, ms, q, _ = timed(organizer, 'POST', '/events/import/events',
+                                   {'file': (io.BytesIO(csv_body.encode()), 'events.csv')},
+                                   content_type='multipart/form-data')
+        pairs['bulk_import'].append(ms); statuses['bulk_import'].append(response.status_code)
+        queries['bulk_import'] = q
+
+        scratch = clients['app'].test_client()
+        response, ms, q, _ = timed(scratch, 'POST', '/users/login',
+                                   {'username': samples['attendee'], 'password': clients['password']})
+        pairs['login'].append(ms); statuses['login'].append(response.status_code)
+        queries['login'] = q
+        response, ms, q, _ = timed(scratch, 'GET', '/users/logout')
+        pairs['logout'].append(ms); statuses['logout'].append(response.status_code)
+        queries['logout'] = q
+
+        response, ms, q, _ = timed(clients['app'].test_client(), 'POST', '/users/register', {
+            'username': f'bench_signup_{i}_{int(time.time() * 1000)}', 'email': f'signup{i}_{int(time.time() * 1000)}@example.com',
+            'first_name': 'Bench', 'last_name': 'Signup', 'role': 'attendee',
+            'password': 'bench-password', 'confirm_password': 'bench-password'})
+        pairs['register'].append(ms); statuses['register'].append(response.status_code)
+        queries['register'] = q
+
+    with clients['app'].app_context():
+        # Undo the imported events and sign-ups
+        from models import User
+        Event.query.filter(Event.title.like('Imported benchmark %')).delete(synchronize_session=False)
+        User.query.filter(User.username.like('bench_signup_%')).delete(synchronize_session=False)
+        db.session.commit()
+
+    endpoints = {'create_event': ('events.create_event', 'POST', '/events/create'),
+                 'delete_event': ('events.delete_event', 'POST', '/events/<id>/delete'),
+                 'register_for_event': ('events.register_for_event', 'POST', f'/events/{typical}/register'),
+                 'unregister_from_event': ('events.unregister_from_event', 'POST', f'/events/{typical}/unregister'),
+                 'edit_event': ('events.edit_event', 'POST', f'/events/{typical}/edit'),
+                 'bulk_import': ('events.bulk_import', 'POST', '/events/import/events'),
+                 'login': ('users.login', 'POST', '/users/login'),
+                 'logout': ('users.logout', 'GET', '/users/logout'),
+                 'register': ('users.register', 'POST', '/users/register')}
+    for key, timings in pairs.items():
+        endpoint, method, url = endpoints[key]
+        result = summarize(f'{key} (write)', endpoint, method, url, timings, statuses[key], queries.get(key), None)
+        # Every write redirects on success; a 200 means the form was redisplayed
+        result['ok'] = all(status == (200 if key == 'bulk_import' else 302) for status in statuses[key])
+        results.append(result)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=10)
+    parser.add_argument('--output', help='write JSON results here (default: stdout)')
+    parser.add_argument('--seed-users', type=int, help='build a fresh dataset of this size first')
+    parser.add_argument('--seed-events', type=int, default=500)
+    parser.add_argument('--seed-registrations', type=int, default=50_000)
+    args = parser.parse_args()
+
+    if 'DATABASE_URL' not in os.environ:
+        if not args.seed_users:
+            parser.error('set DATABASE_URL to a seeded database or pass --seed-users')
+        os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'routes.db')}"
+    # Query counts are read from the Server-Timing header
+    os.environ['SQL_INSTRUMENTATION'] = '1'
+
+    from main import app
+    from extensions import db
+    from scale_data import generate, DEFAULT_PASSWORD
+
+    # Per-request debug logging would dominate the timings
+    logging.getLogger().setLevel(logging.WARNING)
+
+    app.config['WTF_CSRF_ENABLED'] = False
+    with app.app_context():
+        if args.seed_users:
+            generate(users=args.seed_users, events=args.seed_events, registrations=args.seed_registrations,
+                     echo=lambda message: print(message, file=sys.stderr))
+        samples = pick_samples(db)
+        dataset = {
+            'users': db.session.execute(db.text('SELECT COUNT(*) FROM users')).scalar(),
+            'events': db.session.execute(db.text('SELECT COUNT(*) FROM events')).scalar(),
+            'registrations': db.session.execute(db.text('SELECT COUNT(*) FROM registrations')).scalar(),
+        }
+
+    def logged_in(username):
+        client = app.test_client()
+        client.post('/users/login', data={'username': username, 'password': DEFAULT_PASSWORD})
+        return client
+
+    clients = {
+        'app': app,
+        'password': DEFAULT_PASSWORD,
+        'anon': app.test_client(),
+        'organizer': logged_in(samples['organizer']),
+        'attendee': logged_in(samples['attendee']),
+        'free_attendee': logged_in(samples['free_attendee']),
+        'hot_owner': logged_in(samples['hot_event_organizer']),
+        'typical_owner': logged_in(samples['typical_event_organizer']),
+    }
+
+    results = []
+    for name, endpoint, role, method, url, data, expected in build_cases(samples):
+        results.append(run_case(clients[role], name, endpoint, method, url, data, expected, args.repeat))
+        print(f"{name:<34}{results[-1]['median_ms']:>10.2f} ms  queries={results[-1]['queries']}", file=sys.stderr)
+    for result in run_write_cases(clients, samples, args.repeat):
+        results.append(result)
+        print(f"{result['name']:<34}{result['median_ms']:>10.2f} ms  queries={result['queries']}", file=sys.stderr)
+
+    covered = {result['endpoint'] for result in results}
+    blueprint_endpoints = {rule.endpoint for rule in app.url_map.iter_rules()
+                           if rule.endpoint.split('.')[0] in ('events', 'users', 'api')}
+    missing = sorted(blueprint_endpoints - covered - set(COVERED_ELSEWHERE))
+    if missing:
+        print(f"Routes without a benchmark: {', '.join(missing)}", file=sys.stderr)
+
+    report = {
+        'revision': git_revision(),
+        'timestamp': datetime.utcnow().isoformat() + 'Z',
+        'python': platform.python_version(),
+        'database': app.config['SQLALCHEMY_DATABASE_URI'].split('://', 1)[0],
+        'dataset': dataset,
+        'samples': samples,
+        'repeat': args.repeat,
+        'uncovered_endpoints': missing,
+        'results': results,
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+    # A route added without a case fails the suite, like a failing case
+    sys.exit(0 if all(result['ok'] for result in results) and not missing else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+"""
+Benchmark event search: LIKE '%term%' scan versus the full-text index.
+
+Seeds a throwaway database with --events synthetic events (100k by default)
+and times the list_events search query through both backends for a set of
+search terms, including the prefixes produced while a user is typing.
+
+Usage:
+    python benchmarks/search_benchmark.py --events 100000 --repeat 5
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Realistic-ish corpus: a few common topic words plus a long Zipf tail of
+# rarer words, so most search terms match a small fraction of events
+TOPICS = (
+    'python data cloud security startup design leadership marketing mobile web '
+    'analytics blockchain devops machine learning summit meetup growth product '
+    'finance health education robotics quantum privacy community open source'
+).split()
+SYLLABLES = ['ka', 'lo', 'mi', 'ren', 'tor', 'vi', 'sha', 'pel', 'dor', 'qu', 'nex', 'bri']
+TAIL = sorted({a + b + c for a in SYLLABLES for b in SYLLABLES for c in SYLLABLES})
+VOCABULARY = TOPICS + TAIL
+WEIGHTS = [1.0 / (rank + 1) for rank in range(len(VOCABULARY))]
+
+TERMS = ['py', 'python', 'machine learning', 'quantum privacy', 'kalo', 'kalomi', 'nonexistentword']
+
+
+def seed(db, Event, User, count, batch=5000):
+    """Insert count synthetic events with random titles and descriptions"""
+    rng = random.Random(42)
+    organizer = User(username='bench_organizer', email='bench@bench.test', first_name='Bench',
+                     last_name='Organizer', role='organizer', password_hash='x')
+    db.session.add(organizer)
+    db.session.commit()
+
+    now = datetime.utcnow()
+    for start in range(0, count, batch):
+        rows = []
+        for i in range(start, min(start + batch, count)):
+            begins = now + timedelta(hours=rng.randint(1, 24 * 365))
+            rows.append({
+                'title': ' '.join(rng.choices(VOCABULARY, WEIGHTS, k=4)).title(),
+                'description': ' '.join(rng.choices(VOCABULARY, WEIGHTS, k=25)),
+                'start_datetime': begins,
+                'end_datetime': begins + timedelta(hours=2),
+                'location': 'Benchmark hall',
+                'event_type': rng.choice(['conference', 'workshop', 'seminar', 'meeting']),
+                'is_active': True,
+                'registration_count': 0,
+                'organizer_id': organizer.id,
+            })
+        db.session.execute(db.insert(Event.__table__), rows)
+        db.session.commit()
+
+
+def time_backend(app, backend, terms, repeat):
+    """Return per-term median latency (ms) and hit counts for one backend"""
+    from models import Event
+
+    results = {}
+    with app.test_request_context():
+        for term in terms:
+            samples = []
+            for _ in range(repeat):
+                query = Event.query.filter_by(is_active=True)
+                query = backend.apply(query, term).order_by(Event.start_datetime.asc())
+                started = time.perf_counter()
+                page = query.paginate(page=1, per_page=12, error_out=False)
+                samples.append((time.perf_counter() - started) * 1000)
+            results[term] = (statistics.median(samples), page.total)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--events', type=int, default=100_000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    if 'DATABASE_URL' not in os.environ:
+        os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'search.db')}"
+
+    from main import app
+    from extensions import db
+    from models import Event, User
+    from search import LikeSearchBackend
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        started = time.perf_counter()
+        seed(db, Event, User, args.events)
+        print(f"Seeded {args.events} events in {time.perf_counter() - started:.1f}s")
+
+    fts = app.extensions['event_search']
+    like = time_backend(app, LikeSearchBackend(), TERMS, args.repeat)
+    ranked = time_backend(app, fts, TERMS, args.repeat)
+
+    print(f"\n{'term':<20}{'LIKE ms':>12}{fts.name + ' ms':>24}{'speedup':>10}{'hits (like/fts)':>20}")
+    for term in TERMS:
+        like_ms, like_hits = like[term]
+        fts_ms, fts_hits = ranked[term]
+        speedup = like_ms / fts_ms if fts_ms else float('inf')
+        print(f"{term:<20}{like_ms:>12.2f}{fts_ms:>24.2f}{speedup:>9.1f}x{like_hits:>10}/{fts_hits}")
+
+
+if __name__ == '__main__':
+    main()
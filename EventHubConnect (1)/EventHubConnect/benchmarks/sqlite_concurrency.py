@@ -0,0 +1,148 @@
+"""
+Mixed read/write load on one SQLite file from several worker processes.
+
+Plays --workers processes (like gunicorn workers) with --threads threads
+each for --seconds. Every thread is a signed-in attendee; --write-share of
+its requests register for or unregister from an open event, the rest read
+/events/ or the event API. Run once per SQLITE_PROFILE, each on a fresh
+copy of the same database (WAL mode is stored in the file).
+
+Reported per profile: requests/s, read and write p50/p99, server errors
+("database is locked" surfaces as 500s) and the mean pool checkout time.
+
+Usage:
+    python benchmarks/sqlite_concurrency.py --workers 4 --threads 4 --seconds 10
+"""
+
+import argparse
+import json
+import logging
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+READS = ['/events/', '/api/v1/events', '/api/v1/events?type=workshop']
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))] if ordered else 0.0
+
+
+def child(args):
+    """One worker process: time requests until the deadline and print them as JSON"""
+    from main import app
+    from scale_data import DEFAULT_PASSWORD
+    from pooling import pool_metrics
+    logging.disable(logging.CRITICAL)
+    app.config['WTF_CSRF_ENABLED'] = False
+    events = [int(event_id) for event_id in args.events.split(',')]
+
+    clients = []
+    for index in range(args.threads):
+        client = app.test_client()
+        client.post('/users/login', data={'username': f'user{args.first_user + index}', 'password': DEFAULT_PASSWORD})
+        clients.append(client)
+
+    results = {'read': [], 'write': [], 'errors': 0}
+    lock = threading.Lock()
+
+    def run(client, seed):
+        rng = random.Random(seed)
+        registered = set()
+        time.sleep(max(0.0, args.start_at - time.time()))
+        while time.time() < args.start_at + args.seconds:
+            if rng.random() < args.write_share:
+                kind, event_id = 'write', rng.choice(events)
+                action = 'unregister' if event_id in registered else 'register'
+                registered.symmetric_difference_update({event_id})
+                started = time.perf_counter()
+                response = client.post(f'/events/{event_id}/{action}', data={'notes': ''})
+            else:
+                kind = 'read'
+                started = time.perf_counter()
+                response = client.get(rng.choice(READS))
+            elapsed = (time.perf_counter() - started) * 1000
+            with lock:
+                results[kind].append(elapsed)
+                results['errors'] += response.status_code >= 500
+
+    threads = [threading.Thread(target=run, args=(client, args.first_user + index))
+               for index, client in enumerate(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    pools = pool_metrics(app).get('primary', {})
+    results['checkouts'] = pools.get('checkouts', 0)
+    results['checkout_ms'] = pools.get('checkout_ms_total', 0.0)
+    print(json.dumps(results))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--write-share', type=float, default=0.2)
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--events', help=argparse.SUPPRESS)
+    parser.add_argument('--first-user', type=int, help=argparse.SUPPRESS)
+    parser.add_argument('--start-at', type=float, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        return child(args)
+
+    workdir = tempfile.mkdtemp()
+    seed_path = os.path.join(workdir, 'seed.db')
+    os.environ.update(DATABASE_URL=f'sqlite:///{seed_path}', SQLITE_PROFILE='plain',
+                      CACHE_TYPE='null', SQL_INSTRUMENTATION='1')
+    from datetime import datetime
+    from main import app
+    from extensions import db
+    from models import Event
+    from scale_data import generate
+    logging.getLogger().setLevel(logging.WARNING)
+    with app.app_context():
+        generate(users=1000, events=500, registrations=20000, echo=lambda _: None)
+        events = [event_id for (event_id,) in db.session.query(Event.id).filter(
+            Event.is_active.is_(True), Event.max_attendees.is_(None), Event.registration_deadline.is_(None),
+            Event.start_datetime > datetime.utcnow()).limit(50)]
+        db.engine.dispose()
+    # Attendees only; the first 5% of generated users are organizers
+    first_user = 100
+
+    print(f"{'profile':<8}{'req/s':>8}{'read p50':>10}{'read p99':>10}{'write p50':>11}"
+          f"{'write p99':>11}{'errors':>8}{'checkout ms':>13}")
+    for profile in ('plain', 'tuned'):
+        path = os.path.join(workdir, f'{profile}.db')
+        shutil.copy(seed_path, path)
+        env = dict(os.environ, DATABASE_URL=f'sqlite:///{path}', SQLITE_PROFILE=profile)
+        start_at = time.time() + 3 + args.threads * 0.3
+        workers = [subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), '--child', '--events', ','.join(map(str, events)),
+             '--first-user', str(first_user + worker * args.threads), '--threads', str(args.threads),
+             '--seconds', str(args.seconds), '--write-share', str(args.write_share), '--start-at', str(start_at)],
+            env=env, stdout=subprocess.PIPE, text=True) for worker in range(args.workers)]
+        results = [json.loads(worker.communicate()[0].strip().splitlines()[-1]) for worker in workers]
+
+        reads = [sample for result in results for sample in result['read']]
+        writes = [sample for result in results for sample in result['write']]
+        errors = sum(result['errors'] for result in results)
+        checkouts = sum(result['checkouts'] for result in results) or 1
+        checkout_ms = sum(result['checkout_ms'] for result in results) / checkouts
+        print(f"{profile:<8}{(len(reads) + len(writes)) / args.seconds:>8.0f}"
+              f"{percentile(reads, 0.5):>10.2f}{percentile(reads, 0.99):>10.2f}"
+              f"{percentile(writes, 0.5):>11.2f}{percentile(writes, 0.99):>11.2f}"
+              f"{errors:>8}{checkout_ms:>13.3f}")
+
+
+if __name__ == '__main__':
+    main()
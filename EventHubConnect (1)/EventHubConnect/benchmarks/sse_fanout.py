@@ -0,0 +1,108 @@
+"""
+Fan-out check for the live availability feed.
+
+Opens --clients concurrent SSE streams on one event inside a single worker,
+then registers --burst attendees as fast as possible. Reports how long it
+took until every client saw the final seat count, and how many updates each
+client received (coalescing keeps this far below --burst).
+
+Usage:
+    python benchmarks/sse_fanout.py --clients 2000 --burst 200
+"""
+
+import argparse
+import json
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--clients', type=int, default=1000)
+    parser.add_argument('--burst', type=int, default=200)
+    args = parser.parse_args()
+
+    if 'DATABASE_URL' not in os.environ:
+        os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'sse.db')}"
+    os.environ.setdefault('SSE_ENABLED', '1')
+    os.environ.setdefault('SSE_MAX_CLIENTS', str(args.clients + 10))
+    os.environ.setdefault('SSE_STREAM_TIMEOUT', '120')
+
+    from main import app
+    from extensions import db
+    from models import User, Event
+    from registration import reserve_seat
+    from datetime import datetime, timedelta
+
+    logging.getLogger().setLevel(logging.WARNING)
+    threading.stack_size(256 * 1024)
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        organizer = User(username='organizer', email='organizer@sse.test', first_name='O', last_name='Rg',
+                         role='organizer', password_hash='x')
+        db.session.add(organizer)
+        db.session.flush()
+        event = Event(title='Launch event', start_datetime=datetime.utcnow() + timedelta(days=7),
+                      end_datetime=datetime.utcnow() + timedelta(days=7, hours=2), location='Main hall',
+                      max_attendees=args.burst, event_type='conference', organizer_id=organizer.id)
+        db.session.add(event)
+        db.session.execute(db.insert(User.__table__), [
+            {'username': f'fan{i}', 'email': f'fan{i}@sse.test', 'first_name': 'Fan', 'last_name': str(i),
+             'role': 'attendee', 'password_hash': 'x', 'is_active': True} for i in range(args.burst)])
+        db.session.commit()
+        event_id = event.id
+        user_ids = [row[0] for row in db.session.execute(db.select(User.id).where(User.role == 'attendee'))]
+
+    connected = threading.Barrier(args.clients + 1)
+    done_at, updates = [None] * args.clients, [0] * args.clients
+
+    def listen(index):
+        response = app.test_client().get(f'/api/v1/events/availability/stream?ids={event_id}', buffered=False)
+        chunks = iter(response.response)
+        next(chunks), next(chunks)  # retry hint and initial snapshot
+        connected.wait()
+        for chunk in chunks:
+            chunk = chunk.decode()
+            if not chunk.startswith('event:'):
+                continue
+            updates[index] += 1
+            data = json.loads(chunk.split('data: ', 1)[1])
+            if data['registration_count'] == args.burst:
+                done_at[index] = time.perf_counter()
+                break
+        response.close()
+
+    threads = [threading.Thread(target=listen, args=(i,), daemon=True) for i in range(args.clients)]
+    for thread in threads:
+        thread.start()
+    connected.wait()
+    print(f"{args.clients} clients connected; {app.extensions['availability'].clients} subscribed")
+
+    started = time.perf_counter()
+    with app.test_request_context():
+        for user_id in user_ids:
+            reserve_seat(event_id, user_id)
+            app.extensions['availability'].notify()
+    burst_done = time.perf_counter()
+    for thread in threads:
+        thread.join(60)
+
+    latencies = [(at - burst_done) * 1000 for at in done_at if at is not None]
+    print(f"burst of {args.burst} registrations took {(burst_done - started) * 1000:.0f} ms")
+    print(f"{len(latencies)}/{args.clients} clients saw the final count; after the burst: "
+          f"median {statistics.median(latencies):.0f} ms, max {max(latencies):.0f} ms")
+    print(f"updates per client: median {statistics.median(updates):.0f}, max {max(updates)} "
+          f"(for {args.burst} registrations)")
+    return 0 if len(latencies) == args.clients else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
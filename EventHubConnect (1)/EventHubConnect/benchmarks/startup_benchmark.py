@@ -0,0 +1,114 @@
+"""
+Import time and worker boot time.
+
+Measures, as medians over --runs fresh processes:
+  import app      - importing the factory module (should do nothing)
+  import main     - building the app (what a worker without preload_app pays)
+  boot, spawned   - new process until its pool is warm and /readyz says ready
+  boot, forked    - fork of a preloaded master until ready, which is what
+                    gunicorn does for every new worker with preload_app
+
+Usage:
+    python benchmarks/startup_benchmark.py --runs 10
+    DATABASE_URL=postgresql://... python benchmarks/startup_benchmark.py
+"""
+
+import argparse
+import json
+import logging
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+
+IMPORT_SNIPPET = """
+import json, logging, sys, time
+sys.path.insert(0, {root!r})
+started = time.perf_counter()
+import {module}
+print(json.dumps((time.perf_counter() - started) * 1000))
+"""
+
+BOOT_SNIPPET = """
+import json, logging, sys, time
+sys.path.insert(0, {root!r})
+from main import app
+from readiness import warm_pool
+logging.getLogger().setLevel(logging.WARNING)
+warm_pool(app)
+assert app.test_client().get('/readyz').status_code == 200
+print(json.dumps(time.time()))
+"""
+
+
+def run_python(snippet):
+    output = subprocess.run([sys.executable, '-c', snippet], capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def boot_spawned():
+    started = time.time()
+    return (run_python(BOOT_SNIPPET.format(root=ROOT)) - started) * 1000
+
+
+def boot_forked(app):
+    """What gunicorn's post_fork and post_worker_init hooks do in a new worker"""
+    from extensions import db
+    from readiness import warm_pool
+
+    read, write = os.pipe()
+    started = time.perf_counter()
+    pid = os.fork()
+    if pid == 0:
+        os.close(read)
+        with app.app_context():
+            db.engine.dispose(close=False)
+        warm_pool(app)
+        assert app.test_client().get('/readyz').status_code == 200
+        os.write(write, json.dumps((time.perf_counter() - started) * 1000).encode())
+        os._exit(0)
+    os.close(write)
+    with os.fdopen(read) as pipe:
+        elapsed = json.loads(pipe.read())
+    os.waitpid(pid, 0)
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=10)
+    args = parser.parse_args()
+
+    if 'DATABASE_URL' not in os.environ:
+        os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'startup.db')}"
+    os.environ.setdefault('LOG_LEVEL', 'WARNING')
+
+    from main import app
+    from extensions import db
+    from search import install_search
+    logging.getLogger().setLevel(logging.WARNING)
+    with app.app_context():
+        db.create_all()
+    install_search(app)
+    # Preloaded master: nothing may stay connected across the fork
+    with app.app_context():
+        db.engine.dispose()
+
+    results = {
+        'import app': [run_python(IMPORT_SNIPPET.format(root=ROOT, module='app')) for _ in range(args.runs)],
+        'import main': [run_python(IMPORT_SNIPPET.format(root=ROOT, module='main')) for _ in range(args.runs)],
+        'boot, spawned': [boot_spawned() for _ in range(args.runs)],
+        'boot, forked': [boot_forked(app) for _ in range(args.runs)],
+    }
+    print(f"{'':<16}{'median ms':>10}{'max ms':>10}")
+    for name, samples in results.items():
+        print(f"{name:<16}{statistics.median(samples):>10.1f}{max(samples):>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
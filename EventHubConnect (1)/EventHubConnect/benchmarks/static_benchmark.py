@@ -0,0 +1,100 @@
+"""
+Static bytes and requests per page view, with and without the asset build.
+
+Plays a browser with an HTTP cache against the event pages: every local
+/static/ URL in a page is fetched unless the cache holds a fresh copy
+(max-age or immutable), and stale copies are revalidated with If-None-Match.
+Reports requests and body bytes for the first and for a repeat view of
+each page, first serving the files as they are, then after
+`flask build-assets` (fingerprinted names, immutable caching, gzip/brotli).
+
+Usage:
+    python benchmarks/static_benchmark.py
+"""
+
+import logging
+import os
+import re
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+PAGES = ['/', '/events/', '/users/login']
+STATIC_URL = re.compile(r'(?:src|href)="(/static/[^"]+)"')
+
+
+class BrowserCache:
+    """Just enough of a browser HTTP cache: freshness from max-age, revalidation by ETag"""
+
+    def __init__(self, client):
+        self.client = client
+        self.entries = {}  # url -> (expires, etag)
+
+    def fetch(self, url):
+        """Returns (requests made, body bytes received)"""
+        entry = self.entries.get(url)
+        if entry and entry[0] > time.time():
+            return 0, 0
+        headers = {'Accept-Encoding': 'gzip, deflate, br'}
+        if entry and entry[1]:
+            headers['If-None-Match'] = entry[1]
+        response = self.client.get(url, headers=headers)
+        max_age = response.cache_control.max_age if not response.cache_control.no_cache else None
+        self.entries[url] = (time.time() + (max_age or 0), response.headers.get('ETag'))
+        return 1, len(response.get_data())
+
+
+def view(app, cache, page):
+    html = app.test_client().get(page).get_data(as_text=True)
+    totals = [0, 0]
+    for url in dict.fromkeys(STATIC_URL.findall(html)):
+        requests, body = cache.fetch(url)
+        totals[0] += requests
+        totals[1] += body
+    return totals
+
+
+def run(label, app):
+    cache = BrowserCache(app.test_client())
+    for page in PAGES:
+        first = view(app, cache, page)
+        repeat = view(app, cache, page)
+        print(f"{label:<10}{page:<14}{first[0]:>10}{first[1]:>12}{repeat[0]:>10}{repeat[1]:>12}")
+
+
+def main():
+    workdir = tempfile.mkdtemp()
+    os.environ.setdefault('DATABASE_URL', f"sqlite:///{os.path.join(workdir, 'static.db')}")
+    os.environ['CACHE_TYPE'] = 'null'
+
+    from app import create_app
+    from extensions import db
+    from assets import build_assets, BUILD_DIR
+    logging.getLogger().setLevel(logging.WARNING)
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+
+    dist = os.path.join(app.static_folder, BUILD_DIR)
+    existing_build = os.path.exists(dist)
+    backup = os.path.join(workdir, 'dist') if existing_build else None
+    if existing_build:
+        shutil.move(dist, backup)
+
+    print(f"{'assets':<10}{'page':<14}{'1st reqs':>10}{'1st bytes':>12}{'rpt reqs':>10}{'rpt bytes':>12}")
+    try:
+        run('plain', create_app())
+        build_assets(app.static_folder)
+        run('built', create_app())
+    finally:
+        shutil.rmtree(dist, ignore_errors=True)
+        if existing_build:
+            shutil.move(backup, dist)
+
+
+if __name__ == '__main__':
+    main()
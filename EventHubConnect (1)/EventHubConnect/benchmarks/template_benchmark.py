@@ -0,0 +1,90 @@
+"""
+Render time of the event list page.
+
+Each configuration runs in a fresh process (a new worker), so the first
+request includes loading and compiling the templates. Reported per
+configuration: that first request, then the median and p95 of --requests
+warm renders of /events/ (12 cards). The response cache is off throughout,
+so every request renders.
+
+Configurations:
+    no caches        - bytecode cache and card fragments disabled
+    bytecode (cold)  - empty bytecode cache directory, filled by this run
+    bytecode (warm)  - the directory filled by the previous run
+    bytecode + cards - warm bytecode cache and card fragment cache
+
+Usage:
+    python benchmarks/template_benchmark.py --requests 500
+"""
+
+import argparse
+import json
+import logging
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))] if ordered else 0.0
+
+
+def child(requests):
+    """Time renders in this process and print them as JSON"""
+    from main import app
+
+    logging.getLogger().setLevel(logging.WARNING)
+    client = app.test_client()
+    started = time.perf_counter()
+    assert client.get('/events/').status_code == 200
+    first = (time.perf_counter() - started) * 1000
+    samples = []
+    for _ in range(requests):
+        started = time.perf_counter()
+        client.get('/events/')
+        samples.append((time.perf_counter() - started) * 1000)
+    print(json.dumps({'first': first, 'p50': statistics.median(samples), 'p95': percentile(samples, 0.95)}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=300)
+    parser.add_argument('--events', type=int, default=2000)
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        return child(args.requests)
+
+    workdir = tempfile.mkdtemp()
+    env = dict(os.environ, CACHE_TYPE='null', SQL_INSTRUMENTATION='0',
+               DATABASE_URL=os.environ.get('DATABASE_URL', f"sqlite:///{os.path.join(workdir, 'templates.db')}"))
+    os.environ.update(env)
+    from main import app
+    from scale_data import generate
+    logging.getLogger().setLevel(logging.WARNING)
+    with app.app_context():
+        generate(users=1000, events=args.events, registrations=args.events * 10, echo=lambda _: None)
+
+    bytecode_dir = os.path.join(workdir, 'jinja_cache')
+    configurations = [
+        ('no caches', {'JINJA_BYTECODE_CACHE': '', 'FRAGMENT_CACHE_MAX_ENTRIES': '0'}),
+        ('bytecode (cold)', {'JINJA_BYTECODE_CACHE': bytecode_dir, 'FRAGMENT_CACHE_MAX_ENTRIES': '0'}),
+        ('bytecode (warm)', {'JINJA_BYTECODE_CACHE': bytecode_dir, 'FRAGMENT_CACHE_MAX_ENTRIES': '0'}),
+        ('bytecode + cards', {'JINJA_BYTECODE_CACHE': bytecode_dir}),
+    ]
+    print(f"{'configuration':<20}{'first ms':>10}{'p50 ms':>9}{'p95 ms':>9}")
+    for name, overrides in configurations:
+        output = subprocess.run([sys.executable, os.path.abspath(__file__), '--child', '--requests', str(args.requests)],
+                                env=dict(env, **overrides), capture_output=True, text=True, check=True).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        print(f"{name:<20}{result['first']:>10.1f}{result['p50']:>9.2f}{result['p95']:>9.2f}")
+
+
+if __name__ == '__main__':
+    main()
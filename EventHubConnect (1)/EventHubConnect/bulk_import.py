@@ -0,0 +1,278 @@
+"""
+Bulk import of events and registrations.
+
+Rows (CSV, a JSON array, or NDJSON) are validated with the same rules as
+EventForm / RegistrationForm and written with executemany inserts in
+configurable chunks. Invalid rows are reported individually and never abort
+the rest of the import. Each chunk is committed on its own, so when the
+upload itself turns out to be unreadable part-way, the report passed in still
+records the rows already imported.
+"""
+
+import csv
+import io
+import json
+from collections import defaultdict
+from sqlalchemy.exc import IntegrityError
+from werkzeug.datastructures import MultiDict
+from extensions import db
+from forms import EventForm, RegistrationForm
+from models import User, Event, Registration
+
+DEFAULT_CHUNK_SIZE = 1000
+
+EVENT_FIELDS = ('title', 'description', 'start_datetime', 'end_datetime', 'location', 'venue_details',
+                'max_attendees', 'registration_deadline', 'event_type', 'is_active')
+
+
+class ImportReport:
+    """Outcome of an import: rows written and per-row errors"""
+
+    def __init__(self):
+        self.inserted = 0
+        self.errors = []
+
+    def add_error(self, row_number, messages):
+        self.errors.append({'row': row_number, 'errors': messages})
+
+    def to_dict(self):
+        return {'inserted': self.inserted, 'failed': len(self.errors), 'errors': self.errors}
+
+
+def _objects(chunk, report):
+    """The rows of a chunk that are objects; anything else (e.g. a bare JSON value) is reported"""
+    rows = []
+    for number, row in chunk:
+        if isinstance(row, dict):
+            rows.append((number, row))
+        else:
+            report.add_error(number, {'row': ['Expected an object']})
+    return rows
+
+
+def read_rows(stream, fmt):
+    """Parse an uploaded text stream into row dicts"""
+    if fmt == 'csv':
+        return csv.DictReader(stream)
+    if fmt == 'ndjson':
+        return (json.loads(line) for line in stream if line.strip())
+    if fmt == 'json':
+        data = json.load(stream)
+        if not isinstance(data, list):
+            raise ValueError('JSON import must be an array of objects')
+        return iter(data)
+    raise ValueError(f'Unsupported import format: {fmt}')
+
+
+def open_text(file_storage):
+    """Wrap an uploaded file as a text stream"""
+    return io.TextIOWrapper(file_storage.stream, encoding='utf-8-sig', newline='')
+
+
+def _form_data(row, defaults=None):
+    """Convert a parsed row into form data the way a browser would submit it"""
+    data = dict(defaults or {})
+    for key, value in row.items():
+        if value is None:
+            continue
+        if isinstance(value, bool):
+            value = 'y' if value else ''
+        data[key] = str(value)
+    # Accept ISO timestamps with seconds, the form expects %Y-%m-%dT%H:%M
+    for key in ('start_datetime', 'end_datetime', 'registration_deadline'):
+        if data.get(key):
+            data[key] = data[key].replace(' ', 'T')[:16]
+    return MultiDict(data)
+
+
+def _validate(form_class, row, defaults=None):
+    form = form_class(formdata=_form_data(row, defaults), meta={'csrf': False})
+    if form.validate():
+        return form, None
+    return None, {field: list(errors) for field, errors in form.errors.items()}
+
+
+def _chunks(rows, chunk_size):
+    if chunk_size < 1:
+        raise ValueError('chunk_size must be at least 1')
+    chunk = []
+    for number, row in enumerate(rows, start=1):
+        chunk.append((number, row))
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _claim_seats(event_id, wanted):
+    """Add up to wanted registrations to an event's counter without passing max_attendees.
+
+    Returns how many fit. Like the intake queue's claims, the UPDATE itself
+    checks the capacity, so concurrent sign-ups cannot overfill the event.
+    """
+    table = Event.__table__
+    while wanted > 0:
+        claimed = db.session.execute(
+            db.update(table)
+            .where(table.c.id == event_id)
+            .where(db.or_(table.c.max_attendees.is_(None),
+                          table.c.registration_count + wanted <= table.c.max_attendees))
+            .values(registration_count=table.c.registration_count + wanted)
+        ).rowcount
+        if claimed:
+            return wanted
+        # Seats were taken since the chunk was read; retry with what is left
+        row = db.session.execute(
+            db.select(table.c.max_attendees, table.c.registration_count).where(table.c.id == event_id)
+        ).first()
+        if row is None:
+            return 0
+        if row.max_attendees is not None:
+            wanted = min(wanted, row.max_attendees - row.registration_count)
+    return 0
+
+
+def _insert_each(entries, report):
+    """Insert (row number, registration) entries one at a time, each with its own commit.
+
+    The fallback when a chunk loses a unique-constraint race to a concurrent
+    sign-up: the duplicates are reported per row and the rest still go in.
+    Returns how many were inserted.
+    """
+    inserted = 0
+    for number, record in entries:
+        if not _claim_seats(record['event_id'], 1):
+            db.session.rollback()
+            report.add_error(number, {'event_id': ['Event is full']})
+            continue
+        try:
+            db.session.execute(db.insert(Registration.__table__), record)
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+            report.add_error(number, {'user': ['Already registered for this event']})
+            continue
+        inserted += 1
+    return inserted
+
+
+def import_events(rows, organizer_id, chunk_size=DEFAULT_CHUNK_SIZE, report=None):
+    """Validate and insert events owned by organizer_id"""
+    report = ImportReport() if report is None else report
+    for chunk in _chunks(rows, chunk_size):
+        values = []
+        for number, row in _objects(chunk, report):
+            form, errors = _validate(EventForm, row, defaults={'is_active': 'y'})
+            if errors:
+                report.add_error(number, errors)
+                continue
+            record = {field: getattr(form, field).data for field in EVENT_FIELDS}
+            record['organizer_id'] = organizer_id
+            values.append(record)
+
+        if values:
+            db.session.execute(db.insert(Event.__table__), values)
+            db.session.commit()
+            report.inserted += len(values)
+    return report
+
+
+def import_registrations(rows, organizer_id=None, chunk_size=DEFAULT_CHUNK_SIZE, report=None):
+    """Validate and insert registrations, keeping event counters and capacity in step.
+
+    Rows identify the attendee by username or email and the event by event_id.
+    When organizer_id is given, only that organizer's events may be targeted.
+    """
+    report = ImportReport() if report is None else report
+    for chunk in _chunks(rows, chunk_size):
+        chunk = _objects(chunk, report)
+        # Resolve users, events and existing registrations for the whole chunk up front
+        usernames = {row.get('username') for _, row in chunk if row.get('username')}
+        emails = {row.get('email') for _, row in chunk if row.get('email')}
+        event_ids = set()
+        for _, row in chunk:
+            try:
+                event_ids.add(int(row.get('event_id')))
+            except (TypeError, ValueError):
+                pass
+
+        users = {}
+        if usernames or emails:
+            for user_id, username, email in db.session.execute(
+                db.select(User.id, User.username, User.email)
+                .where(User.username.in_(usernames) | User.email.in_(emails))
+            ):
+                users[('username', username)] = user_id
+                users[('email', email)] = user_id
+
+        events = {
+            row.id: row for row in db.session.execute(
+                db.select(Event.id, Event.organizer_id, Event.max_attendees, Event.registration_count)
+                .where(Event.id.in_(event_ids))
+            )
+        }
+        taken = set(db.session.execute(
+            db.select(Registration.user_id, Registration.event_id)
+            .where(Registration.event_id.in_(event_ids))
+            .where(Registration.user_id.in_(set(users.values())))
+        ).tuples()) if users and event_ids else set()
+
+        pending = defaultdict(list)
+        for number, row in chunk:
+            form, errors = _validate(RegistrationForm, {'notes': row.get('notes')})
+            if errors:
+                report.add_error(number, errors)
+                continue
+
+            if row.get('username'):
+                user_id = users.get(('username', row['username']))
+            else:
+                user_id = users.get(('email', row.get('email')))
+            if user_id is None:
+                report.add_error(number, {'user': ['Unknown user']})
+                continue
+
+            try:
+                event = events.get(int(row.get('event_id')))
+            except (TypeError, ValueError):
+                event = None
+            if event is None or (organizer_id is not None and event.organizer_id != organizer_id):
+                report.add_error(number, {'event_id': ['Unknown event']})
+                continue
+
+            if (user_id, event.id) in taken:
+                report.add_error(number, {'user': ['Already registered for this event']})
+                continue
+            if (event.max_attendees is not None
+                    and event.registration_count + len(pending[event.id]) >= event.max_attendees):
+                report.add_error(number, {'event_id': ['Event is full']})
+                continue
+
+            taken.add((user_id, event.id))
+            pending[event.id].append((number, {'user_id': user_id, 'event_id': event.id,
+                                               'notes': form.notes.data or None, 'status': 'registered'}))
+
+        # Core executemany bypasses the per-row counter listeners, so seats are
+        # claimed once per event, re-checking capacity against concurrent writers
+        granted_entries = []
+        refused = []
+        for event_id, entries in pending.items():
+            granted = _claim_seats(event_id, len(entries))
+            granted_entries.extend(entries[:granted])
+            refused.extend(number for number, _ in entries[granted:])
+
+        try:
+            if granted_entries:
+                db.session.execute(db.insert(Registration.__table__),
+                                   [record for _, record in granted_entries])
+            db.session.commit()
+        except IntegrityError:
+            # Someone registered between the duplicate check and the insert
+            db.session.rollback()
+            report.inserted += _insert_each(granted_entries, report)
+        else:
+            report.inserted += len(granted_entries)
+        for number in refused:
+            report.add_error(number, {'event_id': ['Event is full']})
+    return report
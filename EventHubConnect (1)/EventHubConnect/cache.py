@@ -0,0 +1,211 @@
+"""
+Response cache for public event pages.
+
+Rendered pages are stored with a TTL in an in-process LRU (the default) or a
+shared Redis instance (CACHE_TYPE='redis', needs the redis package).
+CACHE_TYPE='null' turns caching off. The in-process cache only sees the
+invalidations of its own worker, so it is for the dev server and single
+process deployments; gunicorn.conf.py picks Redis or no cache when it runs
+several workers.
+
+Invalidation uses versioned tags instead of deleting keys. A cached page
+remembers the version of every tag it was built from, such as 'events' for
+the list, 'event:<id>' for one event, or 'user:<id>' for a name shown on the
+page. invalidate() bumps those versions, so any page built from an older
+version is a miss on its next read.
+
+Pages are keyed by path, query string and viewer ('anon' or 'user:<id>'),
+so per-user content such as registration badges is never served to
+another visitor.
+"""
+
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from urllib.parse import urlencode
+from flask import current_app, g, request, session, make_response
+from flask_login import current_user
+from conditional import apply_validators
+
+
+class MemoryCache:
+    """Thread-safe in-process cache with TTL and LRU eviction"""
+
+    def __init__(self, max_entries=1000, default_timeout=60):
+        self.max_entries = max_entries
+        self.default_timeout = default_timeout
+        self._entries = OrderedDict()
+        # Tag versions are never evicted; losing one could resurrect stale pages
+        self._versions = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, timeout=None):
+        expires = time.monotonic() + (timeout or self.default_timeout)
+        with self._lock:
+            self._entries[key] = (expires, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def get_versions(self, tags):
+        with self._lock:
+            return [self._versions.get(tag, 0) for tag in tags]
+
+    def bump(self, tags):
+        with self._lock:
+            for tag in tags:
+                self._versions[tag] = self._versions.get(tag, 0) + 1
+
+
+class RedisCache:
+    """Cache shared between processes through Redis"""
+
+    def __init__(self, url, prefix='eventhub:', default_timeout=60):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("CACHE_TYPE='redis' requires the redis package")
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+        self.default_timeout = default_timeout
+
+    def get(self, key):
+        value = self.client.get(self.prefix + key)
+        return pickle.loads(value) if value is not None else None
+
+    def set(self, key, value, timeout=None):
+        self.client.set(self.prefix + key, pickle.dumps(value), ex=timeout or self.default_timeout)
+
+    def delete(self, key):
+        self.client.delete(self.prefix + key)
+
+    def clear(self):
+        keys = list(self.client.scan_iter(match=self.prefix + 'page:*'))
+        if keys:
+            self.client.delete(*keys)
+
+    def get_versions(self, tags):
+        if not tags:
+            return []
+        return [int(v or 0) for v in self.client.mget([self.prefix + 'tag:' + tag for tag in tags])]
+
+    def bump(self, tags):
+        pipe = self.client.pipeline()
+        for tag in tags:
+            pipe.incr(self.prefix + 'tag:' + tag)
+        pipe.execute()
+
+
+def init_cache(app):
+    """Create the configured cache backend for this app"""
+    cache_type = app.config.get('CACHE_TYPE', 'memory')
+    timeout = app.config.get('CACHE_DEFAULT_TIMEOUT', 60)
+    if cache_type == 'null':
+        cache = None
+    elif cache_type == 'redis':
+        cache = RedisCache(app.config['CACHE_REDIS_URL'], default_timeout=timeout)
+    elif cache_type == 'memory':
+        cache = MemoryCache(app.config.get('CACHE_MAX_ENTRIES', 1000), default_timeout=timeout)
+    else:
+        raise ValueError(f'Unknown CACHE_TYPE: {cache_type}')
+    app.extensions['response_cache'] = cache
+    return cache
+
+
+def get_cache():
+    return current_app.extensions.get('response_cache')
+
+
+def invalidate(*tags):
+    """Expire every cached page built from any of the given tags"""
+    cache = get_cache()
+    if cache is not None and tags:
+        cache.bump(tags)
+
+
+def invalidate_event(event_id, list_changed=True):
+    """Expire the detail page of an event and, optionally, the event listings"""
+    tags = [f'event:{event_id}']
+    if list_changed:
+        tags.append('events')
+    invalidate(*tags)
+
+
+def add_cache_tags(*tags):
+    """Record tags the page being rendered depends on.
+
+    Call this before loading the data a tag covers: the version is captured
+    here, so a write that lands mid-render makes the stored page a miss.
+    """
+    if 'cache_tags' not in g:
+        return
+    new = [tag for tag in tags if tag not in g.cache_tags]
+    if new:
+        g.cache_tags.update(zip(new, get_cache().get_versions(new)))
+
+
+def _viewer():
+    return f'user:{current_user.id}' if current_user.is_authenticated else 'anon'
+
+
+def _page_key():
+    args = urlencode(sorted(request.args.items(multi=True)))
+    return f'page:{_viewer()}:{request.path}?{args}'
+
+
+def cached_page(timeout=None):
+    """Serve a view from the response cache, storing 200 responses on a miss"""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            cache = get_cache()
+            # Pending flash messages are rendered into (and consumed by) the page
+            if cache is None or request.method not in ('GET', 'HEAD') or '_flashes' in session:
+                return view(*args, **kwargs)
+
+            key = _page_key()
+            entry = cache.get(key)
+            if entry is not None:
+                tags = list(entry['tags'])
+                if cache.get_versions(tags) == [entry['tags'][tag] for tag in tags]:
+                    response = current_app.response_class(entry['body'], status=entry['status'],
+                                                          headers=entry['headers'])
+                    response.headers['X-Cache'] = 'HIT'
+                    return response.make_conditional(request)
+
+            g.cache_tags = {}
+            if current_user.is_authenticated:
+                # The navigation bar shows the viewer's name
+                add_cache_tags(_viewer())
+            response = apply_validators(make_response(view(*args, **kwargs)))
+            tags = g.pop('cache_tags')
+            if response.status_code == 200 and not response.direct_passthrough and '_flashes' not in session:
+                headers = [(name, value) for name, value in response.headers if name.lower() != 'set-cookie']
+                cache.set(key, {'body': response.get_data(), 'status': response.status_code,
+                                'headers': headers, 'tags': tags}, timeout)
+            response.headers['X-Cache'] = 'MISS'
+            return response
+        return wrapper
+    return decorator
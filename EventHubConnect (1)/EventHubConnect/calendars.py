@@ -0,0 +1,185 @@
+"""
+Calendar range queries and iCalendar feeds.
+
+An event overlaps a range [start, end) when it starts before the range ends
+and ends after the range starts. Only the first half of that maps onto an
+index on start_datetime, so on its own it would walk every earlier event.
+The lookup is split instead:
+
+  - events starting at most LONG_EVENT_SPAN before the range start: a
+    bounded range on start_datetime, since anything shorter that overlaps
+    must have started within that window;
+  - the few events flagged is_long_running that started earlier, found
+    through their own (is_long_running, end_datetime) index.
+
+Both halves run as one UNION ALL of ids. The month and week pages, the
+feeds and the API's ?from=&to= are built on overlaps(). Times are naive
+UTC throughout, like the rest of the app, so calendar days are UTC days.
+
+Feeds are polled by calendar clients every few minutes. Each poll first
+reads only (id, updated_at) for the feed's events and answers 304 when the
+client's ETag still matches. On a change, a VEVENT fragment is rendered for
+each event missing from the per-worker fragment cache (keyed by id and
+updated_at); unchanged events are reused as they are.
+"""
+
+import calendar
+import hashlib
+import hmac
+from datetime import date, datetime, timedelta
+from flask import current_app, request, url_for
+from sqlalchemy import and_, select, union_all
+from conditional import not_modified
+from extensions import db
+from models import Event, LONG_EVENT_SPAN
+
+# Feeds cover recent history and the coming two years
+FEED_PAST = timedelta(days=90)
+FEED_FUTURE = timedelta(days=730)
+# Suggested polling interval for calendar clients
+FEED_REFRESH = 'PT15M'
+FEED_CHUNK = 500
+
+
+def overlaps(start, end, *criteria):
+    """Filter for events overlapping [start, end) and matching criteria"""
+    lookback = start - LONG_EVENT_SPAN
+    # The criteria (is_active, organizer_id) narrow the recent half through their
+    # indexes; the long-running half leaves them out so its own index is used
+    recent = select(Event.id).where(
+        *criteria, Event.start_datetime >= lookback, Event.start_datetime < end, Event.end_datetime > start)
+    long_running = select(Event.id).where(
+        Event.is_long_running.is_(True), Event.start_datetime < lookback, Event.end_datetime > start)
+    return and_(Event.id.in_(union_all(recent, long_running)), *criteria)
+
+
+def events_between(start, end, *criteria):
+    """Query of events overlapping [start, end), earliest first"""
+    return Event.query.filter(overlaps(start, end, *criteria)).order_by(Event.start_datetime, Event.id)
+
+
+def last_day(event):
+    """Date of the last day an event runs on; one ending at midnight ends the day before"""
+    end = max(event.end_datetime, event.start_datetime + timedelta(microseconds=1))
+    return (end - timedelta(microseconds=1)).date()
+
+
+def by_day(events, days):
+    """Map each date in days to the events running on it"""
+    placed = {day: [] for day in days}
+    for event in events:
+        day = max(event.start_datetime.date(), days[0])
+        while day <= min(last_day(event), days[-1]):
+            placed[day].append(event)
+            day += timedelta(days=1)
+    return placed
+
+
+def month_weeks(year, month):
+    """Weeks (Monday first) covering a month, as lists of seven dates"""
+    return calendar.Calendar().monthdatescalendar(year, month)
+
+
+def week_days(year, week):
+    """The seven dates of an ISO week; ValueError if there is no such week"""
+    monday = date.fromisocalendar(year, week, 1)
+    return [monday + timedelta(days=offset) for offset in range(7)]
+
+
+def day_range(days):
+    """[start, end) datetimes covering a list of consecutive dates"""
+    start = datetime.combine(days[0], datetime.min.time())
+    return start, start + timedelta(days=len(days))
+
+
+def feed_token(user_id):
+    """Secret part of a user's feed URL; calendar clients cannot sign in"""
+    message = f'calendar-feed:{user_id}'.encode()
+    return hmac.new(current_app.secret_key.encode(), message, hashlib.sha256).hexdigest()[:32]
+
+
+def valid_feed_token(user_id, token):
+    return hmac.compare_digest(feed_token(user_id), token)
+
+
+def _escape(value):
+    return (str(value or '').replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,')
+            .replace('\r\n', '\\n').replace('\n', '\\n').replace('\r', ''))
+
+
+def _fold(line):
+    """Split a content line into 75-octet pieces, never inside a UTF-8 sequence (RFC 5545 3.1)"""
+    pieces, current, size, limit = [], [], 0, 75
+    for char in line:
+        width = len(char.encode())
+        if size + width > limit:
+            pieces.append(''.join(current))
+            current, size, limit = [], 0, 74
+        current.append(char)
+        size += width
+    pieces.append(''.join(current))
+    return '\r\n '.join(pieces) + '\r\n'
+
+
+def _stamp(value):
+    return value.strftime('%Y%m%dT%H%M%SZ')
+
+
+def vevent(event):
+    """iCalendar VEVENT block for one event"""
+    changed = event.updated_at or event.created_at or event.start_datetime
+    lines = [
+        'BEGIN:VEVENT',
+        f'UID:event-{event.id}@{request.host}',
+        f'DTSTAMP:{_stamp(changed)}',
+        f'LAST-MODIFIED:{_stamp(changed)}',
+        f'DTSTART:{_stamp(event.start_datetime)}',
+        f'DTEND:{_stamp(event.end_datetime)}',
+        f'SUMMARY:{_escape(event.title)}',
+        f'LOCATION:{_escape(event.location)}',
+        f'DESCRIPTION:{_escape(event.description)}',
+        f'CATEGORIES:{_escape(event.event_type)}',
+        f"URL:{url_for('events.event_detail', event_id=event.id, _external=True)}",
+        f"STATUS:{'CONFIRMED' if event.is_active else 'CANCELLED'}",
+        'END:VEVENT',
+    ]
+    return ''.join(_fold(line) for line in lines)
+
+
+def feed_response(name, *criteria, private=False):
+    """Conditional iCalendar response for the events matching criteria within the feed window"""
+    now = datetime.utcnow()
+    state = db.session.execute(
+        select(Event.id, Event.updated_at).where(overlaps(now - FEED_PAST, now + FEED_FUTURE, *criteria))
+        .order_by(Event.start_datetime, Event.id)
+    ).all()
+    unchanged = not_modified(name, request.host, [tuple(row) for row in state], private=private)
+    if unchanged:
+        return unchanged
+
+    cache = current_app.extensions.get('fragment_cache')
+    fragments, missing = {}, []
+    for event_id, updated_at in state:
+        fragment = cache.get(f'vevent:{request.host}:{event_id}:{updated_at}') if cache is not None else None
+        if fragment is None:
+            missing.append(event_id)
+        else:
+            fragments[event_id] = fragment
+    for start in range(0, len(missing), FEED_CHUNK):
+        for event in Event.query.filter(Event.id.in_(missing[start:start + FEED_CHUNK])):
+            fragments[event.id] = vevent(event)
+            if cache is not None:
+                cache.set(f'vevent:{request.host}:{event.id}:{event.updated_at}', fragments[event.id])
+
+    header = ''.join(_fold(line) for line in [
+        'BEGIN:VCALENDAR',
+        'VERSION:2.0',
+        'PRODID:-//EventHub Connect//Events//EN',
+        'CALSCALE:GREGORIAN',
+        'METHOD:PUBLISH',
+        f'X-WR-CALNAME:{_escape(name)}',
+        f'REFRESH-INTERVAL;VALUE=DURATION:{FEED_REFRESH}',
+        f'X-PUBLISHED-TTL:{FEED_REFRESH}',
+    ])
+    body = header + ''.join(fragments[event_id] for event_id, _ in state if event_id in fragments) + 'END:VCALENDAR\r\n'
+    return current_app.response_class(body, mimetype='text/calendar')
@@ -0,0 +1,142 @@
+import click
+from flask import Flask
+
+
+def register_commands(app: Flask):
+    """Register maintenance CLI commands on the app"""
+    
+    @app.cli.command('create-schema')
+    def create_schema():
+        """Create missing tables and the search index (run before starting workers)"""
+        from extensions import db
+        from search import install_search
+        
+        db.create_all()
+        backend = install_search(app)
+        click.echo(f"Database schema is ready (search: {backend.name})")
+    
+    @app.cli.command('reconcile-counts')
+    def reconcile_counts():
+        """Rebuild event registration counters from the registrations table"""
+        from models import reconcile_registration_counts
+        
+        fixed = reconcile_registration_counts()
+        click.echo(f"Reconciled registration counts ({fixed} events corrected)")
+    
+    @app.cli.command('rebuild-search-index')
+    def rebuild_search_index():
+        """Rebuild the full-text search index from the events table"""
+        from extensions import db
+        
+        backend = app.extensions['event_search']
+        with db.engine.begin() as connection:
+            backend.install(connection)
+            backend.rebuild(connection)
+        click.echo(f"Rebuilt {backend.name} search index")
+    
+    @app.cli.command('db-upgrade')
+    def db_upgrade():
+        """Apply pending schema upgrades (new columns and indexes)"""
+        from migrations import upgrade
+        
+        applied = upgrade()
+        if applied:
+            for name in applied:
+                click.echo(f"Applied: {name}")
+        else:
+            click.echo("Database schema is up to date")
+    
+    @app.cli.command('check-query-plans')
+    @click.option('--verbose', is_flag=True, help='Print every plan, not just regressions')
+    def check_query_plans_command(verbose):
+        """Fail if any route query plans a full scan of a large table"""
+        from query_plans import check_query_plans
+        
+        try:
+            results = check_query_plans()
+        except RuntimeError as e:
+            raise click.ClickException(str(e))
+        failures = 0
+        for name, (statement, plan, offending) in results.items():
+            if offending:
+                failures += 1
+                click.echo(f"FULL SCAN  {name}: {'; '.join(offending)}\n           {statement}")
+            elif verbose:
+                click.echo(f"ok         {name}: {'; '.join(plan)}\n           {statement}")
+        if failures:
+            raise SystemExit(1)
+        click.echo("All route query plans use indexes")
+    
+    @app.cli.command('import')
+    @click.argument('kind', type=click.Choice(['events', 'registrations']))
+    @click.argument('path', type=click.Path(exists=True, dir_okay=False))
+    @click.option('--format', 'fmt', type=click.Choice(['csv', 'json', 'ndjson']),
+                  help='Input format (default: from the file extension)')
+    @click.option('--organizer', help='Username owning imported events (required for events)')
+    @click.option('--chunk-size', type=int, default=None, help='Rows per batched insert')
+    def import_command(kind, path, fmt, organizer, chunk_size):
+        """Bulk import events or registrations from CSV/JSON"""
+        from bulk_import import read_rows, import_events, import_registrations, ImportReport
+        from extensions import db
+        from models import User
+        
+        fmt = fmt or path.rsplit('.', 1)[-1].lower()
+        if chunk_size is None:
+            chunk_size = app.config['IMPORT_CHUNK_SIZE']
+        
+        report = ImportReport()
+        failure = None
+        with open(path, encoding='utf-8-sig', newline='') as stream:
+            try:
+                rows = read_rows(stream, fmt)
+                if kind == 'events':
+                    user = User.query.filter_by(username=organizer).first() if organizer else None
+                    if user is None:
+                        raise click.UsageError('--organizer must name an existing user when importing events')
+                    import_events(rows, user.id, chunk_size=chunk_size, report=report)
+                else:
+                    import_registrations(rows, chunk_size=chunk_size, report=report)
+            except (ValueError, UnicodeDecodeError) as e:
+                db.session.rollback()
+                failure = e
+        
+        for error in report.errors:
+            click.echo(f"Row {error['row']}: {error['errors']}", err=True)
+        click.echo(f"Imported {report.inserted} {kind} ({len(report.errors)} rows failed)")
+        if failure is not None:
+            raise click.ClickException(f"Import stopped early: {failure}")
+    
+    @app.cli.command('seed-scale-data')
+    @click.option('--users', type=int, default=100_000)
+    @click.option('--events', type=int, default=50_000)
+    @click.option('--registrations', type=int, default=5_000_000)
+    @click.option('--skew', type=float, default=1.1, help='Zipf exponent for registrations per event')
+    @click.option('--seed', type=int, default=42)
+    @click.option('--yes', is_flag=True, help='Do not ask before dropping existing data')
+    def seed_scale_data(users, events, registrations, skew, seed, yes):
+        """Replace the database with a large synthetic dataset"""
+        from scale_data import generate, DEFAULT_PASSWORD
+        
+        if not yes:
+            click.confirm('This drops all existing data. Continue?', abort=True)
+        summary = generate(users=users, events=events, registrations=registrations, skew=skew,
+                           seed=seed, echo=click.echo)
+        click.echo(f"Done: {summary}. Every account's password is '{DEFAULT_PASSWORD}'.")
+    
+    @app.cli.command('build-assets')
+    def build_assets_command():
+        """Fingerprint and precompress static files into static/dist"""
+        from assets import build_assets, _brotli
+        
+        manifest, variants = build_assets(app.static_folder)
+        click.echo(f"Built {len(manifest)} assets and {variants} compressed variants")
+        if _brotli() is None:
+            click.echo("brotli is not installed; only gzip variants were written", err=True)
+    
+    @app.cli.command('sync-replicas')
+    def sync_replicas():
+        """Copy a SQLite primary over its SQLite replicas (local stand-in for replication)"""
+        from routing import sync_sqlite_replicas
+        
+        copied = sync_sqlite_replicas(app)
+        click.echo(f"Copied the primary to {copied} replicas")
@@ -0,0 +1,95 @@
+"""
+HTTP conditional GET for rendered pages.
+
+A view passes the state its page is built from (ids, updated_at stamps,
+counters) to not_modified() before rendering. A weak ETag is derived from
+that state, the viewer and the template set, and Last-Modified from the
+timestamps the view supplies. When the client's If-None-Match (or, without
+one, If-Modified-Since) still matches, a 304 is returned and no template is
+rendered.
+"""
+
+import hashlib
+import os
+from datetime import timezone
+from flask import current_app, g, request, session
+from flask_login import current_user
+
+
+def _template_fingerprint(app):
+    """Hash of the template sources, so a deploy that changes markup changes every ETag"""
+    folder = os.path.join(app.root_path, app.template_folder)
+    digest = hashlib.sha1()
+    for root, dirs, files in os.walk(folder):
+        dirs.sort()
+        for name in sorted(files):
+            path = os.path.join(root, name)
+            digest.update(os.path.relpath(path, folder).encode())
+            with open(path, 'rb') as f:
+                digest.update(f.read())
+    return digest.hexdigest()[:12]
+
+
+def _http_date(value):
+    """Naive UTC datetime to the whole-second aware form used in HTTP headers"""
+    return value.replace(tzinfo=timezone.utc, microsecond=0)
+
+
+def not_modified(*state, last_modified=None, private=False):
+    """Set validators for the current page; return a 304 response if the client's copy is current.
+
+    last_modified may be a datetime or an iterable of them (None entries are
+    ignored); it must move forward whenever anything in state changes.
+    private keeps shared caches from storing a page that is personal even
+    without a signed-in viewer (a secret feed URL).
+    """
+    # Pages with pending flash messages differ from their cached copy
+    if request.method not in ('GET', 'HEAD') or '_flashes' in session:
+        return None
+
+    if current_user.is_authenticated:
+        viewer = (current_user.id, current_user.role, current_user.updated_at)
+    else:
+        viewer = None
+    raw = repr((current_app.extensions['template_fingerprint'], viewer, state))
+    etag = hashlib.sha1(raw.encode()).hexdigest()
+
+    if last_modified is not None and not hasattr(last_modified, 'year'):
+        last_modified = max((stamp for stamp in last_modified if stamp is not None), default=None)
+    if last_modified is not None and viewer is not None and viewer[2] is not None:
+        last_modified = max(last_modified, viewer[2])
+    g.page_validators = (etag, _http_date(last_modified) if last_modified else None)
+    g.page_private = private
+
+    if request.if_none_match:
+        matched = request.if_none_match.contains_weak(etag)
+    else:
+        matched = (g.page_validators[1] is not None and request.if_modified_since is not None
+                   and g.page_validators[1] <= request.if_modified_since)
+    if not matched:
+        return None
+    response = current_app.response_class(status=304)
+    apply_validators(response)
+    return response
+
+
+def apply_validators(response):
+    """Copy the current page's validators onto its response"""
+    validators = g.get('page_validators')
+    if validators is None or response.status_code not in (200, 304):
+        return response
+    etag, last_modified = validators
+    response.set_etag(etag, weak=True)
+    if last_modified is not None:
+        response.last_modified = last_modified
+    # Always revalidate; shared caches may only keep anonymous pages
+    private = current_user.is_authenticated or g.get('page_private')
+    response.headers['Cache-Control'] = 'private, no-cache' if private else 'public, no-cache'
+    response.vary.add('Cookie')
+    return response
+
+
+def init_conditional(app):
+    """Attach ETag / Last-Modified headers to pages that declared their state"""
+    app.extensions['template_fingerprint'] = _template_fingerprint(app)
+    app.after_request(apply_validators)
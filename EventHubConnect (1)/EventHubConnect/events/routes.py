@@ -1,37 +1,82 @@
-from flask import render_template, request, redirect, url_for, flash, abort
+from flask import render_template, request, redirect, url_for, flash, abort, Response, stream_with_context, jsonify, current_app
 from flask_login import login_required, current_user
-from datetime import datetime
+from datetime import datetime, timedelta
 from events import events_bp
 from models import Event, Registration, User
 from forms import EventForm, RegistrationForm
 from decorators import organizer_required, event_owner_required
-from app import db
+from registration import reserve_seat, RegistrationError
+from search import search_events
+from pagination import keyset_paginate, InvalidCursor
+from stats import organizer_stats, attendee_page
+from exports import attendee_rows, SERIALIZERS, EXPORT_FORMATS
+from bulk_import import read_rows, open_text, import_events, import_registrations, ImportReport
+from cache import cached_page, add_cache_tags, invalidate, invalidate_event
+from conditional import not_modified
+from availability import notify_availability
+from intake import get_intake, RESULTS, REGISTERED
+from extensions import db
+from routing import reads_from_replica, stick_to_primary
+from calendars import (events_between, by_day, month_weeks, week_days, day_range, feed_response,
+                       valid_feed_token)
 
 @events_bp.route('/')
+@reads_from_replica
+@cached_page()
 def list_events():
     """List all active events"""
+    add_cache_tags('events')
     page = request.args.get('page', 1, type=int)
     search = request.args.get('search', '')
     event_type = request.args.get('type', '')
     
-    query = Event.query.filter_by(is_active=True)
+    # Organizers are part of every card (and of the page's ETag)
+    query = Event.query.filter_by(is_active=True).options(db.joinedload(Event.organizer))
     
     if search:
-        query = query.filter(Event.title.contains(search) | Event.description.contains(search))
+        # Relevance-ranked when a full-text index is available
+        query = search_events(query, search)
     
     if event_type:
         query = query.filter_by(event_type=event_type)
     
-    events = query.order_by(Event.start_datetime.asc()).paginate(
-        page=page, per_page=12, error_out=False
+    # Relevance-ranked searches and legacy ?page= URLs keep offset pagination;
+    # plain browsing uses cursors so deep pages cost the same as the first
+    cursor_mode = not search and 'page' not in request.args
+    if cursor_mode:
+        try:
+            events = keyset_paginate(query, (Event.start_datetime, Event.id),
+                                     cursor=request.args.get('cursor'), per_page=12)
+        except InvalidCursor:
+            abort(400)
+    else:
+        events = query.order_by(Event.start_datetime.asc(), Event.id.asc()).paginate(
+            page=page, per_page=12, error_out=False
+        )
+    
+    # Cards show the organizer's name
+    add_cache_tags(*{f'user:{event.organizer_id}' for event in events.items})
+    
+    # No Last-Modified here: a deleted event changes the page without a newer timestamp
+    unchanged = not_modified(
+        [(event.id, event.updated_at, event.registration_count, event.organizer.updated_at)
+         for event in events.items],
+        events.has_prev, events.has_next, getattr(events, 'pages', None),
     )
+    if unchanged:
+        return unchanged
     
-    return render_template('events/list.html', events=events, search=search, event_type=event_type)
+    return render_template('events/list.html', events=events, search=search, event_type=event_type,
+                           cursor_mode=cursor_mode)
 
 @events_bp.route('/<int:event_id>')
+@reads_from_replica
+@cached_page()
 def event_detail(event_id):
     """Event detail page"""
-    event = Event.query.get_or_404(event_id)
+    add_cache_tags(f'event:{event_id}')
+    event = Event.query.options(db.joinedload(Event.organizer)).get_or_404(event_id)
+    add_cache_tags(f'user:{event.organizer_id}')
     
     # Check if current user is registered
     is_registered = False
@@ -42,9 +87,89 @@ def event_detail(event_id):
         ).first()
         is_registered = user_registration is not None
     
+    # Registration counter changes bump events.updated_at as well; registration
+    # also closes at the deadline without any row changing
+    deadline = event.registration_deadline
+    unchanged = not_modified(
+        event.id, event.updated_at, event.registration_count, event.is_registration_open,
+        event.organizer.updated_at, user_registration and user_registration.id,
+        last_modified=(event.updated_at, event.organizer.updated_at,
+                       deadline if deadline and deadline < datetime.utcnow() else None),
+    )
+    if unchanged:
+        return unchanged
+    
     return render_template('events/detail.html', event=event, 
                          is_registered=is_registered, user_registration=user_registration)
 
+@events_bp.route('/calendar')
+@events_bp.route('/calendar/<int:year>/<int:month>')
+@reads_from_replica
+@cached_page()
+def calendar_month(year=None, month=None):
+    """Month calendar of active events"""
+    if year is None:
+        today = datetime.utcnow().date()
+        year, month = today.year, today.month
+    if not (1 < year < 9999 and 1 <= month <= 12):
+        abort(404)
+    add_cache_tags('events')
+    weeks = month_weeks(year, month)
+    days = [day for week in weeks for day in week]
+    events = events_between(*day_range(days), Event.is_active.is_(True)).all()
+    
+    unchanged = not_modified(year, month, [(event.id, event.updated_at) for event in events])
+    if unchanged:
+        return unchanged
+    
+    first = datetime(year, month, 1)
+    previous_month = (first - timedelta(days=1)).replace(day=1)
+    next_month = (first + timedelta(days=31)).replace(day=1)
+    return render_template('events/calendar_month.html', weeks=weeks, events_by_day=by_day(events, days),
+                           month=first, previous_month=previous_month, next_month=next_month)
+
+@events_bp.route('/calendar/<int:year>/week/<int:week>')
+@reads_from_replica
+@cached_page()
+def calendar_week(year, week):
+    """ISO week calendar of active events"""
+    if not 1 < year < 9999:
+        abort(404)
+    try:
+        days = week_days(year, week)
+    except ValueError:
+        abort(404)
+    add_cache_tags('events')
+    events = events_between(*day_range(days), Event.is_active.is_(True)).all()
+    
+    unchanged = not_modified(year, week, [(event.id, event.updated_at) for event in events])
+    if unchanged:
+        return unchanged
+    
+    previous_week = (days[0] - timedelta(days=7)).isocalendar()
+    next_week = (days[0] + timedelta(days=7)).isocalendar()
+    return render_template('events/calendar_week.html', days=days, events_by_day=by_day(events, days),
+                           previous_week=previous_week, next_week=next_week)
+
+@events_bp.route('/calendar/organizers/<int:organizer_id>.ics')
+@reads_from_replica
+def organizer_feed(organizer_id):
+    """iCalendar feed of an organizer's events"""
+    organizer = User.query.get_or_404(organizer_id)
+    if not organizer.is_organizer():
+        abort(404)
+    return feed_response(f'{organizer.full_name} - events', Event.organizer_id == organizer_id)
+
+@events_bp.route('/calendar/users/<int:user_id>/<token>.ics')
+@reads_from_replica
+def user_feed(user_id, token):
+    """iCalendar feed of the events a user is registered for; the token stands in for a login"""
+    if not valid_feed_token(user_id, token):
+        abort(404)
+    registered = db.select(Registration.event_id).where(
+        Registration.user_id == user_id, Registration.status.in_(Registration.COUNTED_STATUSES))
+    return feed_response('My events', Event.id.in_(registered), private=True)
+
 @events_bp.route('/create', methods=['GET', 'POST'])
 @organizer_required
 def create_event():
@@ -68,12 +193,48 @@ def create_event():
         
         db.session.add(event)
         db.session.commit()
+        invalidate('events')
         
         flash('Event created successfully!', 'success')
         return redirect(url_for('events.event_detail', event_id=event.id))
     
     return render_template('events/create.html', form=form)
 
+@events_bp.route('/import/<kind>', methods=['POST'])
+@organizer_required
+def bulk_import(kind):
+    """Bulk import events or registrations for the organizer's events from an uploaded file"""
+    if kind not in ('events', 'registrations'):
+        abort(404)
+    
+    upload = request.files.get('file')
+    if upload is None or not upload.filename:
+        return jsonify(error='No file uploaded'), 400
+    
+    fmt = request.form.get('format') or upload.filename.rsplit('.', 1)[-1].lower()
+    chunk_size = request.form.get('chunk_size', current_app.config['IMPORT_CHUNK_SIZE'], type=int)
+    
+    report = ImportReport()
+    try:
+        rows = read_rows(open_text(upload), fmt)
+        if kind == 'events':
+            import_events(rows, current_user.id, chunk_size=chunk_size, report=report)
+        else:
+            import_registrations(rows, organizer_id=current_user.id, chunk_size=chunk_size, report=report)
+    except (ValueError, UnicodeDecodeError) as e:
+        db.session.rollback()
+        # Rows from chunks committed before the failure stay imported; say so
+        return jsonify(error=str(e), **report.to_dict()), 400
+    finally:
+        # Earlier chunks may already be committed when a later one fails
+        if kind == 'events':
+            invalidate('events')
+        else:
+            # Registrations can only target this organizer's events
+            invalidate('events', f'user:{current_user.id}')
+    
+    return jsonify(report.to_dict())
+
 @events_bp.route('/<int:event_id>/edit', methods=['GET', 'POST'])
 @event_owner_required
 def edit_event(event_id):
@@ -94,6 +255,8 @@ def edit_event(event_id):
         event.is_active = form.is_active.data
         
         db.session.commit()
+        invalidate_event(event.id)
+        notify_availability()
         flash('Event updated successfully!', 'success')
         return redirect(url_for('events.event_detail', event_id=event.id))
     
@@ -107,6 +270,7 @@ def delete_event(event_id):
     
     db.session.delete(event)
     db.session.commit()
+    invalidate_event(event_id)
     
     flash('Event deleted successfully!', 'success')
     return redirect(url_for('events.organizer_dashboard'))
@@ -134,20 +298,50 @@ def register_for_event(event_id):
     form = RegistrationForm()
     
     if form.validate_on_submit():
-        registration = Registration(
-            user_id=current_user.id,
-            event_id=event_id,
-            notes=form.notes.data
-        )
+        intake = get_intake()
+        if intake is not None:
+            # Acknowledge now; the seat is reserved by the next group commit
+            token = intake.submit(current_user.id, event_id, notes=form.notes.data)
+            return redirect(url_for('events.registration_status', event_id=event_id, token=token))
         
-        db.session.add(registration)
-        db.session.commit()
+        # Seat claim and insert happen atomically; the checks above are only a fast path
+        try:
+            reserve_seat(event_id, current_user.id, notes=form.notes.data)
+        except RegistrationError as e:
+            flash(e.message, e.category)
+            return redirect(url_for('events.event_detail', event_id=event_id))
+        # Listings only show the seat count for capped events
+        invalidate_event(event_id, list_changed=event.max_attendees is not None)
+        notify_availability()
         
         flash('Successfully registered for the event!', 'success')
         return redirect(url_for('events.event_detail', event_id=event_id))
     
     return render_template('events/register.html', event=event, form=form)
 
+@events_bp.route('/<int:event_id>/register/<token>')
+@login_required
+def registration_status(event_id, token):
+    """Outcome of a queued registration"""
+    intake = get_intake()
+    # Most batches commit within a second, so the first visit usually gets the result
+    entry = intake.wait(token, timeout=1) if intake is not None else None
+    if entry is None or entry['user_id'] != current_user.id or entry['event_id'] != event_id:
+        abort(404)
+    
+    if entry['state'] != 'done':
+        event = Event.query.get_or_404(event_id)
+        return render_template('events/registration_pending.html', event=event), 202
+    
+    if entry['result'] == REGISTERED:
+        # The seat was committed by the intake thread; show it on the redirect target
+        stick_to_primary()
+        flash('Successfully registered for the event!', 'success')
+    else:
+        error = RESULTS[entry['result']]
+        flash(error.message, error.category)
+    return redirect(url_for('events.event_detail', event_id=event_id))
+
 @events_bp.route('/<int:event_id>/unregister', methods=['POST'])
 @login_required
 def unregister_from_event(event_id):
@@ -162,21 +356,39 @@ def unregister_from_event(event_id):
     
     db.session.delete(registration)
     db.session.commit()
+    invalidate_event(event_id)
+    notify_availability()
     
     flash('Successfully unregistered from the event.', 'success')
     return redirect(url_for('events.event_detail', event_id=event_id))
 
 @events_bp.route('/organizer/dashboard')
+@reads_from_replica
 @organizer_required
 def organizer_dashboard():
     """Organizer dashboard showing their events"""
-    events = Event.query.filter_by(organizer_id=current_user.id).order_by(Event.start_datetime.asc()).all()
-    return render_template('events/organizer_dashboard.html', events=events)
+    stats = organizer_stats(current_user.id)
+    return render_template('events/organizer_dashboard.html', stats=stats)
 
 @events_bp.route('/<int:event_id>/attendees')
 @event_owner_required
 def event_attendees(event_id):
     """View event attendees (event owner only)"""
     event = Event.query.get_or_404(event_id)
-    attendees = Registration.query.filter_by(event_id=event_id).all()
-    return render_template('events/attendees.html', event=event, attendees=attendees)
+    try:
+        attendees, breakdown = attendee_page(event, cursor=request.args.get('cursor'))
+    except InvalidCursor:
+        abort(400)
+    return render_template('events/attendees.html', event=event, attendees=attendees, breakdown=breakdown)
+
+@events_bp.route('/<int:event_id>/attendees/export.<fmt>')
+@event_owner_required
+def export_attendees(event_id, fmt):
+    """Stream the attendee list as CSV or NDJSON (event owner only)"""
+    if fmt not in SERIALIZERS:
+        abort(404)
+    
+    body = SERIALIZERS[fmt](attendee_rows(event_id))
+    response = Response(stream_with_context(body), mimetype=EXPORT_FORMATS[fmt])
+    response.headers['Content-Disposition'] = f'attachment; filename=event-{event_id}-attendees.{fmt}'
+    return response
@@ -5,7 +5,11 @@ from events import events_bp
 from models import Event, Registration
 from forms import EventForm
 from decorators import organizer_required
-from app import db
+from stats import organizer_stats, attendee_page
+from pagination import InvalidCursor
+from cache import invalidate, invalidate_event
+from availability import notify_availability
+from extensions import db
 
 class EventManagementView(MethodView):
     """Class-based view for event management"""
@@ -15,8 +19,8 @@ class EventManagementView(MethodView):
         """Display event management interface"""
         if event_id is None:
             # Show all events created by the organizer
-            events = Event.query.filter_by(organizer_id=current_user.id).order_by(Event.start_datetime.asc()).all()
-            return render_template('events/organizer_dashboard.html', events=events)
+            stats = organizer_stats(current_user.id)
+            return render_template('events/organizer_dashboard.html', stats=stats)
         else:
             # Show specific event management
             event = Event.query.get_or_404(event_id)
@@ -25,8 +29,12 @@ class EventManagementView(MethodView):
             if event.organizer_id != current_user.id:
                 abort(403)
             
-            attendees = Registration.query.filter_by(event_id=event_id).all()
-            return render_template('events/attendees.html', event=event, attendees=attendees)
+            try:
+                attendees, breakdown = attendee_page(event, cursor=request.args.get('cursor'))
+            except InvalidCursor:
+                abort(400)
+            return render_template('events/attendees.html', event=event, attendees=attendees,
+                                   breakdown=breakdown)
     
     def post(self, event_id=None):
         """Handle event management actions"""
@@ -50,6 +58,7 @@ class EventManagementView(MethodView):
                 
                 db.session.add(event)
                 db.session.commit()
+                invalidate('events')
                 
                 flash('Event created successfully!', 'success')
                 return redirect(url_for('events.event_detail', event_id=event.id))
@@ -77,6 +86,8 @@ class EventManagementView(MethodView):
                 event.is_active = form.is_active.data
                 
                 db.session.commit()
+                invalidate_event(event.id)
+                notify_availability()
                 flash('Event updated successfully!', 'success')
                 return redirect(url_for('events.event_detail', event_id=event.id))
             
@@ -92,6 +103,7 @@ class EventManagementView(MethodView):
         
         db.session.delete(event)
         db.session.commit()
+        invalidate_event(event_id)
         
         flash('Event deleted successfully!', 'success')
         return redirect(url_for('events.organizer_dashboard'))
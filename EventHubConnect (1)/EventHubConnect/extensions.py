@@ -0,0 +1,11 @@
+from flask_sqlalchemy import SQLAlchemy
+from flask_login import LoginManager
+from sqlalchemy.orm import DeclarativeBase
+from routing import RoutingSession
+
+class Base(DeclarativeBase):
+    pass
+
+# Initialize extensions; bound to an app in create_app
+db = SQLAlchemy(model_class=Base, session_options={'class_': RoutingSession})
+login_manager = LoginManager()
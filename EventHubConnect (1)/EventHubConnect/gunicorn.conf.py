@@ -0,0 +1,70 @@
+"""
+Gunicorn settings.
+
+The app is built once in the master (preload_app) and inherited by every
+worker through fork, so a new worker is ready in milliseconds instead of
+re-importing the whole application. Each worker then drops any connection
+inherited from the master and warms its own pool before it accepts
+requests.
+
+    flask --app main create-schema   # once per deploy
+    gunicorn -c gunicorn.conf.py main:app
+
+Workers are threaded (gthread, GUNICORN_THREADS per process) rather than
+gunicorn's default sync class. The live availability stream keeps a request
+open for minutes; a sync worker would spend its only slot on it, and a few
+open event pages would take the whole site down. With gthread at most half
+of each worker's threads may hold streams (SSE_MAX_CLIENTS), so ordinary
+requests always find a free thread. GUNICORN_WORKER_CLASS=gevent (or
+eventlet) holds thousands of streams per worker; with sync the stream is
+turned off and pages show the counts they were rendered with.
+
+The in-process page cache (CACHE_TYPE=memory) only sees the invalidations
+of its own worker, so with more than one worker the page cache is Redis when
+CACHE_REDIS_URL is set and off otherwise, and an explicit CACHE_TYPE=memory
+refuses to start.
+"""
+
+import multiprocessing
+import os
+
+bind = os.environ.get('BIND', '0.0.0.0:5000')
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+threads = int(os.environ.get('GUNICORN_THREADS', 16))
+preload_app = True
+
+# Tell the app whether this worker class can hold streams open (see availability.py)
+_app_settings = {}
+if worker_class == 'sync':
+    _app_settings['SSE_ENABLED'] = '0'
+else:
+    _app_settings['SSE_ENABLED'] = '1'
+    if worker_class == 'gthread':
+        _app_settings['SSE_MAX_CLIENTS'] = str(max(1, threads // 2))
+
+# A page cache every worker can invalidate, or none (see cache.py)
+if workers > 1:
+    if os.environ.get('CACHE_TYPE') == 'memory':
+        raise RuntimeError('CACHE_TYPE=memory cannot be invalidated across workers; '
+                           'use CACHE_TYPE=redis or WEB_CONCURRENCY=1')
+    _app_settings['CACHE_TYPE'] = 'redis' if 'CACHE_REDIS_URL' in os.environ else 'null'
+raw_env = [f'{name}={value}' for name, value in _app_settings.items() if name not in os.environ]
+
+
+def post_fork(server, worker):
+    # Sockets opened in the master must never be shared between processes
+    from main import app
+    from extensions import db
+    from logconfig import after_fork
+    with app.app_context():
+        # Primary and replicas alike
+        for engine in db.engines.values():
+            engine.dispose(close=False)
+    # The master's log listener thread did not survive the fork
+    after_fork()
+
+
+def post_worker_init(worker):
+    from readiness import warm_pool
+    warm_pool(worker.wsgi)
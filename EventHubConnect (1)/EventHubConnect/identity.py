@@ -0,0 +1,73 @@
+"""
+Cached identity loading for Flask-Login.
+
+The user_loader runs on every authenticated request. Each worker keeps the
+column values of recently seen users in a small TTL/LRU cache and rebuilds a
+session-attached User from them with merge(load=False), so no SELECT is
+issued. Relationships still lazy-load through the current session as usual.
+
+Entries are dropped after any commit that updated or deleted the user in
+this worker (profile edits, is_active or role flips). Other workers pick up
+the change when their entry expires, after IDENTITY_CACHE_TIMEOUT seconds.
+"""
+
+from flask import current_app, has_app_context
+from sqlalchemy import event as sa_event, inspect
+from sqlalchemy.orm import Session, make_transient_to_detached
+from extensions import db
+from cache import MemoryCache
+from models import User
+
+USER_COLUMNS = [column.key for column in inspect(User).column_attrs]
+
+
+def _cache():
+    return current_app.extensions.get('identity_cache') if has_app_context() else None
+
+
+def load_user(user_id):
+    """Return the User for a session id, from the identity cache when possible"""
+    cache = _cache()
+    if cache is None:
+        return db.session.get(User, user_id)
+
+    data = cache.get(user_id)
+    if data is None:
+        user = db.session.get(User, user_id)
+        if user is not None:
+            cache.set(user_id, {key: getattr(user, key) for key in USER_COLUMNS})
+        return user
+
+    # A fresh detached instance per request; cached values are never shared objects
+    user = User(**data)
+    make_transient_to_detached(user)
+    return db.session.merge(user, load=False)
+
+
+def forget_user(user_id):
+    """Drop a user's cached identity"""
+    cache = _cache()
+    if cache is not None:
+        cache.delete(user_id)
+
+
+@sa_event.listens_for(User, 'after_update')
+@sa_event.listens_for(User, 'after_delete')
+def _user_changed(mapper, connection, target):
+    session = inspect(target).session
+    if session is not None:
+        session.info.setdefault('stale_identities', set()).add(target.id)
+
+
+@sa_event.listens_for(Session, 'after_commit')
+def _forget_changed_users(session):
+    for user_id in session.info.pop('stale_identities', ()):
+        forget_user(user_id)
+
+
+def init_identity_cache(app):
+    """Create the per-worker identity cache; IDENTITY_CACHE_TIMEOUT=0 disables it"""
+    timeout = app.config.get('IDENTITY_CACHE_TIMEOUT', 30)
+    cache = MemoryCache(app.config.get('IDENTITY_CACHE_SIZE', 10000), default_timeout=timeout) if timeout else None
+    app.extensions['identity_cache'] = cache
+    return cache
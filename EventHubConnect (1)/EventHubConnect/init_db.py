@@ -11,7 +11,8 @@ from werkzeug.security import generate_password_hash
 # Add the parent directory to the path to import our modules
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from app import app, db
+from main import app
+from extensions import db
 from models import User, Event, Registration
 
 def init_database():
@@ -0,0 +1,147 @@
+"""
+Per-request SQL instrumentation.
+
+Cursor-execute hooks on every SQLAlchemy engine count and time the queries a
+request issues. Statements are grouped by shape (the parameterized SQL
+text), and a shape repeated more than SQL_N_PLUS_ONE_THRESHOLD times is
+flagged as a likely N+1 pattern. Totals go out in a Server-Timing header and
+the log. This is a diagnostic: it is on only with SQL_INSTRUMENTATION=1,
+which is the default under the debugger, since the header tells any client
+how many queries a page runs.
+
+Tests can cap the queries a block of code may issue, whatever the setting:
+
+    with query_budget(5):
+        client.get('/events/')
+"""
+
+import logging
+import re
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from flask import g, has_app_context, request
+from sqlalchemy import event as sa_event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+_local = threading.local()
+_WHITESPACE = re.compile(r'\s+')
+
+
+class QueryStats:
+    """Query count, time and statement shapes for one request or budget block"""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.shapes = Counter()
+        # Time spent getting connections from the pool (see pooling.py)
+        self.pool_wait = 0.0
+
+    def record(self, statement, duration):
+        self.count += 1
+        self.duration += duration
+        self.shapes[_WHITESPACE.sub(' ', statement).strip()] += 1
+
+    def repeated(self, threshold):
+        """Statement shapes executed more than threshold times"""
+        return [(shape, n) for shape, n in self.shapes.most_common() if n > threshold]
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Raised by query_budget when a block issues too many queries"""
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # Kept on the execution context, which is discarded whether or not the statement succeeds
+    context._query_start_time = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, '_query_start_time', None)
+    if started is None:
+        return
+    duration = time.perf_counter() - started
+    if has_app_context():
+        stats = g.get('sql_stats')
+        if stats is not None:
+            stats.record(statement, duration)
+    for budget in getattr(_local, 'budgets', ()):
+        budget.record(statement, duration)
+    if not executemany:
+        for captured in getattr(_local, 'captures', ()):
+            captured.append((statement, parameters))
+
+
+def install_listeners():
+    """Hook query timing into every engine; safe to call more than once"""
+    if not sa_event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+        sa_event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        sa_event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+
+
+@contextmanager
+def query_budget(max_queries, max_repeats=None):
+    """Fail if the enclosed block issues more than max_queries statements.
+
+    With max_repeats, also fail if any single statement shape repeats more
+    than that many times (an N+1 pattern).
+    """
+    install_listeners()
+    stats = QueryStats()
+    budgets = _local.__dict__.setdefault('budgets', [])
+    budgets.append(stats)
+    try:
+        yield stats
+    finally:
+        budgets.remove(stats)
+
+    if stats.count > max_queries:
+        details = '\n'.join(f'  {n}x {shape}' for shape, n in stats.shapes.most_common(5))
+        raise QueryBudgetExceeded(f'{stats.count} queries issued, budget is {max_queries}:\n{details}')
+    if max_repeats is not None and stats.repeated(max_repeats):
+        shape, n = stats.repeated(max_repeats)[0]
+        raise QueryBudgetExceeded(f'Statement repeated {n} times (limit {max_repeats}): {shape}')
+
+
+@contextmanager
+def capture_statements():
+    """Collect (statement, parameters) for every statement the enclosed block executes"""
+    install_listeners()
+    captured = []
+    captures = _local.__dict__.setdefault('captures', [])
+    captures.append(captured)
+    try:
+        yield captured
+    finally:
+        captures.remove(captured)
+
+
+def init_instrumentation(app):
+    """Attach per-request query accounting to the app"""
+    if not app.config.get('SQL_INSTRUMENTATION'):
+        return
+    install_listeners()
+    threshold = app.config.get('SQL_N_PLUS_ONE_THRESHOLD', 5)
+
+    @app.before_request
+    def start_query_stats():
+        g.sql_stats = QueryStats()
+
+    @app.after_request
+    def report_query_stats(response):
+        stats = g.pop('sql_stats', None)
+        if stats is None:
+            return response
+
+        response.headers.add('Server-Timing', f'db;dur={stats.duration * 1000:.2f};desc="{stats.count} queries"')
+        if stats.pool_wait:
+            response.headers.add('Server-Timing', f'pool;dur={stats.pool_wait * 1000:.2f};desc="connection checkout"')
+        logger.debug("%s %s: %d queries in %.2fms", request.method, request.path, stats.count,
+                     stats.duration * 1000)
+        for shape, n in stats.repeated(threshold):
+            logger.warning("Possible N+1 on %s: statement ran %d times: %s", request.path, n, shape[:200])
+        return response
@@ -0,0 +1,350 @@
+"""
+Registration intake queue with group commit.
+
+With REGISTRATION_INTAKE=queue, a registration is appended to a small
+SQLite journal on local disk (INTAKE_QUEUE_PATH) and acknowledged as pending
+right away. A writer thread in each worker drains the journal in batches and
+reserves every seat of a batch in one database transaction, so a spike of N
+sign-ups costs about N / INTAKE_BATCH_SIZE commits instead of N. Seats are
+claimed per event with one UPDATE that grants at most the remaining capacity
+and only applies if the counter has not moved since it was read, so
+max_attendees still holds; seats go to requests in arrival order.
+Duplicates are filtered before the insert and the unique constraint remains
+the backstop. Outcomes are written back to the journal, where the client
+polls for them.
+
+All workers on a host share the journal. Batches are claimed atomically,
+and a batch left behind by a worker that died mid-way is claimed again
+after INTAKE_CLAIM_TIMEOUT seconds. A batch that fails as a whole is
+replayed one request at a time, so one bad request does not hold up the
+others; it is retried on its own and given up on (result 'failed') after
+INTAKE_MAX_ATTEMPTS tries.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime
+from flask import current_app
+from sqlalchemy import insert, or_, update
+from sqlalchemy.exc import IntegrityError
+from extensions import db
+from registration import (reserve_seat, events, registrations,
+                          RegistrationError, RegistrationClosed, EventFull, AlreadyRegistered)
+from cache import invalidate_event
+from availability import notify_availability
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS intake (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    token TEXT NOT NULL UNIQUE,
+    user_id INTEGER NOT NULL,
+    event_id INTEGER NOT NULL,
+    notes TEXT,
+    state TEXT NOT NULL DEFAULT 'pending',
+    result TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    claimed_at REAL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS ix_intake_state ON intake (state, id);
+"""
+
+
+
+class RegistrationFailed(RegistrationError):
+    message = 'Your registration could not be completed. Please try again.'
+    code = 'failed'
+
+
+# Final results, by RegistrationError.code, plus success
+RESULTS = {error.code: error for error in (RegistrationClosed, EventFull, AlreadyRegistered, RegistrationFailed)}
+REGISTERED = 'registered'
+
+
+class IntakeQueue:
+    """Durable FIFO of registration requests in a local SQLite file"""
+
+    def __init__(self, path, claim_timeout=60, retention=3600, max_attempts=5):
+        self.path = path
+        self.claim_timeout = claim_timeout
+        self.max_attempts = max_attempts
+        self.retention = retention
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Not kept: connections must not cross a gunicorn fork
+        conn = sqlite3.connect(path, timeout=30)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.executescript(SCHEMA)
+        conn.close()
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            # Autocommit; every write below is one statement or an explicit transaction
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            # Each enqueue is fsynced before the client sees "pending"
+            conn.execute('PRAGMA synchronous=FULL')
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+        return conn
+
+    def enqueue(self, user_id, event_id, notes=None):
+        """Append a request and return its token"""
+        token = uuid.uuid4().hex
+        self._connection().execute(
+            'INSERT INTO intake (token, user_id, event_id, notes, created_at) VALUES (?, ?, ?, ?, ?)',
+            (token, user_id, event_id, notes, time.time()))
+        return token
+
+    def claim(self, limit):
+        """Take up to limit pending requests, oldest first"""
+        now = time.time()
+        conn = self._connection()
+        # A request whose worker died on it max_attempts times is not tried again
+        conn.execute(
+            """UPDATE intake SET state = 'done', result = ?, finished_at = ?
+               WHERE state = 'processing' AND claimed_at < ? AND attempts >= ?""",
+            (RegistrationFailed.code, now, now - self.claim_timeout, self.max_attempts))
+        rows = conn.execute(
+            """UPDATE intake SET state = 'processing', claimed_at = ?, attempts = attempts + 1
+               WHERE id IN (SELECT id FROM intake
+                            WHERE state = 'pending'
+                               OR (state = 'processing' AND claimed_at < ? AND attempts < ?)
+                            ORDER BY id LIMIT ?)
+               RETURNING id, user_id, event_id, notes, attempts""",
+            (now, now - self.claim_timeout, self.max_attempts, limit)).fetchall()
+        # RETURNING order is unspecified
+        return sorted(rows, key=lambda row: row['id'])
+
+    def finish(self, results):
+        """Record {request id: result} for claimed requests"""
+        now = time.time()
+        self._connection().executemany(
+            "UPDATE intake SET state = 'done', result = ?, finished_at = ? WHERE id = ?",
+            [(result, now, request_id) for request_id, result in results.items()])
+
+    def release(self, request_ids):
+        """Put claimed requests back in the queue to be retried"""
+        self._connection().executemany(
+            "UPDATE intake SET state = 'pending', claimed_at = NULL WHERE id = ?",
+            [(request_id,) for request_id in request_ids])
+
+    def status(self, token):
+        return self._connection().execute(
+            'SELECT token, user_id, event_id, state, result, created_at, finished_at FROM intake WHERE token = ?',
+            (token,)).fetchone()
+
+    def pending(self):
+        return self._connection().execute("SELECT COUNT(*) FROM intake WHERE state != 'done'").fetchone()[0]
+
+    def prune(self):
+        """Forget results older than the retention period"""
+        self._connection().execute("DELETE FROM intake WHERE state = 'done' AND finished_at < ?",
+                                   (time.time() - self.retention,))
+
+
+def _claim_seats(event_id, wanted, now):
+    """Claim up to wanted seats on one event with one guarded UPDATE.
+
+    Returns (seats claimed, result for the requests that got none).
+    """
+    while True:
+        row = db.session.execute(
+            db.select(events.c.is_active, events.c.registration_deadline,
+                      events.c.max_attendees, events.c.registration_count)
+            .where(events.c.id == event_id)
+        ).first()
+        if row is None or not row.is_active or (row.registration_deadline and now > row.registration_deadline):
+            return 0, RegistrationClosed.code
+        free = wanted if row.max_attendees is None else min(wanted, row.max_attendees - row.registration_count)
+        if free <= 0:
+            return 0, EventFull.code
+        # Only applies if nobody changed the event since it was read; otherwise re-read
+        claimed = db.session.execute(
+            update(events)
+            .where(events.c.id == event_id)
+            .where(events.c.registration_count == row.registration_count)
+            .where(events.c.is_active.is_(True))
+            .where(or_(events.c.registration_deadline.is_(None), events.c.registration_deadline >= now))
+            .values(registration_count=events.c.registration_count + free)
+        ).rowcount
+        if claimed:
+            return free, EventFull.code
+
+
+def reserve_seats(requests):
+    """Reserve seats for a batch of queued requests with a single commit.
+
+    Returns {request id: result}. If the batch loses a unique-constraint race
+    to another writer, it is rolled back and replayed with reserve_each().
+    """
+    now = datetime.utcnow()
+    user_ids = {request['user_id'] for request in requests}
+    event_ids = {request['event_id'] for request in requests}
+    taken = set(db.session.execute(
+        db.select(registrations.c.user_id, registrations.c.event_id)
+        .where(registrations.c.user_id.in_(user_ids), registrations.c.event_id.in_(event_ids))
+    ).all())
+
+    results = {}
+    queued = {}  # event id -> requests in arrival order
+    for request in requests:
+        key = (request['user_id'], request['event_id'])
+        if key in taken:
+            # A retried request may already have been committed before its worker died
+            results[request['id']] = REGISTERED if request['attempts'] > 1 else AlreadyRegistered.code
+            continue
+        taken.add(key)
+        queued.setdefault(request['event_id'], []).append(request)
+
+    rows = []
+    try:
+        for event_id, waiting in queued.items():
+            granted, refused = _claim_seats(event_id, len(waiting), now)
+            for request in waiting[:granted]:
+                rows.append({'user_id': request['user_id'], 'event_id': event_id, 'notes': request['notes'],
+                             'status': 'registered', 'registered_at': now})
+                results[request['id']] = REGISTERED
+            for request in waiting[granted:]:
+                results[request['id']] = refused
+        if rows:
+            # Counters were bumped by the claims above, so no ORM listener may run
+            db.session.execute(insert(registrations), rows)
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        results = reserve_each(requests)
+    return results
+
+
+def reserve_each(requests):
+    """Reserve seats for queued requests one at a time, each with its own commit.
+
+    Returns {request id: result}; a request that fails with an unexpected
+    error is logged and left out, so the caller can retry it.
+    """
+    results = {}
+    for request in requests:
+        try:
+            reserve_seat(request['event_id'], request['user_id'], notes=request['notes'])
+            results[request['id']] = REGISTERED
+        except RegistrationError as e:
+            results[request['id']] = e.code
+        except Exception:
+            db.session.rollback()
+            current_app.logger.exception("Queued registration %s failed", request['id'])
+    return results
+
+
+class RegistrationIntake:
+    """Per-worker writer that drains the intake queue in batches"""
+
+    def __init__(self, app, queue, batch_size=200, poll_interval=0.5):
+        self.app = app
+        self.queue = queue
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.batches = 0
+        self._wake = threading.Event()
+        self._finished = threading.Condition()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def submit(self, user_id, event_id, notes=None):
+        """Queue a registration and return its token"""
+        token = self.queue.enqueue(user_id, event_id, notes)
+        self.start()
+        self._wake.set()
+        return token
+
+    def status(self, token):
+        self.start()
+        return self.queue.status(token)
+
+    def wait(self, token, timeout):
+        """Status of a request, waiting up to timeout seconds for its result"""
+        deadline = time.monotonic() + timeout
+        while True:
+            entry = self.status(token)
+            remaining = deadline - time.monotonic()
+            if entry is None or entry['state'] == 'done' or remaining <= 0:
+                return entry
+            # Woken by this worker's batches; another worker's are seen at the next check
+            with self._finished:
+                self._finished.wait(min(remaining, self.poll_interval))
+
+    def start(self):
+        # Started lazily so no thread exists before gunicorn forks
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name='registration-intake', daemon=True)
+                    self._thread.start()
+
+    def _run(self):
+        while True:
+            try:
+                if not self.drain():
+                    self.queue.prune()
+                    self._wake.wait(self.poll_interval)
+                    self._wake.clear()
+            except Exception:
+                self.app.logger.exception("Registration intake batch failed")
+                time.sleep(self.poll_interval)
+
+    def drain(self):
+        """Process one batch; returns the number of requests handled"""
+        batch = self.queue.claim(self.batch_size)
+        if not batch:
+            return 0
+        with self.app.app_context():
+            try:
+                try:
+                    results = reserve_seats(batch)
+                except Exception:
+                    # Find the request at fault instead of failing the whole batch
+                    db.session.rollback()
+                    self.app.logger.exception("Registration intake batch failed, replaying it per request")
+                    results = reserve_each(batch)
+                if REGISTERED in results.values():
+                    for event_id in {request['event_id'] for request in batch}:
+                        invalidate_event(event_id)
+                    notify_availability()
+            finally:
+                db.session.remove()
+        retry = []
+        for request in batch:
+            if request['id'] not in results:
+                if request['attempts'] >= self.queue.max_attempts:
+                    results[request['id']] = RegistrationFailed.code
+                else:
+                    retry.append(request['id'])
+        self.queue.finish(results)
+        self.queue.release(retry)
+        self.batches += 1
+        with self._finished:
+            self._finished.notify_all()
+        return len(batch)
+
+
+def get_intake():
+    """The intake writer, or None when registrations are reserved inline"""
+    return current_app.extensions.get('registration_intake')
+
+
+def init_intake(app):
+    intake = None
+    if app.config.get('REGISTRATION_INTAKE') == 'queue':
+        path = app.config.get('INTAKE_QUEUE_PATH') or os.path.join(app.instance_path, 'registration_intake.db')
+        queue = IntakeQueue(path, app.config.get('INTAKE_CLAIM_TIMEOUT', 60),
+                            max_attempts=app.config.get('INTAKE_MAX_ATTEMPTS', 5))
+        intake = RegistrationIntake(app, queue, app.config.get('INTAKE_BATCH_SIZE', 200),
+                                    app.config.get('INTAKE_POLL_INTERVAL', 0.5))
+    app.extensions['registration_intake'] = intake
+    return intake
@@ -0,0 +1,205 @@
+"""
+Non-blocking structured logging.
+
+configure_logging() routes every record through a bounded in-memory queue.
+The calling thread only applies levels and sampling, captures the request
+id and merges the message arguments, then enqueues the record. Formatting
+and I/O happen on a QueueListener thread, so a request never waits on a
+slow stdout, pipe or disk. When the queue is full, records are dropped and
+counted rather than blocking.
+
+Settings (environment):
+    LOG_LEVEL       root level (default INFO)
+    LOG_LEVELS      per-logger levels, e.g. "sqlalchemy.engine=INFO,werkzeug=WARNING"
+    LOG_SAMPLE      keep 1 in N records below WARNING for noisy loggers,
+                    e.g. "access=0.1,sqlalchemy.engine=0.01"; kept records
+                    carry "sample_rate" so aggregators can scale counts back up
+    LOG_FORMAT      json (default) or text
+    LOG_QUEUE_SIZE  records buffered before dropping (default 10000)
+
+Output is one JSON object per line with time, level, logger, message,
+request_id (inside a request) and any extra= fields. Every response carries
+the request id in X-Request-ID, taken from the incoming header when present.
+"""
+
+import atexit
+import json
+import logging
+import os
+import queue
+import sys
+import time
+import uuid
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from flask import g, has_request_context, request
+
+access_logger = logging.getLogger('access')
+
+# Attributes every LogRecord has; anything else came in through extra=
+RECORD_ATTRIBUTES = set(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'asctime'}
+
+_listener = None
+_queue_handler = None
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record"""
+
+    def format(self, record):
+        payload = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in RECORD_ATTRIBUTES and not key.startswith('_'):
+                payload[key] = value
+        if record.exc_info:
+            payload['exc_info'] = self.formatException(record.exc_info)
+        return json.dumps(payload, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """Keep 1 in N records below WARNING from the configured loggers and their children"""
+
+    def __init__(self, rates):
+        super().__init__()
+        # Longest prefix first, so "sqlalchemy.engine" wins over "sqlalchemy"
+        self.rates = sorted(rates.items(), key=lambda item: -len(item[0]))
+        self._counts = {}
+
+    def _rate(self, name):
+        for prefix, rate in self.rates:
+            if name == prefix or name.startswith(prefix + '.'):
+                return prefix, rate
+        return None, 1.0
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING:
+            return True
+        prefix, rate = self._rate(record.name)
+        if rate >= 1.0:
+            return True
+        if rate <= 0:
+            return False
+        every = round(1 / rate)
+        # Racy under threads, which only blurs exactly which records are kept
+        count = self._counts.get(prefix, 0)
+        self._counts[prefix] = count + 1
+        if count % every:
+            return False
+        record.sample_rate = rate
+        return True
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """Hands records to the listener thread without formatting them or ever blocking"""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # Merge the arguments now, since they may change after the call returns;
+        # formatting is left to the listener
+        record.msg = record.getMessage()
+        record.args = None
+        if has_request_context() and 'request_id' in g:
+            record.request_id = g.request_id
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def _parse_pairs(raw, convert):
+    pairs = {}
+    for item in (raw or '').split(','):
+        if '=' in item:
+            name, value = item.split('=', 1)
+            pairs[name.strip()] = convert(value.strip())
+    return pairs
+
+
+def configure_logging(stream=None, environ=None):
+    """Install the queue handler and start the listener; call once from the entry point"""
+    global _listener, _queue_handler
+    environ = os.environ if environ is None else environ
+    if _queue_handler is None:
+        atexit.register(stop_logging)
+    if _listener is not None:
+        _listener.stop()
+
+    output = logging.StreamHandler(stream or sys.stderr)
+    if environ.get('LOG_FORMAT', 'json') == 'json':
+        output.setFormatter(JsonFormatter())
+    else:
+        output.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s',
+                                              defaults={'request_id': '-'}))
+
+    _queue_handler = NonBlockingQueueHandler(queue.Queue(int(environ.get('LOG_QUEUE_SIZE', 10000))))
+    sample = _parse_pairs(environ.get('LOG_SAMPLE'), float)
+    if sample:
+        _queue_handler.addFilter(SamplingFilter(sample))
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(_queue_handler)
+    root.setLevel(environ.get('LOG_LEVEL', 'INFO').upper())
+    for name, level in _parse_pairs(environ.get('LOG_LEVELS'), str.upper).items():
+        logging.getLogger(name).setLevel(level)
+
+    _listener = QueueListener(_queue_handler.queue, output, respect_handler_level=True)
+    _listener.start()
+    return _listener
+
+
+def after_fork():
+    """Give a forked worker its own queue and listener thread (threads do not survive fork)"""
+    global _listener
+    if _listener is None:
+        return
+    handlers = _listener.handlers
+    _queue_handler.queue = queue.Queue(_queue_handler.queue.maxsize)
+    _queue_handler.dropped = 0
+    _listener = QueueListener(_queue_handler.queue, *handlers, respect_handler_level=True)
+    _listener.start()
+
+
+def stop_logging():
+    """Flush queued records; runs at exit"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def init_request_logging(app):
+    """Request ids and one access record per request"""
+
+    @app.before_request
+    def assign_request_id():
+        # A proxy's id is kept so records can be joined across services
+        incoming = request.headers.get('X-Request-ID', '')
+        g.request_id = incoming if 0 < len(incoming) <= 128 and incoming.isprintable() else uuid.uuid4().hex
+        g.request_started = time.perf_counter()
+
+    @app.after_request
+    def log_request(response):
+        if 'request_id' not in g:
+            return response
+        response.headers['X-Request-ID'] = g.request_id
+        if access_logger.isEnabledFor(logging.INFO):
+            access_logger.info('%s %s %s', request.method, request.path, response.status_code, extra={
+                'method': request.method,
+                'path': request.path,
+                'status': response.status_code,
+                'duration_ms': round((time.perf_counter() - g.request_started) * 1000, 2),
+            })
+        return response
@@ -1,4 +1,16 @@
-from app import app
+from app import create_app
+from logconfig import configure_logging
+
+# Logging is configured by the entry point, never by an imported module
+configure_logging()
+
+app = create_app()
 
 if __name__ == '__main__':
+    import os
+    from readiness import warm_pool
+    # The development server runs every request in its own thread, so streams are fine
+    if 'SSE_ENABLED' not in os.environ:
+        app.config['SSE_ENABLED'] = True
+    warm_pool(app)
     app.run(host='0.0.0.0', port=5000, debug=True)
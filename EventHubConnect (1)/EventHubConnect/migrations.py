@@ -0,0 +1,83 @@
+"""
+Idempotent schema upgrades for databases created before a change.
+
+db.create_all() only creates missing tables, so columns and indexes added to
+existing tables are applied here. Every step checks the live schema first and
+is safe to run repeatedly: `flask db-upgrade`.
+"""
+
+import logging
+from sqlalchemy import inspect, text
+from extensions import db
+from models import Event, Registration, LONG_EVENT_SPAN, reconcile_registration_counts
+
+logger = logging.getLogger(__name__)
+
+
+def _add_registration_count(connection):
+    """Add events.registration_count and backfill it"""
+    columns = {c['name'] for c in inspect(connection).get_columns('events')}
+    if 'registration_count' in columns:
+        return False
+    connection.execute(text(
+        "ALTER TABLE events ADD COLUMN registration_count INTEGER NOT NULL DEFAULT 0"
+    ))
+    return True
+
+
+def _add_long_running_flag(connection):
+    """Add events.is_long_running and backfill it from the event dates"""
+    columns = {c['name'] for c in inspect(connection).get_columns('events')}
+    if 'is_long_running' in columns:
+        return False
+    connection.execute(text(
+        "ALTER TABLE events ADD COLUMN is_long_running BOOLEAN NOT NULL DEFAULT FALSE"
+    ))
+    # Date arithmetic differs between databases, so the spans are compared here
+    table = Event.__table__
+    rows = connection.execute(db.select(table.c.id, table.c.start_datetime, table.c.end_datetime))
+    long_running = [event_id for event_id, start, end in rows if end - start > LONG_EVENT_SPAN]
+    for start in range(0, len(long_running), 500):
+        connection.execute(table.update().where(table.c.id.in_(long_running[start:start + 500]))
+                           .values(is_long_running=True))
+    return True
+
+
+def _create_indexes(connection):
+    """Create any model-declared index missing from the database"""
+    created = False
+    inspector = inspect(connection)
+    for model in (Event, Registration):
+        table = model.__table__
+        existing = {ix['name'] for ix in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing:
+                index.create(connection)
+                logger.info("Created index %s", index.name)
+                created = True
+    return created
+
+
+MIGRATIONS = [
+    ('add events.registration_count', _add_registration_count),
+    ('add events.is_long_running', _add_long_running_flag),
+    ('create hot-path indexes', _create_indexes),
+]
+
+
+def upgrade():
+    """Apply every pending migration step; returns the names of applied steps"""
+    applied = []
+    db.create_all()
+    with db.engine.begin() as connection:
+        for name, step in MIGRATIONS:
+            if step(connection):
+                applied.append(name)
+
+    if 'add events.registration_count' in applied:
+        reconcile_registration_counts()
+
+    # Refresh planner statistics so the new indexes are picked up
+    with db.engine.begin() as connection:
+        connection.execute(text("ANALYZE"))
+    return applied
@@ -1,8 +1,11 @@
-from datetime import datetime
+from datetime import datetime, timedelta
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
-from werkzeug.security import generate_password_hash, check_password_hash
-from app import db
+from sqlalchemy import event as sa_event, inspect, update
+from sqlalchemy.orm import Session
+from extensions import db
+from passwords import hash_password, verify_password
+from templating import event_type_image, EVENT_TYPE_COLORS
 
 class User(UserMixin, db.Model):
     """Extended User model with custom fields"""
@@ -28,11 +31,14 @@ class User(UserMixin, db.Model):
     
     def set_password(self, password):
         """Set password hash"""
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = hash_password(password)
     
     def check_password(self, password):
-        """Check password against hash"""
-        return check_password_hash(self.password_hash, password)
+        """Check password against hash, upgrading it to the configured profile on a match"""
+        matches, needs_rehash = verify_password(self.password_hash, password)
+        if needs_rehash:
+            self.password_hash = hash_password(password)
+        return matches
     
     def is_organizer(self):
         """Check if user is an organizer"""
@@ -50,6 +56,18 @@ class User(UserMixin, db.Model):
     def __repr__(self):
         return f'<User {self.username}>'
 
+# Calendar range queries look back this far from a range's start for events
+# still running; longer events are flagged and found through their own index
+LONG_EVENT_SPAN = timedelta(days=7)
+
+
+def _is_long_running(context):
+    """Column default; also evaluated for executemany inserts (bulk import, scale data)"""
+    params = context.get_current_parameters()
+    start, end = params.get('start_datetime'), params.get('end_datetime')
+    return bool(start and end and end - start > LONG_EVENT_SPAN)
+
+
 class Event(db.Model):
     """Event model"""
     __tablename__ = 'events'
@@ -68,25 +86,43 @@ class Event(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    # Denormalized count of non-cancelled registrations, maintained by the
+    # Registration mapper events below (see `flask reconcile-counts`)
+    registration_count = db.Column(db.Integer, default=0, server_default='0', nullable=False)
+    
+    # Lasts longer than LONG_EVENT_SPAN; kept in step with the dates (see calendars.py)
+    is_long_running = db.Column(db.Boolean, default=_is_long_running, server_default='0', nullable=False)
+    
     # Foreign keys
     organizer_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     
     # Relationships
     registrations = db.relationship('Registration', backref='event', lazy=True, cascade='all, delete-orphan')
     
+    # Indexes for the hot access paths: the public listing (active events by
+    # start time, optionally by type, keyset-paginated on id) and the
+    # organizer dashboard; plus the few long-running events a calendar range
+    # must reach back for
+    __table_args__ = (
+        db.Index('ix_events_active_start', 'is_active', 'start_datetime', 'id'),
+        db.Index('ix_events_active_type_start', 'is_active', 'event_type', 'start_datetime', 'id'),
+        db.Index('ix_events_organizer_start', 'organizer_id', 'start_datetime'),
+        db.Index('ix_events_long_running_end', 'is_long_running', 'end_datetime'),
+    )
+    
     @property
     def available_spots(self):
         """Calculate available spots"""
         if self.max_attendees is None:
             return None
-        return self.max_attendees - len(self.registrations)
+        return self.max_attendees - self.registration_count
     
     @property
     def is_full(self):
         """Check if event is full"""
         if self.max_attendees is None:
             return False
-        return len(self.registrations) >= self.max_attendees
+        return self.registration_count >= self.max_attendees
     
     @property
     def is_registration_open(self):
@@ -99,26 +135,12 @@ class Event(db.Model):
     @property
     def image_url(self):
         """Get the appropriate image URL for this event type"""
-        from flask import url_for
-        valid_types = ['conference', 'networking', 'workshop', 'seminar', 'meeting']
-        
-        if self.event_type in valid_types:
-            return url_for('static', filename=f'images/events/{self.event_type}.svg')
-        else:
-            return url_for('static', filename='images/events/other.svg')
+        return event_type_image(self.event_type)
     
     @property
     def type_color(self):
         """Get the appropriate color for this event type"""
-        colors = {
-            'conference': '#6f42c1',
-            'networking': '#198754',
-            'workshop': '#ffc107',
-            'seminar': '#dc3545',
-            'meeting': '#17a2b8',
-            'other': '#6c757d'
-        }
-        return colors.get(self.event_type, colors['other'])
+        return EVENT_TYPE_COLORS.get(self.event_type, EVENT_TYPE_COLORS['other'])
     
     def __repr__(self):
         return f'<Event {self.title}>'
@@ -129,13 +151,112 @@ class Registration(db.Model):
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
-    event_id = db.Column(db.Integer, db.ForeignKey('events.id'), nullable=False)
+    # active_history loads the previous value on change so the counter listeners can diff it
+    event_id = db.column_property(db.Column(db.Integer, db.ForeignKey('events.id'), nullable=False), active_history=True)
     registered_at = db.Column(db.DateTime, default=datetime.utcnow)
-    status = db.Column(db.String(20), default='registered', nullable=False)  # 'registered', 'cancelled', 'attended'
+    status = db.column_property(db.Column(db.String(20), default='registered', nullable=False), active_history=True)  # 'registered', 'cancelled', 'attended'
     notes = db.Column(db.Text, nullable=True)
     
-    # Unique constraint to prevent duplicate registrations
-    __table_args__ = (db.UniqueConstraint('user_id', 'event_id', name='unique_user_event_registration'),)
+    # Unique constraint to prevent duplicate registrations; its (user_id, event_id)
+    # index also serves lookups by user. Per-event status counts and the
+    # paginated attendee roster each have their own index.
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'event_id', name='unique_user_event_registration'),
+        db.Index('ix_registrations_event_status', 'event_id', 'status'),
+        db.Index('ix_registrations_event_registered', 'event_id', 'registered_at', 'id'),
+    )
+    
+    # Statuses that occupy a seat and are included in Event.registration_count
+    COUNTED_STATUSES = ('registered', 'attended')
+    
+    @property
+    def counts_towards_capacity(self):
+        """Check if this registration occupies a seat"""
+        return (self.status or 'registered') in self.COUNTED_STATUSES
     
     def __repr__(self):
         return f'<Registration {self.user.username} -> {self.event.title}>'
+
+
+@sa_event.listens_for(Event, 'before_update')
+def _event_dates_changed(mapper, connection, target):
+    if target.start_datetime and target.end_datetime:
+        target.is_long_running = target.end_datetime - target.start_datetime > LONG_EVENT_SPAN
+
+
+def _adjust_registration_count(connection, event_id, delta):
+    """Apply a delta to an event's registration counter in the current transaction"""
+    connection.execute(
+        update(Event.__table__)
+        .where(Event.__table__.c.id == event_id)
+        .values(registration_count=Event.__table__.c.registration_count + delta)
+    )
+
+
+def _mark_counter_stale(target, event_id):
+    """Remember which Event rows need their in-session counter expired after flush"""
+    session = inspect(target).session
+    if session is not None:
+        session.info.setdefault('stale_registration_counts', set()).add(event_id)
+
+
+@sa_event.listens_for(Registration, 'after_insert')
+def _registration_inserted(mapper, connection, target):
+    if target.counts_towards_capacity:
+        _adjust_registration_count(connection, target.event_id, 1)
+        _mark_counter_stale(target, target.event_id)
+
+
+@sa_event.listens_for(Registration, 'after_delete')
+def _registration_deleted(mapper, connection, target):
+    if target.counts_towards_capacity:
+        _adjust_registration_count(connection, target.event_id, -1)
+        _mark_counter_stale(target, target.event_id)
+
+
+@sa_event.listens_for(Registration, 'after_update')
+def _registration_updated(mapper, connection, target):
+    state = inspect(target)
+    status_history = state.attrs.status.history
+    event_history = state.attrs.event_id.history
+    if not status_history.has_changes() and not event_history.has_changes():
+        return
+    
+    old_status = status_history.deleted[0] if status_history.deleted else target.status
+    old_event_id = event_history.deleted[0] if event_history.deleted else target.event_id
+    
+    if (old_status or 'registered') in Registration.COUNTED_STATUSES:
+        _adjust_registration_count(connection, old_event_id, -1)
+        _mark_counter_stale(target, old_event_id)
+    if target.counts_towards_capacity:
+        _adjust_registration_count(connection, target.event_id, 1)
+        _mark_counter_stale(target, target.event_id)
+
+
+@sa_event.listens_for(Session, 'after_flush_postexec')
+def _expire_stale_counters(session, flush_context):
+    """Reload counters changed by SQL so in-session Event objects stay accurate"""
+    event_ids = session.info.pop('stale_registration_counts', None)
+    if not event_ids:
+        return
+    for obj in list(session.identity_map.values()):
+        if isinstance(obj, Event) and obj.id in event_ids:
+            session.expire(obj, ['registration_count'])
+
+
+def reconcile_registration_counts():
+    """Rebuild every Event.registration_count from the registrations table"""
+    counted = (
+        db.select(db.func.count(Registration.id))
+        .where(Registration.event_id == Event.id)
+        .where(Registration.status.in_(Registration.COUNTED_STATUSES))
+        .scalar_subquery()
+    )
+    result = db.session.execute(
+        update(Event)
+        .where(Event.registration_count != counted)
+        .values(registration_count=counted)
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+    return result.rowcount
@@ -0,0 +1,107 @@
+"""
+Keyset (cursor) pagination.
+
+Pages are addressed by an opaque token that encodes the sort key of the row
+at the page boundary, so fetching page N is a range scan on the sort index
+instead of an OFFSET over every earlier row, and no COUNT(*) is needed.
+"""
+
+import base64
+import json
+from datetime import datetime
+from extensions import db
+
+
+class InvalidCursor(ValueError):
+    """Raised when a cursor token cannot be decoded"""
+
+
+def encode_cursor(values, direction):
+    """Encode a boundary sort key and direction ('next' or 'prev') as a URL-safe token"""
+    payload = [direction[0]] + [v.isoformat() if isinstance(v, datetime) else v for v in values]
+    raw = json.dumps(payload, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(token, columns):
+    """Decode a cursor token into (direction, values) typed like columns"""
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        payload = json.loads(raw)
+        direction = {'n': 'next', 'p': 'prev'}[payload[0]]
+        raw_values = payload[1:]
+        if len(raw_values) != len(columns):
+            raise ValueError('cursor does not match sort key')
+        values = []
+        for column, value in zip(columns, raw_values):
+            if column.type.python_type is datetime:
+                value = datetime.fromisoformat(value)
+            values.append(value)
+    except (ValueError, KeyError, IndexError, TypeError, NotImplementedError) as e:
+        raise InvalidCursor(str(e)) from e
+    return direction, tuple(values)
+
+
+class KeysetPage:
+    """One page of keyset-paginated results"""
+
+    def __init__(self, items, columns, has_next, has_prev):
+        self.items = items
+        self.has_next = has_next
+        self.has_prev = has_prev
+        self._columns = columns
+
+    def _key(self, item):
+        return [getattr(item, column.key) for column in self._columns]
+
+    @property
+    def next_cursor(self):
+        if not self.has_next or not self.items:
+            return None
+        return encode_cursor(self._key(self.items[-1]), 'next')
+
+    @property
+    def prev_cursor(self):
+        if not self.has_prev or not self.items:
+            return None
+        return encode_cursor(self._key(self.items[0]), 'prev')
+
+
+def _fetch(query, columns, direction, values, per_page):
+    """Up to per_page rows beyond values in direction, and whether more follow"""
+    key = db.tuple_(*columns)
+    if values is not None:
+        query = query.filter(key > db.tuple_(*values) if direction == 'next' else key < db.tuple_(*values))
+    order = [column.asc() if direction == 'next' else column.desc() for column in columns]
+    # One extra row tells us whether another page exists in this direction
+    rows = query.order_by(*order).limit(per_page + 1).all()
+    return rows[:per_page], len(rows) > per_page
+
+
+def _exists(query):
+    return db.session.query(query.exists()).scalar()
+
+
+def keyset_paginate(query, columns, cursor=None, per_page=12):
+    """Paginate query in ascending order of columns starting after/before cursor.
+
+    columns must form a unique sort key, e.g. (Event.start_datetime, Event.id).
+    """
+    key = db.tuple_(*columns)
+    direction, values = decode_cursor(cursor, columns) if cursor else ('next', None)
+    rows, has_more = _fetch(query, columns, direction, values, per_page)
+
+    if not rows and values is not None:
+        # Nothing left beyond the cursor (rows deleted since the link was made):
+        # show the page at that end of the list instead of an empty one
+        direction = 'prev' if direction == 'next' else 'next'
+        values = None
+        rows, has_more = _fetch(query, columns, direction, values, per_page)
+
+    # The other side of the cursor is checked, not assumed
+    if direction == 'next':
+        has_prev = values is not None and _exists(query.filter(key <= db.tuple_(*values)))
+        return KeysetPage(rows, columns, has_next=has_more, has_prev=has_prev)
+    rows.reverse()
+    has_next = values is not None and _exists(query.filter(key >= db.tuple_(*values)))
+    return KeysetPage(rows, columns, has_next=has_next, has_prev=has_more)
@@ -0,0 +1,101 @@
+"""
+Password hashing profiles and a bounded hashing pool.
+
+PASSWORD_HASH_PROFILE picks the werkzeug method used for new hashes, either
+one of PROFILES or a raw method string such as 'scrypt:65536:8:1'. Short
+forms ('scrypt', 'pbkdf2:sha256') are expanded to the parameters werkzeug
+fills in, so they compare equal to the prefix of the hashes they produce.
+When a user logs in with a hash made under other parameters, the password is
+rehashed with the current profile.
+
+Hashing and verification run in a small thread pool (PASSWORD_HASH_WORKERS).
+hashlib releases the GIL, so at most that many hashes burn CPU at once and
+the remaining request threads keep rendering pages. Callers wait at most
+PASSWORD_HASH_TIMEOUT seconds for a free slot among workers plus
+PASSWORD_HASH_QUEUE waiting jobs; after that HashingBusy is raised, so a
+login burst is shed instead of piling up. PASSWORD_HASH_WORKERS=0 hashes
+inline on the request thread.
+"""
+
+import functools
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app, has_app_context
+from werkzeug.security import generate_password_hash, check_password_hash
+
+PROFILES = {
+    'default': 'scrypt:32768:8:1',  # werkzeug's default
+    'low': 'scrypt:16384:8:1',
+    'high': 'scrypt:65536:8:1',
+    'pbkdf2': 'pbkdf2:sha256:600000',
+    # Only for tests, benchmarks and throwaway data
+    'insecure': 'pbkdf2:sha256:1000',
+}
+
+
+class HashingBusy(Exception):
+    """Raised when no hashing slot frees up within PASSWORD_HASH_TIMEOUT"""
+
+
+class HashingPool:
+    """Bounded pool that runs password hashing off the request thread"""
+
+    def __init__(self, workers, queue_size=32, timeout=5.0):
+        self.workers = workers
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(workers + queue_size) if workers else None
+        self._executor = ThreadPoolExecutor(workers, thread_name_prefix='password-hash') if workers else None
+
+    def run(self, fn, *args):
+        if self._executor is None:
+            return fn(*args)
+        if not self._slots.acquire(timeout=self.timeout):
+            raise HashingBusy()
+        try:
+            return self._executor.submit(fn, *args).result()
+        finally:
+            self._slots.release()
+
+
+@functools.lru_cache(maxsize=None)
+def _full_method(method):
+    # werkzeug writes the method with every parameter into the hash prefix
+    return generate_password_hash('', method).split('$', 1)[0]
+
+
+def hash_method(profile=None):
+    """Resolve a profile name (or raw method string) to a werkzeug method with all its parameters"""
+    if profile is None:
+        profile = current_app.config.get('PASSWORD_HASH_PROFILE', 'default') if has_app_context() else 'default'
+    return _full_method(PROFILES.get(profile, profile))
+
+
+def _pool():
+    if has_app_context():
+        pool = current_app.extensions.get('password_hasher')
+        if pool is not None:
+            return pool
+    return HashingPool(0)
+
+
+def hash_password(password):
+    """Hash a password with the configured profile"""
+    return _pool().run(generate_password_hash, password, hash_method())
+
+
+def verify_password(password_hash, password):
+    """Check a password; returns (matches, needs_rehash)"""
+    matches = _pool().run(check_password_hash, password_hash, password)
+    return matches, matches and password_hash.split('$', 1)[0] != hash_method()
+
+
+def init_passwords(app):
+    """Create the hashing pool for this app"""
+    pool = HashingPool(app.config.get('PASSWORD_HASH_WORKERS', max(1, (os.cpu_count() or 2) // 2)),
+                       app.config.get('PASSWORD_HASH_QUEUE', 32),
+                       app.config.get('PASSWORD_HASH_TIMEOUT', 5.0))
+    app.extensions['password_hasher'] = pool
+    # Expand the configured method once, and reject an unknown one at startup
+    hash_method(app.config.get('PASSWORD_HASH_PROFILE', 'default'))
+    return pool
@@ -0,0 +1,179 @@
+"""
+Engine options, SQLite tuning and connection pool metrics.
+
+SQLITE_PROFILE=tuned (the default) configures SQLite file databases for
+several worker processes sharing one file:
+
+    journal_mode=WAL      readers no longer block on the writer, nor it on them
+    busy_timeout          a locked database is waited on (SQLITE_BUSY_TIMEOUT ms)
+                          instead of failing with "database is locked"
+    synchronous=NORMAL    fsync at checkpoints rather than every commit; safe
+                          with WAL, a power cut can lose only the last commits
+    cache_size, mmap_size page cache and memory-mapped reads per connection
+    temp_store=MEMORY     sorts and temporary indexes stay off disk
+
+The pragmas run once per new connection. Pre-ping and recycling are
+dropped for SQLite: a file handle does not go stale, and the ping was a
+round trip on every checkout. SQLITE_PROFILE=plain keeps the previous
+behaviour; other databases keep pre-ping and recycling in both profiles.
+
+Every queue pool is a MeteredQueuePool. It counts checkouts, new connections
+and timeouts and times each checkout (waiting for a free connection or
+opening one). Totals per engine appear under "pools" in /readyz, and with
+SQL_INSTRUMENTATION on, the checkout time of a request is added to its
+Server-Timing header.
+"""
+
+import threading
+import time
+from flask import g, has_app_context
+from sqlalchemy import event as sa_event
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeout
+from sqlalchemy.pool import QueuePool
+
+
+class PoolMetrics:
+    """Checkout counters and timings for one pool"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.checkouts = 0
+        self.connects = 0
+        self.timeouts = 0
+        self.checkout_seconds = 0.0
+        self.max_checkout_seconds = 0.0
+
+    def record(self, seconds, timed_out=False):
+        with self.lock:
+            self.checkouts += 1
+            self.timeouts += timed_out
+            self.checkout_seconds += seconds
+            self.max_checkout_seconds = max(self.max_checkout_seconds, seconds)
+
+
+class MeteredQueuePool(QueuePool):
+    """QueuePool that records how long each checkout takes"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.metrics = PoolMetrics()
+
+    def recreate(self):
+        # Disposing an engine recreates its pool; the totals carry on
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+    def connect(self):
+        started = time.perf_counter()
+        timed_out = False
+        try:
+            return super().connect()
+        except PoolTimeout:
+            timed_out = True
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            self.metrics.record(elapsed, timed_out)
+            if has_app_context():
+                stats = g.get('sql_stats')
+                if stats is not None:
+                    stats.pool_wait += elapsed
+
+    def _create_connection(self):
+        with self.metrics.lock:
+            self.metrics.connects += 1
+        return super()._create_connection()
+
+
+def _is_sqlite_file(url):
+    return url.get_backend_name() == 'sqlite' and url.database not in (None, '', ':memory:')
+
+
+def engine_options(url, config):
+    """Engine options for one database URL"""
+    url = make_url(url)
+    if url.get_backend_name() == 'sqlite' and not _is_sqlite_file(url):
+        # In-memory databases get a StaticPool from Flask-SQLAlchemy
+        return {}
+    options = {
+        'poolclass': MeteredQueuePool,
+        'pool_size': config['DB_POOL_SIZE'],
+        'max_overflow': config['DB_MAX_OVERFLOW'],
+        'pool_timeout': config['DB_POOL_TIMEOUT'],
+    }
+    if not (_is_sqlite_file(url) and config['SQLITE_PROFILE'] == 'tuned'):
+        options.update(pool_recycle=300, pool_pre_ping=True)
+    return options
+
+
+def _sqlite_pragmas(config):
+    return [
+        'PRAGMA journal_mode=WAL',
+        f"PRAGMA busy_timeout={config['SQLITE_BUSY_TIMEOUT']}",
+        'PRAGMA synchronous=NORMAL',
+        f"PRAGMA cache_size=-{config['SQLITE_CACHE_KB']}",
+        f"PRAGMA mmap_size={config['SQLITE_MMAP_SIZE']}",
+        'PRAGMA temp_store=MEMORY',
+    ]
+
+
+def init_pooling(app):
+    """Set engine options for the primary and every bind; must run before db.init_app"""
+    config = app.config
+    options = dict(config.get('SQLALCHEMY_ENGINE_OPTIONS') or {})
+    options.update(engine_options(config['SQLALCHEMY_DATABASE_URI'], config))
+    config['SQLALCHEMY_ENGINE_OPTIONS'] = options
+    # Flask-SQLAlchemy applies SQLALCHEMY_ENGINE_OPTIONS to the primary only
+    binds = {}
+    for key, value in (config.get('SQLALCHEMY_BINDS') or {}).items():
+        bind = dict(value) if isinstance(value, dict) else {'url': value}
+        binds[key] = {**engine_options(bind['url'], config), **bind}
+    config['SQLALCHEMY_BINDS'] = binds
+
+
+def install_pragmas(app):
+    """Apply the SQLite pragmas to each new connection; needs the engines, so after db.init_app"""
+    from extensions import db
+    if app.config['SQLITE_PROFILE'] != 'tuned':
+        return
+    pragmas = _sqlite_pragmas(app.config)
+    with app.app_context():
+        engines = [engine for engine in db.engines.values() if _is_sqlite_file(engine.url)]
+
+    def apply_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for pragma in pragmas:
+                cursor.execute(pragma)
+        finally:
+            cursor.close()
+
+    for engine in engines:
+        sa_event.listen(engine, 'connect', apply_pragmas)
+
+
+def pool_metrics(app):
+    """Checkout totals and current pool state for each engine"""
+    from extensions import db
+    report = {}
+    with app.app_context():
+        engines = dict(db.engines)
+    for key, engine in engines.items():
+        pool = engine.pool
+        metrics = getattr(pool, 'metrics', None)
+        if metrics is None:
+            continue
+        with metrics.lock:
+            report[key or 'primary'] = {
+                'size': pool.size(),
+                'checked_out': pool.checkedout(),
+                'overflow': pool.overflow(),
+                'checkouts': metrics.checkouts,
+                'connects': metrics.connects,
+                'timeouts': metrics.timeouts,
+                'checkout_ms_total': round(metrics.checkout_seconds * 1000, 2),
+                'checkout_ms_max': round(metrics.max_checkout_seconds * 1000, 2),
+            }
+    return report
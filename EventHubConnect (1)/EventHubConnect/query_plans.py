@@ -0,0 +1,185 @@
+"""
+Query-plan regression checks.
+
+Requests every read route through the test client against the current
+database, captures the statements each one actually executes (see
+instrumentation.capture_statements), and runs EXPLAIN QUERY PLAN (SQLite) or
+EXPLAIN (PostgreSQL) for every distinct SELECT, reporting any full scan of a
+large table. Run it in CI with `flask check-query-plans` against a database
+with some data in it (`flask seed-scale-data` with small counts will do); it
+exits non-zero when a plan regresses.
+"""
+
+import logging
+import re
+from contextlib import contextmanager
+from flask import current_app
+from sqlalchemy import text
+from extensions import db
+from models import Event, Registration
+
+# Tables that grow with traffic; a full scan of any of these is a regression
+LARGE_TABLES = ('events', 'registrations', 'users')
+
+_WHITESPACE = re.compile(r'\s+')
+
+
+def pick_samples():
+    """Ids and cursors to request the routes with, taken from the current database"""
+    from pagination import encode_cursor
+    from calendars import feed_token
+
+    event = (db.session.query(Event).filter(Event.is_active.is_(True))
+             .order_by(Event.registration_count.desc(), Event.id).first())
+    first_attendee = event and (db.session.query(Registration.registered_at, Registration.id)
+                                .filter(Registration.event_id == event.id)
+                                .order_by(Registration.registered_at, Registration.id).first())
+    attendee_id = (db.session.query(Registration.user_id).group_by(Registration.user_id)
+                   .order_by(db.func.count(Registration.id).desc()).limit(1).scalar())
+    if first_attendee is None or attendee_id is None:
+        raise RuntimeError('Query plans are checked by requesting the routes; the database needs an '
+                           'active event with registrations (try `flask seed-scale-data`)')
+    year, week, _ = event.start_datetime.isocalendar()
+    return {
+        'event_id': event.id,
+        'event_type': event.event_type,
+        'organizer_id': event.organizer_id,
+        'attendee_id': attendee_id,
+        'month': f'{event.start_datetime.year}/{event.start_datetime.month}',
+        'week': f'{year}/week/{week}',
+        'event_cursor': encode_cursor((event.start_datetime, event.id), 'next'),
+        'event_prev_cursor': encode_cursor((event.start_datetime, event.id), 'prev'),
+        'attendee_cursor': encode_cursor(first_attendee, 'next'),
+        'feed_token': feed_token(attendee_id),
+    }
+
+
+def route_requests(samples):
+    """(name, signed-in user id or None, method, path, form data) for every read route"""
+    event_id, organizer_id, attendee_id = samples['event_id'], samples['organizer_id'], samples['attendee_id']
+    return [
+        ('list_events', None, 'GET', '/events/', None),
+        ('list_events (type filter)', None, 'GET', f"/events/?type={samples['event_type']}", None),
+        ('list_events (next cursor)', None, 'GET', f"/events/?cursor={samples['event_cursor']}", None),
+        ('list_events (prev cursor)', None, 'GET', f"/events/?cursor={samples['event_prev_cursor']}", None),
+        ('list_events (legacy page)', None, 'GET', '/events/?page=2', None),
+        ('list_events (search)', None, 'GET', '/events/?search=python', None),
+        ('event_detail', attendee_id, 'GET', f'/events/{event_id}', None),
+        ('calendar_month', None, 'GET', f"/events/calendar/{samples['month']}", None),
+        ('calendar_week', None, 'GET', f"/events/calendar/{samples['week']}", None),
+        ('organizer_feed', None, 'GET', f'/events/calendar/organizers/{organizer_id}.ics', None),
+        ('user_feed', None, 'GET', f"/events/calendar/users/{attendee_id}/{samples['feed_token']}.ics", None),
+        ('edit_event', organizer_id, 'GET', f'/events/{event_id}/edit', None),
+        ('register_for_event', attendee_id, 'GET', f'/events/{event_id}/register', None),
+        ('organizer_dashboard', organizer_id, 'GET', '/events/organizer/dashboard', None),
+        ('event_attendees', organizer_id, 'GET', f'/events/{event_id}/attendees', None),
+        ('event_attendees (next cursor)', organizer_id, 'GET',
+         f"/events/{event_id}/attendees?cursor={samples['attendee_cursor']}", None),
+        ('export_attendees', organizer_id, 'GET', f'/events/{event_id}/attendees/export.csv', None),
+        ('users.login', None, 'POST', '/users/login', {'username': 'query-plan-check', 'password': 'x'}),
+        ('users.profile', attendee_id, 'GET', '/users/profile', None),
+        ('users.edit_profile', attendee_id, 'GET', '/users/profile/edit', None),
+        ('users.dashboard', attendee_id, 'GET', '/users/dashboard', None),
+        ('api.list_events', None, 'GET', '/api/v1/events', None),
+        ('api.list_events (search)', None, 'GET', '/api/v1/events?search=python', None),
+        ('api.batch_events', None, 'GET', f'/api/v1/events/batch?ids={event_id},{organizer_id}', None),
+        ('api.event_detail', None, 'GET', f'/api/v1/events/{event_id}', None),
+        ('api.event_availability', None, 'GET', f'/api/v1/events/{event_id}/availability', None),
+        ('api.my_registrations', attendee_id, 'GET', '/api/v1/me/registrations', None),
+    ]
+
+
+@contextmanager
+def _checking(app):
+    # Every request must reach the database, the login form must accept a plain
+    # post, and the access log would bury the report
+    cache = app.extensions.get('response_cache')
+    csrf = app.config.get('WTF_CSRF_ENABLED', True)
+    access_log = logging.getLogger('access')
+    level = access_log.level
+    app.extensions['response_cache'] = None
+    app.config['WTF_CSRF_ENABLED'] = False
+    access_log.setLevel(logging.WARNING)
+    try:
+        yield
+    finally:
+        app.extensions['response_cache'] = cache
+        app.config['WTF_CSRF_ENABLED'] = csrf
+        access_log.setLevel(level)
+
+
+def route_queries():
+    """Distinct SELECTs each route executes, as {name: (statement, parameters)}.
+
+    A statement shared by several routes is listed under the first of them.
+    """
+    from instrumentation import capture_statements
+
+    app = current_app._get_current_object()
+    samples = pick_samples()
+    queries = {}
+    seen = set()
+    with _checking(app):
+        for route, user_id, method, path, data in route_requests(samples):
+            client = app.test_client()
+            if user_id is not None:
+                with client.session_transaction() as session:
+                    session['_user_id'] = str(user_id)
+                    session['_fresh'] = True
+            # A fresh context per request: requests would otherwise share the
+            # caller's g, and with it Flask-Login's current user
+            with app.app_context(), capture_statements() as captured:
+                response = client.open(path, method=method, data=data)
+                response.get_data()
+            # Redirects are fine (registering for a full event, say) unless they are to sign in
+            if response.status_code >= 400 or '/users/login' in response.headers.get('Location', ''):
+                raise RuntimeError(f'{method} {path} answered {response.status_code}; its queries were not run')
+            number = 0
+            for statement, parameters in captured:
+                shape = _WHITESPACE.sub(' ', statement).strip()
+                if shape in seen or not shape.upper().startswith(('SELECT', 'WITH')):
+                    continue
+                seen.add(shape)
+                number += 1
+                queries[f'{route} #{number}'] = (shape, parameters)
+    return queries
+
+
+def explain(connection, statement, parameters=()):
+    """Return the plan for a statement, as executed by the driver, as a list of text lines"""
+    if connection.dialect.name == 'sqlite':
+        rows = connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).all()
+        return [row[-1] for row in rows]
+    rows = connection.exec_driver_sql(f"EXPLAIN {statement}", parameters).all()
+    return [row[0] for row in rows]
+
+
+def full_scans(dialect_name, plan):
+    """Return plan lines that scan a whole large table"""
+    if dialect_name == 'sqlite':
+        # "SCAN events" or "SCAN events USING INDEX ..." walk the whole table or
+        # index; "SEARCH ..." lines are range lookups and are fine
+        pattern = re.compile(r'^SCAN (\w+)(?: AS \w+)?\b(?! VIRTUAL TABLE)')
+    else:
+        pattern = re.compile(r'Seq Scan on (\w+)')
+    offending = []
+    for line in plan:
+        match = pattern.search(line.strip())
+        if match and match.group(1) in LARGE_TABLES:
+            offending.append(line.strip())
+    return offending
+
+
+def check_query_plans():
+    """Explain every route query; returns {name: (statement, plan, offending_lines)}"""
+    queries = route_queries()
+    results = {}
+    with db.engine.connect() as connection:
+        if connection.dialect.name == 'postgresql':
+            # Tiny CI tables make sequential scans cheapest; ask the planner
+            # what it would do if the tables were large
+            connection.execute(text("SET enable_seqscan = off"))
+        for name, (statement, parameters) in queries.items():
+            plan = explain(connection, statement, parameters)
+            results[name] = (statement, plan, full_scans(connection.dialect.name, plan))
+    return results
@@ -0,0 +1,58 @@
+"""
+Worker readiness.
+
+GET /healthz answers as soon as the worker serves requests. GET /readyz
+answers 503 until warm_pool has opened this worker's database connections,
+so a load balancer or orchestrator never sends traffic to a worker whose
+first requests would still pay for connection setup. Under gunicorn,
+gunicorn.conf.py warms the pool in post_worker_init, before the worker
+accepts connections; main.py does the same for the development server.
+Once ready, /readyz also reports each engine's pool metrics (pooling.py).
+"""
+
+import time
+from flask import current_app, jsonify
+from sqlalchemy import text
+from extensions import db
+from routing import replica_engines
+from pooling import pool_metrics
+
+
+def warm_pool(app, connections=None):
+    """Open connections up to the pool size (or DB_POOL_WARM), per engine, and mark the worker ready.
+
+    Returns the number of connections opened.
+    """
+    started = time.perf_counter()
+    with app.app_context():
+        pool = db.engine.pool
+        if connections is None:
+            connections = app.config.get('DB_POOL_WARM') or (pool.size() if hasattr(pool, 'size') else 1)
+        # Held open together so the pool really creates that many, then all returned at once
+        held = []
+        try:
+            for engine in [db.engine, *replica_engines(app)]:
+                for _ in range(connections):
+                    connection = engine.connect()
+                    held.append(connection)
+                    connection.execute(text('SELECT 1'))
+        finally:
+            for connection in held:
+                connection.close()
+    app.extensions['ready'] = True
+    app.logger.info("Warmed %d database connections in %.1fms", len(held), (time.perf_counter() - started) * 1000)
+    return len(held)
+
+
+def init_readiness(app):
+    app.extensions['ready'] = False
+
+    @app.route('/healthz')
+    def healthz():
+        return jsonify(status='ok')
+
+    @app.route('/readyz')
+    def readyz():
+        if not current_app.extensions.get('ready'):
+            return jsonify(status='starting'), 503
+        return jsonify(status='ready', pools=pool_metrics(current_app))
@@ -0,0 +1,107 @@
+"""
+Race-free registration engine.
+
+A seat is claimed with a single conditional UPDATE on the events row that
+only succeeds while the event is active, before its deadline and below
+capacity. The UPDATE takes the row lock on PostgreSQL and the write lock on
+SQLite, so concurrent workers serialize on it and can never oversell
+max_attendees. The registration row is inserted in the same transaction, and
+a duplicate is detected through the unique_user_event_registration constraint.
+"""
+
+from datetime import datetime
+from sqlalchemy import insert, or_, update
+from sqlalchemy.exc import IntegrityError
+from extensions import db
+from models import Event, Registration
+
+
+class RegistrationError(Exception):
+    """Raised when a seat cannot be reserved"""
+    message = 'Registration is not available for this event.'
+    category = 'error'
+    code = 'closed'
+
+
+class RegistrationClosed(RegistrationError):
+    message = 'Registration is not available for this event.'
+
+
+class EventFull(RegistrationError):
+    message = 'This event is full.'
+    code = 'full'
+
+
+class AlreadyRegistered(RegistrationError):
+    message = 'You are already registered for this event.'
+    category = 'info'
+    code = 'already_registered'
+
+
+events = Event.__table__
+registrations = Registration.__table__
+
+
+def _claim_seat_statement(event_id, now):
+    """Build the conditional counter increment that reserves one seat"""
+    return (
+        update(events)
+        .where(events.c.id == event_id)
+        .where(events.c.is_active.is_(True))
+        .where(or_(events.c.registration_deadline.is_(None),
+                   events.c.registration_deadline >= now))
+        .where(or_(events.c.max_attendees.is_(None),
+                   events.c.registration_count < events.c.max_attendees))
+        .values(registration_count=events.c.registration_count + 1)
+    )
+
+
+def _failure_reason(event_id, now):
+    """Work out why a seat claim matched no row"""
+    row = db.session.execute(
+        db.select(events.c.is_active, events.c.registration_deadline,
+                  events.c.max_attendees, events.c.registration_count)
+        .where(events.c.id == event_id)
+    ).first()
+    if row is None or not row.is_active:
+        return RegistrationClosed()
+    if row.registration_deadline and now > row.registration_deadline:
+        return RegistrationClosed()
+    if row.max_attendees is not None and row.registration_count >= row.max_attendees:
+        return EventFull()
+    return RegistrationClosed()
+
+
+def reserve_seat(event_id, user_id, notes=None):
+    """Atomically reserve a seat and create the registration.
+
+    Commits on success and returns the new registration id. Rolls back and
+    raises a RegistrationError subclass when the event is closed, full, or
+    the user is already registered.
+    """
+    now = datetime.utcnow()
+
+    try:
+        claimed = db.session.execute(_claim_seat_statement(event_id, now)).rowcount
+        if not claimed:
+            reason = _failure_reason(event_id, now)
+            db.session.rollback()
+            raise reason
+
+        # Core insert: the counter was already bumped above, so the ORM
+        # after_insert listener must not run for this row
+        result = db.session.execute(
+            insert(registrations).values(
+                user_id=user_id,
+                event_id=event_id,
+                notes=notes,
+                status='registered',
+                registered_at=now,
+            )
+        )
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        raise AlreadyRegistered()
+
+    return result.inserted_primary_key[0]
@@ -0,0 +1,121 @@
+"""
+Read replica routing.
+
+DATABASE_REPLICA_URLS (comma separated) adds one engine per replica, as
+binds named replica_0, replica_1, ... Views decorated with
+@reads_from_replica send their SELECTs to a randomly chosen replica; every
+other query, every write and everything outside a request (CLI, background
+threads) uses the primary, SQLALCHEMY_DATABASE_URI.
+
+Within a request, once the session has written anything, all of its
+remaining queries go to the primary. After a request commits a write, the
+client is pinned to the primary for REPLICA_STICKY_SECONDS (a timestamp in
+its session cookie), so whoever made a change sees it on the next page even
+if the replicas have not caught up yet. A write committed outside the
+request, like a seat reserved by the registration intake, pins the client
+when the view that reports it calls stick_to_primary(). Other clients may
+see the old data until they do; a response cached from a lagging replica
+can likewise outlive the invalidation that triggered it, by at most
+CACHE_DEFAULT_TIMEOUT.
+
+With no replicas configured the decorator does nothing. For local work,
+two SQLite files stand in for a primary and its replica:
+
+    export DATABASE_URL=sqlite:///primary.db DATABASE_REPLICA_URLS=sqlite:///replica.db
+    flask --app main create-schema
+    flask --app main sync-replicas    # re-run whenever the replica should catch up
+"""
+
+import random
+import time
+from functools import wraps
+from flask import current_app, g, has_app_context, has_request_context, session
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event as sa_event
+
+REPLICA_BIND_PREFIX = 'replica_'
+STICKY_KEY = '_db_primary_until'
+
+
+class RoutingSession(Session):
+    """Sends reads to a replica when the current view allows it"""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        engine = super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+        if self._flushing or (clause is not None and not getattr(clause, 'is_select', False)):
+            self.info['wrote'] = True
+            return engine
+        if (bind is None and not self.info.get('wrote') and has_app_context()
+                and g.get('db_route') == 'replica' and engine is self._db.engines[None]):
+            replicas = current_app.extensions.get('db_replicas')
+            if replicas:
+                return self._db.engines[random.choice(replicas)]
+        return engine
+
+
+def stick_to_primary():
+    """Read from the primary for this client until the replicas catch up.
+
+    Called for the request's own commits; views call it for a write made on
+    the client's behalf elsewhere, such as a queued registration.
+    """
+    if current_app.extensions.get('db_replicas'):
+        session[STICKY_KEY] = time.time() + current_app.config['REPLICA_STICKY_SECONDS']
+
+
+@sa_event.listens_for(RoutingSession, 'after_commit')
+def _stick_to_primary(db_session):
+    # Read-your-writes
+    if db_session.info.get('wrote') and has_request_context():
+        stick_to_primary()
+
+
+def reads_from_replica(f):
+    """Decorator to serve a read-only view's queries from a replica"""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if current_app.extensions.get('db_replicas') and session.get(STICKY_KEY, 0) <= time.time():
+            g.db_route = 'replica'
+        return f(*args, **kwargs)
+    return decorated_function
+
+
+def replica_engines(app):
+    """The replica engines, for warming and health checks; needs an app context"""
+    from extensions import db
+    return [db.engines[key] for key in app.extensions.get('db_replicas', ())]
+
+
+def sync_sqlite_replicas(app):
+    """Copy the SQLite primary over every SQLite replica, a local stand-in for replication"""
+    from extensions import db
+    with app.app_context():
+        targets = [engine for engine in replica_engines(app) if engine.dialect.name == 'sqlite']
+        if db.engine.dialect.name != 'sqlite' or not targets:
+            return 0
+        source = db.engine.raw_connection()
+        try:
+            for engine in targets:
+                target = engine.raw_connection()
+                try:
+                    source.driver_connection.backup(target.driver_connection)
+                finally:
+                    target.close()
+        finally:
+            source.close()
+    return len(targets)
+
+
+def init_routing(app):
+    """Register the replica binds; must run before db.init_app"""
+    urls = app.config.get('DATABASE_REPLICA_URLS') or []
+    binds = dict(app.config.get('SQLALCHEMY_BINDS') or {})
+    keys = []
+    for index, url in enumerate(urls):
+        key = f'{REPLICA_BIND_PREFIX}{index}'
+        binds[key] = url
+        keys.append(key)
+    if keys:
+        app.config['SQLALCHEMY_BINDS'] = binds
+    app.extensions['db_replicas'] = keys
+    return keys
@@ -0,0 +1,141 @@
+"""
+Synthetic data generator for production-scale local databases.
+
+Builds users, events and registrations directly with batched Core inserts
+on top of the User / Event / Registration tables. The data is skewed the way
+production is: a few organizers own most events, and registrations follow a
+Zipf-like curve so a handful of hot events hold a large share of all seats.
+
+    flask seed-scale-data --users 100000 --events 50000 --registrations 5000000
+"""
+
+import random
+from datetime import datetime, timedelta
+from extensions import db
+from models import User, Event, Registration, reconcile_registration_counts
+from passwords import hash_password
+
+EVENT_TYPES = ['conference', 'networking', 'workshop', 'seminar', 'meeting', 'other']
+ORGANIZATIONS = [f'Company {i}' for i in range(2000)]
+WORDS = ('summit workshop meetup data cloud python security design product growth leadership '
+         'analytics mobile web devops startup finance health education community').split()
+
+# Every generated account can log in with this password
+DEFAULT_PASSWORD = 'password123'
+
+
+def _zipf_counts(total, buckets, exponent, cap):
+    """Split total into per-bucket counts following a Zipf curve, each at most cap"""
+    weights = [1.0 / (rank + 1) ** exponent for rank in range(buckets)]
+    scale = total / sum(weights)
+    counts = [min(cap, int(w * scale)) for w in weights]
+    # Spread the rounding/capping remainder over buckets that still have room
+    remainder = total - sum(counts)
+    while remainder > 0:
+        open_buckets = [i for i, count in enumerate(counts) if count < cap]
+        if not open_buckets:
+            break
+        share = max(1, remainder // len(open_buckets))
+        for i in open_buckets:
+            extra = min(share, cap - counts[i], remainder)
+            counts[i] += extra
+            remainder -= extra
+            if not remainder:
+                break
+    return counts
+
+
+def generate(users=1000, events=500, registrations=20000, organizer_share=0.05,
+             skew=1.1, batch_size=10000, seed=42, reset=True, echo=print):
+    """Populate the database with synthetic data; returns a summary dict"""
+    rng = random.Random(seed)
+    if reset:
+        db.drop_all()
+        db.create_all()
+
+    now = datetime.utcnow()
+    password_hash = hash_password(DEFAULT_PASSWORD)
+    user_table, event_table, registration_table = User.__table__, Event.__table__, Registration.__table__
+
+    # Users: ids are assigned explicitly so later batches can reference them
+    organizer_count = max(1, int(users * organizer_share))
+    for start in range(0, users, batch_size):
+        db.session.execute(db.insert(user_table), [
+            {'id': i + 1, 'username': f'user{i}', 'email': f'user{i}@scale.test',
+             'password_hash': password_hash, 'first_name': 'User', 'last_name': str(i),
+             'organization': rng.choice(ORGANIZATIONS) if rng.random() < 0.8 else None,
+             'role': 'organizer' if i < organizer_count else 'attendee',
+             'is_active': True, 'created_at': now - timedelta(days=rng.randint(0, 1000))}
+            for i in range(start, min(start + batch_size, users))
+        ])
+        db.session.commit()
+    echo(f"Created {users} users ({organizer_count} organizers)")
+
+    # Registrations per event, hottest first; capped by the number of users
+    per_event = _zipf_counts(registrations, events, skew, users)
+    organizer_weights = [1.0 / (rank + 1) for rank in range(organizer_count)]
+    organizer_of = rng.choices(range(1, organizer_count + 1), organizer_weights, k=events)
+    order = list(range(events))
+    rng.shuffle(order)  # hot events should not all have the lowest ids
+
+    event_rows = []
+    for rank, index in enumerate(order):
+        seats = per_event[rank]
+        start = now + timedelta(hours=rng.randint(-24 * 180, 24 * 365))
+        capacity = None if rng.random() < 0.2 else seats + rng.randint(0, max(10, seats // 4))
+        event_rows.append({
+            'id': index + 1,
+            'title': ' '.join(rng.choices(WORDS, k=3)).title() + f' {index}',
+            'description': ' '.join(rng.choices(WORDS, k=30)),
+            'start_datetime': start,
+            'end_datetime': start + timedelta(hours=rng.choice([1, 2, 3, 8, 32])),
+            'location': f'Venue {rng.randint(1, 500)}',
+            'max_attendees': capacity,
+            'registration_deadline': start - timedelta(days=1) if rng.random() < 0.5 else None,
+            'event_type': rng.choice(EVENT_TYPES),
+            'is_active': rng.random() < 0.95,
+            'registration_count': 0,
+            'organizer_id': organizer_of[index],
+            'created_at': now - timedelta(days=rng.randint(0, 365)),
+            'updated_at': now - timedelta(days=rng.randint(0, 30)),
+        })
+    event_rows.sort(key=lambda row: row['id'])
+    for start in range(0, events, batch_size):
+        db.session.execute(db.insert(event_table), event_rows[start:start + batch_size])
+        db.session.commit()
+    echo(f"Created {events} events")
+
+    # Registrations: distinct users per event, mostly 'registered'
+    seats_by_event = {index + 1: per_event[rank] for rank, index in enumerate(order)}
+
+    pending = []
+    written = 0
+    for event_id, seats in seats_by_event.items():
+        if not seats:
+            continue
+        registered_base = event_rows[event_id - 1]['created_at']
+        for user_id in rng.sample(range(1, users + 1), seats):
+            roll = rng.random()
+            pending.append({
+                'user_id': user_id,
+                'event_id': event_id,
+                'status': 'cancelled' if roll < 0.05 else 'attended' if roll < 0.15 else 'registered',
+                'registered_at': registered_base + timedelta(minutes=rng.randint(0, 60 * 24 * 30)),
+                'notes': None,
+            })
+        if len(pending) >= batch_size:
+            db.session.execute(db.insert(registration_table), pending)
+            db.session.commit()
+            written += len(pending)
+            pending = []
+            echo(f"  {written} registrations...")
+    if pending:
+        db.session.execute(db.insert(registration_table), pending)
+        db.session.commit()
+        written += len(pending)
+    echo(f"Created {written} registrations")
+
+    reconcile_registration_counts()
+
+    return {'users': users, 'organizers': organizer_count, 'events': events, 'registrations': written,
+            'hottest_event_registrations': per_event[0] if per_event else 0}
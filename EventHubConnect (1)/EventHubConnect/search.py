@@ -0,0 +1,221 @@
+"""
+Pluggable full-text search for events.
+
+- SQLite: an FTS5 external-content table (events_fts) kept current by
+  triggers on the events table, ranked with bm25().
+- PostgreSQL: a generated tsvector column (events.search_vector) with a GIN
+  index, ranked with ts_rank().
+- Anything else, or SEARCH_BACKEND='like': the original LIKE '%term%' scan.
+
+The index objects are installed whenever the events table is created
+(db.create_all) and by `flask create-schema` for databases that predate
+them. Startup does not touch the database: each worker checks that the index
+exists on its first search and falls back to LIKE if it does not.
+"""
+
+import logging
+import re
+from flask import current_app
+from sqlalchemy import event as sa_event, text
+from sqlalchemy.exc import DatabaseError
+from extensions import db
+from models import Event
+
+logger = logging.getLogger(__name__)
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def tokenize(term):
+    """Split a user search string into safe query tokens"""
+    return TOKEN_RE.findall(term or '')
+
+
+class LikeSearchBackend:
+    """Substring search with LIKE; used as the fallback everywhere"""
+    name = 'like'
+
+    def installed(self, connection):
+        return True
+
+    def install(self, connection):
+        return False
+
+    def uninstall(self, connection):
+        pass
+
+    def rebuild(self, connection):
+        pass
+
+    def apply(self, query, term):
+        return query.filter(Event.title.contains(term) | Event.description.contains(term))
+
+
+class SQLiteFTSBackend(LikeSearchBackend):
+    """SQLite FTS5 index over title and description"""
+    name = 'sqlite-fts5'
+
+    DDL = [
+        "CREATE VIRTUAL TABLE IF NOT EXISTS events_fts USING fts5("
+        "title, description, content='events', content_rowid='id', tokenize='porter unicode61')",
+        "CREATE TRIGGER IF NOT EXISTS events_fts_ai AFTER INSERT ON events BEGIN "
+        "INSERT INTO events_fts(rowid, title, description) VALUES (new.id, new.title, new.description); END",
+        "CREATE TRIGGER IF NOT EXISTS events_fts_ad AFTER DELETE ON events BEGIN "
+        "INSERT INTO events_fts(events_fts, rowid, title, description) "
+        "VALUES ('delete', old.id, old.title, old.description); END",
+        "CREATE TRIGGER IF NOT EXISTS events_fts_au AFTER UPDATE OF title, description ON events BEGIN "
+        "INSERT INTO events_fts(events_fts, rowid, title, description) "
+        "VALUES ('delete', old.id, old.title, old.description); "
+        "INSERT INTO events_fts(rowid, title, description) VALUES (new.id, new.title, new.description); END",
+    ]
+
+    def installed(self, connection):
+        return connection.execute(text(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'events_fts'"
+        )).first() is not None
+
+    def install(self, connection):
+        """Create the FTS table and triggers; returns True if newly created"""
+        exists = self.installed(connection)
+        for statement in self.DDL:
+            connection.execute(text(statement))
+        return not exists
+
+    def uninstall(self, connection):
+        for name in ('events_fts_ai', 'events_fts_ad', 'events_fts_au'):
+            connection.execute(text(f"DROP TRIGGER IF EXISTS {name}"))
+        connection.execute(text("DROP TABLE IF EXISTS events_fts"))
+
+    def rebuild(self, connection):
+        connection.execute(text("INSERT INTO events_fts(events_fts) VALUES ('rebuild')"))
+
+    def apply(self, query, term):
+        tokens = tokenize(term)
+        if not tokens:
+            return super().apply(query, term)
+
+        # Prefix match on every token so results refine as the user types
+        match = ' '.join(f'"{token}"*' for token in tokens)
+        hits = (
+            text("SELECT rowid AS event_id, bm25(events_fts, 10.0, 1.0) AS rank "
+                 "FROM events_fts WHERE events_fts MATCH :match")
+            .bindparams(match=match)
+            .columns(event_id=db.Integer, rank=db.Float)
+            .subquery('fts_hits')
+        )
+        # bm25() is lower-is-better
+        return query.join(hits, Event.id == hits.c.event_id).order_by(hits.c.rank.asc())
+
+
+class PostgresFTSBackend(LikeSearchBackend):
+    """PostgreSQL tsvector column with a GIN index"""
+    name = 'postgres-tsvector'
+
+    def installed(self, connection):
+        return connection.execute(text(
+            "SELECT 1 FROM information_schema.columns "
+            "WHERE table_name = 'events' AND column_name = 'search_vector'"
+        )).first() is not None
+
+    def install(self, connection):
+        exists = self.installed(connection)
+        connection.execute(text(
+            "ALTER TABLE events ADD COLUMN IF NOT EXISTS search_vector tsvector "
+            "GENERATED ALWAYS AS ("
+            "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+            "setweight(to_tsvector('english', coalesce(description, '')), 'B')) STORED"
+        ))
+        connection.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_events_search_vector ON events USING GIN (search_vector)"
+        ))
+        return not exists
+
+    def uninstall(self, connection):
+        connection.execute(text("DROP INDEX IF EXISTS ix_events_search_vector"))
+
+    def apply(self, query, term):
+        tokens = tokenize(term)
+        if not tokens:
+            return super().apply(query, term)
+
+        tsquery = db.func.to_tsquery('english', ' & '.join(f'{token}:*' for token in tokens))
+        vector = db.literal_column('events.search_vector')
+        return query.filter(vector.op('@@')(tsquery)).order_by(db.func.ts_rank(vector, tsquery).desc())
+
+
+SEARCH_BACKENDS = {
+    'sqlite': SQLiteFTSBackend,
+    'postgresql': PostgresFTSBackend,
+}
+
+
+def backend_for_dialect(dialect_name, setting='auto'):
+    """Pick the search backend class for a database dialect"""
+    if setting == 'like':
+        return LikeSearchBackend
+    return SEARCH_BACKENDS.get(dialect_name, LikeSearchBackend)
+
+
+@sa_event.listens_for(Event.__table__, 'after_create')
+def _install_after_create(target, connection, **kw):
+    backend = backend_for_dialect(connection.dialect.name)()
+    try:
+        with connection.begin_nested():
+            backend.install(connection)
+    except DatabaseError as e:
+        logger.warning("Full-text search index not installed (%s); using LIKE search", e)
+
+
+@sa_event.listens_for(Event.__table__, 'before_drop')
+def _uninstall_before_drop(target, connection, **kw):
+    backend_for_dialect(connection.dialect.name)().uninstall(connection)
+
+
+def init_search(app):
+    """Pick the configured search backend for this app's database"""
+    setting = app.config.get('SEARCH_BACKEND', 'auto')
+    with app.app_context():
+        # Reads the URL's dialect only; no connection is opened
+        backend = backend_for_dialect(db.engine.dialect.name, setting)()
+    app.extensions['event_search'] = backend
+    return backend
+
+
+def install_search(app):
+    """Install (and, when new, build) the search index; returns the backend in use"""
+    backend = app.extensions['event_search']
+    with app.app_context():
+        try:
+            with db.engine.begin() as connection:
+                if backend.install(connection):
+                    backend.rebuild(connection)
+                    logger.info("Built %s search index", backend.name)
+        except DatabaseError as e:
+            logger.warning("Full-text search unavailable (%s); using LIKE search", e)
+            backend = LikeSearchBackend()
+    app.extensions['event_search'] = backend
+    app.extensions['event_search_checked'] = True
+    return backend
+
+
+def _search_backend():
+    """The app's backend, checked against the database on first use in this worker"""
+    app = current_app._get_current_object()
+    backend = app.extensions.get('event_search') or LikeSearchBackend()
+    if not app.extensions.get('event_search_checked'):
+        try:
+            with db.engine.connect() as connection:
+                installed = backend.installed(connection)
+        except DatabaseError:
+            installed = False
+        if not installed:
+            logger.warning("%s search index missing (run `flask create-schema`); using LIKE search", backend.name)
+            backend = LikeSearchBackend()
+        app.extensions['event_search'] = backend
+        app.extensions['event_search_checked'] = True
+    return backend
+
+
+def search_events(query, term):
+    """Filter an Event query by a search term, ordered by relevance"""
+    return _search_backend().apply(query, term)
@@ -24,6 +24,9 @@ document.addEventListener('DOMContentLoaded', function() {
     
     // Initialize loading states
     initializeLoadingStates();
+    
+    // Initialize live seat availability
+    initializeAvailabilityFeed();
 });
 
 // Initialize Bootstrap tooltips
@@ -215,6 +218,47 @@ function initializeLoadingStates() {
     });
 }
 
+// Live seat availability over server-sent events
+function initializeAvailabilityFeed() {
+    const nodes = document.querySelectorAll('[data-availability-event]');
+    // Only offered when the server runs workers that can hold streams open
+    if (!nodes.length || !window.EventSource || !('liveAvailability' in document.body.dataset)) return;
+    
+    const ids = [...new Set(Array.from(nodes, node => node.dataset.availabilityEvent))];
+    let source = null;
+    
+    function open() {
+        source = new EventSource(`/api/v1/events/availability/stream?ids=${ids.join(',')}`);
+        source.addEventListener('availability', update);
+        source.addEventListener('error', function() {
+            // A refused stream (503) is not retried by the browser; try again later
+            if (source.readyState === EventSource.CLOSED) {
+                setTimeout(open, 30000);
+            }
+        });
+    }
+    
+    function update(e) {
+        const data = JSON.parse(e.data);
+        document.querySelectorAll(`[data-availability-event="${data.id}"]`).forEach(node => {
+            switch (node.dataset.availabilityField) {
+                case 'seats':
+                    node.textContent = `${data.registration_count}/${data.max_attendees}`;
+                    break;
+                case 'available_spots':
+                    node.textContent = data.max_attendees ? data.available_spots : '∞';
+                    break;
+                default:
+                    node.textContent = data[node.dataset.availabilityField];
+            }
+        });
+    }
+    
+    open();
+    // The browser reconnects on its own; stop when the page is hidden away
+    window.addEventListener('pagehide', () => source.close());
+}
+
 // Utility functions
 const Utils = {
     // Format date for display
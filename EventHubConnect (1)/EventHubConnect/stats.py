@@ -0,0 +1,157 @@
+"""
+SQL-side registration statistics.
+
+Per-event registered/cancelled/attended counts are computed by a single
+GROUP BY over events LEFT JOIN registrations (served by the
+ix_registrations_event_status index), so pages that show them never load
+Registration objects.
+
+The attendee page stays bounded however large the event: the roster is
+keyset-paginated on ix_registrations_event_registered, the seat total comes
+from the events.registration_count counter, and organizations are ranked
+over at most ORGANIZATION_SAMPLE seat holders.
+"""
+
+from collections import namedtuple
+from datetime import datetime
+from extensions import db
+from models import User, Event, Registration
+from pagination import keyset_paginate
+
+# Seat holders whose organizations are ranked on the attendee page
+ORGANIZATION_SAMPLE = 1000
+
+
+class EventStats(namedtuple('EventStats', 'event registered cancelled attended')):
+    """Registration counts for one event"""
+    __slots__ = ()
+
+    @property
+    def total(self):
+        """Registrations occupying a seat"""
+        return self.registered + self.attended
+
+
+class AttendeeBreakdown(namedtuple('AttendeeBreakdown', 'registered cancelled attended '
+                                                        'top_organizations organization_count sampled')):
+    """Status counts and most common organizations for an event's attendees"""
+    __slots__ = ()
+
+    @property
+    def total(self):
+        """Registrations occupying a seat"""
+        return self.registered + self.attended
+
+
+class OrganizerStats(namedtuple('OrganizerStats', 'events total_events active_events upcoming_events '
+                                                  'registered cancelled attended')):
+    """Per-event rows plus totals for an organizer"""
+    __slots__ = ()
+
+    @property
+    def total_registrations(self):
+        return self.registered + self.attended
+
+
+class ProfileStats(namedtuple('ProfileStats', 'events_created events_registered')):
+    """Counts shown on a user's profile"""
+    __slots__ = ()
+
+
+def _status_count(status):
+    return db.func.count(db.case((Registration.status == status, Registration.id)))
+
+
+def event_stats_query(*criteria):
+    """Query yielding (Event, registered, cancelled, attended) per matching event"""
+    return (
+        db.session.query(
+            Event,
+            _status_count('registered'),
+            _status_count('cancelled'),
+            _status_count('attended'),
+        )
+        .outerjoin(Registration, Registration.event_id == Event.id)
+        .filter(*criteria)
+        .group_by(Event.id)
+    )
+
+
+def organizer_stats(organizer_id, now=None):
+    """Per-event counts and totals for an organizer's dashboard in one query"""
+    now = now or datetime.utcnow()
+    rows = [
+        EventStats(*row)
+        for row in event_stats_query(Event.organizer_id == organizer_id)
+        .order_by(Event.start_datetime.asc())
+    ]
+    return OrganizerStats(
+        events=rows,
+        total_events=len(rows),
+        active_events=sum(1 for row in rows if row.event.is_active),
+        upcoming_events=sum(1 for row in rows if row.event.start_datetime > now),
+        registered=sum(row.registered for row in rows),
+        cancelled=sum(row.cancelled for row in rows),
+        attended=sum(row.attended for row in rows),
+    )
+
+
+def attendee_breakdown(event, top=5):
+    """Status counts and top organizations for an event at a cost independent of its size"""
+    # Seat holders are counted by events.registration_count; only the statuses
+    # needed to split it, and the cancellations, are counted here
+    counts = dict(
+        db.session.query(Registration.status, db.func.count(Registration.id))
+        .filter(Registration.event_id == event.id, Registration.status.in_(('attended', 'cancelled')))
+        .group_by(Registration.status)
+    )
+    attended = counts.get('attended', 0)
+
+    sample = (
+        db.select(Registration.user_id)
+        .where(Registration.event_id == event.id, Registration.status.in_(Registration.COUNTED_STATUSES))
+        .limit(ORGANIZATION_SAMPLE)
+        .subquery()
+    )
+    organizations = (
+        db.session.query(User.organization, db.func.count().label('attendees'))
+        .join(sample, sample.c.user_id == User.id)
+        .filter(User.organization.isnot(None), User.organization != '')
+        .group_by(User.organization)
+        .subquery()
+    )
+    top_organizations = [
+        row.organization for row in
+        db.session.query(organizations)
+        .order_by(organizations.c.attendees.desc(), organizations.c.organization.asc())
+        .limit(top)
+    ]
+    organization_count = db.session.query(db.func.count()).select_from(organizations).scalar()
+
+    return AttendeeBreakdown(
+        registered=max(event.registration_count - attended, 0),
+        cancelled=counts.get('cancelled', 0),
+        attended=attended,
+        top_organizations=top_organizations,
+        organization_count=organization_count,
+        sampled=event.registration_count > ORGANIZATION_SAMPLE,
+    )
+
+
+def attendee_page(event, cursor=None, per_page=50):
+    """One roster page, with users joined in, and the breakdown for an event's attendee page.
+
+    Raises InvalidCursor for a malformed cursor.
+    """
+    query = Registration.query.filter_by(event_id=event.id).options(db.joinedload(Registration.user))
+    attendees = keyset_paginate(query, (Registration.registered_at, Registration.id),
+                                cursor=cursor, per_page=per_page)
+    return attendees, attendee_breakdown(event)
+
+
+def profile_stats(user_id):
+    """Events created and registrations held by a user, in one round trip"""
+    created = db.select(db.func.count(Event.id)).where(Event.organizer_id == user_id).scalar_subquery()
+    registered = (db.select(db.func.count(Registration.id))
+                  .where(Registration.user_id == user_id).scalar_subquery())
+    return ProfileStats(*db.session.execute(db.select(created, registered)).one())
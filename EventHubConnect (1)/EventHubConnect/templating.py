@@ -0,0 +1,78 @@
+"""
+Template rendering helpers for event listings.
+
+Event type images are resolved to static URLs once at startup instead of
+calling url_for for every card, and type colors are a module-level table.
+Compiled templates are kept in a Jinja bytecode cache on disk
+(JINJA_BYTECODE_CACHE), so a fresh worker loads them without re-parsing.
+
+Rendered event cards are kept in a per-worker LRU keyed by everything a card
+shows: the event id, its updated_at and seat count, and the organizer's
+updated_at (for the name). A changed event gets a new key, so cards never
+need invalidating; stale ones simply age out. Cards are rendered fresh while
+templates auto-reload (debug), so template edits show up immediately.
+"""
+
+import os
+from flask import current_app, request, url_for
+from jinja2 import FileSystemBytecodeCache
+from markupsafe import Markup
+from cache import MemoryCache
+
+EVENT_TYPE_IMAGES = {
+    'conference': 'images/events/conference.svg',
+    'networking': 'images/events/networking.svg',
+    'workshop': 'images/events/workshop.svg',
+    'seminar': 'images/events/seminar.svg',
+    'meeting': 'images/events/meeting.svg',
+    'other': 'images/events/other.svg',
+}
+
+EVENT_TYPE_COLORS = {
+    'conference': '#6f42c1',
+    'networking': '#198754',
+    'workshop': '#ffc107',
+    'seminar': '#dc3545',
+    'meeting': '#17a2b8',
+    'other': '#6c757d',
+}
+
+
+def event_type_image(event_type):
+    """Static URL of the image for an event type"""
+    images = current_app.extensions['event_type_images']
+    return request.script_root + images.get(event_type, images['other'])
+
+
+def event_card(event):
+    """Rendered card for one event in the listings"""
+    cache = current_app.extensions.get('fragment_cache')
+    if cache is None or current_app.jinja_env.auto_reload:
+        return Markup(current_app.jinja_env.get_template('events/_event_card.html').render(event=event))
+
+    key = f'card:{event.id}:{event.updated_at}:{event.registration_count}:{event.organizer.updated_at}'
+    html = cache.get(key)
+    if html is None:
+        html = Markup(current_app.jinja_env.get_template('events/_event_card.html').render(event=event))
+        cache.set(key, html)
+    return html
+
+
+def init_templating(app):
+    # URLs relative to the application root; the script root is added per request
+    with app.test_request_context():
+        app.extensions['event_type_images'] = {
+            event_type: url_for('static', filename=filename) for event_type, filename in EVENT_TYPE_IMAGES.items()
+        }
+
+    directory = app.config.get('JINJA_BYTECODE_CACHE')
+    if directory is None:
+        directory = os.path.join(app.instance_path, 'jinja_cache')
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+        app.jinja_env.bytecode_cache = FileSystemBytecodeCache(directory)
+
+    max_entries = app.config.get('FRAGMENT_CACHE_MAX_ENTRIES', 2000)
+    # Keys carry the content version, so the timeout only bounds memory held by dead entries
+    app.extensions['fragment_cache'] = MemoryCache(max_entries, default_timeout=3600) if max_entries else None
+    app.jinja_env.globals['event_card'] = event_card
@@ -4,7 +4,13 @@ from urllib.parse import urlparse as url_parse
 from users import users_bp
 from models import User, Registration
 from forms import LoginForm, RegisterForm, ProfileForm
-from app import db
+from cache import invalidate
+from conditional import not_modified
+from stats import profile_stats
+from passwords import HashingBusy
+from extensions import db
+from routing import reads_from_replica
+from calendars import feed_token
 
 @users_bp.route('/login', methods=['GET', 'POST'])
 def login():
@@ -15,7 +21,16 @@ def login():
     form = LoginForm()
     if form.validate_on_submit():
         user = User.query.filter_by(username=form.username.data).first()
-        if user and user.check_password(form.password.data):
+        try:
+            authenticated = user is not None and user.check_password(form.password.data)
+        except HashingBusy:
+            flash('We are handling a lot of sign-ins right now. Please try again in a moment.', 'warning')
+            return render_template('auth/login.html', form=form), 503
+        
+        if authenticated:
+            # Persist a hash upgraded to the current profile
+            if user in db.session.dirty:
+                db.session.commit()
             login_user(user)
             flash(f'Welcome back, {user.first_name}!', 'success')
             
@@ -57,7 +72,11 @@ def register():
             bio=form.bio.data,
             role=form.role.data
         )
-        user.set_password(form.password.data)
+        try:
+            user.set_password(form.password.data)
+        except HashingBusy:
+            flash('We are handling a lot of sign-ups right now. Please try again in a moment.', 'warning')
+            return render_template('auth/register.html', form=form), 503
         
         db.session.add(user)
         db.session.commit()
@@ -76,10 +95,16 @@ def logout():
     return redirect(url_for('index'))
 
 @users_bp.route('/profile')
+@reads_from_replica
 @login_required
 def profile():
     """User profile view"""
-    return render_template('users/profile.html', user=current_user)
+    stats = profile_stats(current_user.id)
+    # Registration counts change without touching users.updated_at, so ETag only
+    unchanged = not_modified(current_user.id, current_user.updated_at, tuple(stats))
+    if unchanged:
+        return unchanged
+    return render_template('users/profile.html', user=current_user, stats=stats)
 
 @users_bp.route('/profile/edit', methods=['GET', 'POST'])
 @login_required
@@ -103,14 +128,18 @@ def edit_profile():
         current_user.bio = form.bio.data
         
         db.session.commit()
+        # Names appear on cached event pages
+        invalidate(f'user:{current_user.id}')
         flash('Profile updated successfully!', 'success')
         return redirect(url_for('users.profile'))
     
     return render_template('users/edit_profile.html', form=form)
 
 @users_bp.route('/dashboard')
+@reads_from_replica
 @login_required
 def dashboard():
     """User dashboard showing registered events"""
     registrations = Registration.query.filter_by(user_id=current_user.id).all()
-    return render_template('users/dashboard.html', registrations=registrations)
+    feed_url = url_for('events.user_feed', user_id=current_user.id, token=feed_token(current_user.id), _external=True)
+    return render_template('users/dashboard.html', registrations=registrations, feed_url=feed_url)
@@ -4,7 +4,10 @@ from flask.views import MethodView
 from users import users_bp
 from models import User, Registration
 from forms import ProfileForm
-from app import db
+from cache import invalidate
+from conditional import not_modified
+from stats import profile_stats
+from extensions import db
 
 class UserProfileView(MethodView):
     """Class-based view for user profile management"""
@@ -20,7 +23,11 @@ class UserProfileView(MethodView):
             if user.id != current_user.id and not current_user.is_organizer():
                 abort(403)
         
-        return render_template('users/profile.html', user=user)
+        stats = profile_stats(user.id)
+        unchanged = not_modified(user.id, user.updated_at, tuple(stats))
+        if unchanged:
+            return unchanged
+        return render_template('users/profile.html', user=user, stats=stats)
     
     def post(self, user_id=None):
         """Update user profile"""
@@ -44,6 +51,8 @@ class UserProfileView(MethodView):
             current_user.bio = form.bio.data
             
             db.session.commit()
+            # Names appear on cached event pages
+            invalidate(f'user:{current_user.id}')
             flash('Profile updated successfully!', 'success')
             return redirect(url_for('users.profile'))
         